@@ -0,0 +1,165 @@
+"""
+פקודות ניהול משורת הפקודה
+Command line management tasks
+
+Usage: python -m app.cli import-corpus "מילים מתהילים.xlsx" "רשימה לסינון.xlsx"
+       python -m app.cli import-rules nikud_rules.json
+       python -m app.cli canonicalize
+       python -m app.cli reanalyze
+       SNAPSHOT_DIR=... python -m app.cli build-snapshot
+       SNAPSHOT_DIR=... python -m app.cli export-dictionary
+       python -m app.cli partition-words
+"""
+
+import argparse
+import json
+import time
+
+from app.database import SessionLocal, init_db
+
+
+def import_corpus(args):
+    """ייבוא חוברות אקסל - Import pre-analyzed workbooks"""
+    from app.services.corpus_importer import corpus_importer
+
+    db = SessionLocal()
+    try:
+        for path in args.files:
+            started = time.perf_counter()
+            report = corpus_importer.import_workbook(db, path, category_name=args.category)
+            report["seconds"] = round(time.perf_counter() - started, 2)
+            print(json.dumps(report, ensure_ascii=False, indent=2))
+    finally:
+        db.close()
+
+
+def import_rules(args):
+    """ייבוא טבלת כללים - Import the rule table from its JSON export"""
+    from app.services.corpus_importer import corpus_importer
+
+    db = SessionLocal()
+    try:
+        print(json.dumps(corpus_importer.import_rules_json(db, args.file), ensure_ascii=False, indent=2))
+    finally:
+        db.close()
+
+
+def canonicalize(args):
+    """שכתוב לסדר סימנים קנוני - Rewrite stored words and contents"""
+    from app.services.search_engine import search_engine
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        report = search_engine.canonicalize_stored(db)
+        report["seconds"] = round(time.perf_counter() - started, 2)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    finally:
+        db.close()
+
+
+def reanalyze(args):
+    """ניתוח מחדש - Bring stored words up to the current analyzer version"""
+    from app.services.reanalysis import reanalysis_job
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        reanalysis_job.start()
+        report = reanalysis_job.run(db)
+        report["seconds"] = round(time.perf_counter() - started, 2)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    finally:
+        db.close()
+
+
+def build_snapshot(args):
+    """בניית תמונת מצב - Write the shared index snapshot before starting workers"""
+    from app.services.shared_index import shared_indexes
+
+    if shared_indexes is None:
+        raise SystemExit("SNAPSHOT_DIR אינו מוגדר")
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        snapshot = shared_indexes.build(db)
+        report = dict(shared_indexes.stats(), generation=snapshot.generation,
+                      seconds=round(time.perf_counter() - started, 2))
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    finally:
+        db.close()
+
+
+def export_dictionary(args):
+    """ייצוא מילון הצורות - Write the mapped word dictionary"""
+    from app.services.word_dictionary import word_dictionary
+
+    if word_dictionary is None:
+        raise SystemExit("SNAPSHOT_DIR אינו מוגדר")
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        word_dictionary.export(db)
+        report = dict(word_dictionary.stats(), seconds=round(time.perf_counter() - started, 2))
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    finally:
+        db.close()
+
+
+def partition_words(args):
+    """חלוקה למחיצות - Partition words and word_postings by source (PostgreSQL)"""
+    from app.services.partitions import PartitionError, word_partitions
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        report = word_partitions.migrate(db)
+        report["seconds"] = round(time.perf_counter() - started, 2)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    except PartitionError as e:
+        raise SystemExit(str(e))
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="מערכת ניתוח ניקוד - פקודות ניהול")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_import = commands.add_parser("import-corpus", help="ייבוא חוברות אקסל")
+    parser_import.add_argument("files", nargs="+", help="קבצי xlsx")
+    parser_import.add_argument("--category", help="קטגוריה ברירת מחדל")
+    parser_import.set_defaults(handler=import_corpus)
+
+    parser_rules = commands.add_parser("import-rules", help="ייבוא טבלת כללים מקובץ JSON")
+    parser_rules.add_argument("file", help="nikud_rules.json")
+    parser_rules.set_defaults(handler=import_rules)
+
+    parser_canonical = commands.add_parser("canonicalize", help="שכתוב מילים ותוכן לסדר סימנים קנוני")
+    parser_canonical.set_defaults(handler=canonicalize)
+
+    parser_reanalyze = commands.add_parser("reanalyze", help="ניתוח מחדש של מילים מגרסת מנתח ישנה")
+    parser_reanalyze.set_defaults(handler=reanalyze)
+
+    parser_snapshot = commands.add_parser("build-snapshot", help="בניית תמונת מצב משותפת לאינדקסים")
+    parser_snapshot.set_defaults(handler=build_snapshot)
+
+    parser_dictionary = commands.add_parser("export-dictionary", help="ייצוא מילון צורות ממופה")
+    parser_dictionary.set_defaults(handler=export_dictionary)
+
+    parser_partition = commands.add_parser("partition-words", help="חלוקת טבלת המילים למחיצות לפי מקור")
+    parser_partition.set_defaults(handler=partition_words)
+
+    args = parser.parse_args()
+    init_db()
+    from app.services.shared_index import shared_indexes
+    from app.services.word_dictionary import word_dictionary
+    if word_dictionary is not None:
+        word_dictionary.open()  # Analyses of known forms are looked up
+    args.handler(args)
+    if shared_indexes is not None:
+        shared_indexes.wait()  # Let a rebuild scheduled by the command finish
+
+
+if __name__ == "__main__":
+    main()
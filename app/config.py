@@ -5,6 +5,7 @@ Configuration settings for the Nikud Analyzer application
 
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 import os
 
 
@@ -29,6 +30,44 @@ class Settings(BaseSettings):
     # File upload settings
     max_upload_size: int = 10 * 1024 * 1024  # 10MB
     allowed_extensions: set = {".txt", ".docx", ".xlsx"}
+
+    # Texts at least this long are analyzed with the vectorized analyzer
+    vector_analysis_min_chars: int = 100_000
+
+    # Fuzzy word_plain search - similar-letter groups and their swap cost
+    fuzzy_letter_groups: dict = {"בכפ": 0.5, "סש": 0.5, "חכ": 0.5, "תט": 0.5}
+    fuzzy_max_distance: int = 2
+
+    # Snapshots - with a directory set, worker processes map one snapshot
+    # of the autocomplete and fuzzy indexes instead of each building its
+    # own, and the analyzer looks forms up in a mapped word dictionary
+    snapshot_dir: Optional[str] = None
+    snapshot_check_seconds: float = 1.0
+
+    # Cross-process invalidation - LISTEN/NOTIFY on PostgreSQL, otherwise
+    # the generations table is polled at this interval
+    invalidation_enabled: bool = True
+    invalidation_poll_seconds: float = 2.0
+
+    # Read replica (optional) - search, statistics, exports and listings
+    # read from it while it is reachable and has the reader's own writes
+    replica_database_url: Optional[str] = None
+    replica_check_seconds: float = 1.0
+    replica_connect_timeout: int = 2
+
+    # Partition words and word_postings by source at startup (PostgreSQL
+    # only) - source-filtered searches read one partition, deletes drop it
+    partition_words: bool = False
+
+    # Export jobs - workbooks built in the background and kept on disk
+    # (default: a directory under the system temp dir) up to this size
+    export_dir: Optional[str] = None
+    export_cache_bytes: int = 500 * 1024 * 1024
+    export_workers: int = 2
+    export_wait_seconds: float = 30.0
+
+    # Monitoring - /metrics endpoint and hot-path timings
+    metrics_enabled: bool = True
     
     class Config:
         env_file = ".env"
@@ -3,9 +3,13 @@ Database connection and session management
 חיבור למסד נתונים וניהול סשנים
 """
 
-from sqlalchemy import create_engine
+from typing import List, Tuple
+
+from sqlalchemy import Table, create_engine, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql.dml import Insert
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import settings
 
 # Create database URL based on settings
@@ -22,6 +26,22 @@ else:
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read replica - search, statistics, exports and listings read
+# from it (see app.services.read_replica), everything else uses the primary
+replica_engine = None
+ReplicaSessionLocal = None
+if settings.replica_database_url:
+    if settings.replica_database_url.startswith("sqlite"):
+        replica_connect_args = {"check_same_thread": False}
+    else:
+        replica_connect_args = {"connect_timeout": settings.replica_connect_timeout}
+    replica_engine = create_engine(
+        settings.replica_database_url,
+        connect_args=replica_connect_args,
+        pool_pre_ping=True
+    )
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
 # Base class for models
 Base = declarative_base()
 
@@ -38,11 +58,118 @@ def get_db():
         db.close()
 
 
+def insert_ignoring_conflicts(db: Session, table: Table) -> Insert:
+    """
+    הוספה שמדלגת על כפילויות - INSERT ... ON CONFLICT DO NOTHING, so rows
+    another transaction inserted concurrently are skipped instead of failing
+    the batch on a unique key. With RETURNING, only the inserted rows come back.
+    """
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(table).on_conflict_do_nothing()
+
+
+def upgrade_schema() -> List[Tuple[str, str]]:
+    """
+    הוספת עמודות שנוספו למודלים לטבלאות קיימות
+    Add columns (and their indexes) introduced after a table was created.
+    Returns the (table, column) pairs that were added.
+    """
+    inspector = inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                    added.append((table.name, column.name))
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+    return added
+
+
+def unique_content_hashes():
+    """
+    טביעת תוכן ייחודית
+    Make the content hash of existing sources unique: texts loaded more than
+    once before keep their words, but only the first copy keeps the hash.
+    """
+    inspector = inspect(engine)
+    if "content_hash" not in {column["name"] for column in inspector.get_columns("sources")}:
+        return
+    if any(index["name"] == "ux_sources_content_hash" for index in inspector.get_indexes("sources")):
+        return
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX IF EXISTS ix_sources_content_hash"))
+        conn.execute(text(
+            "UPDATE sources SET content_hash = NULL WHERE id > "
+            "(SELECT MIN(s.id) FROM sources s WHERE s.content_hash = sources.content_hash)"))
+
+
 def init_db():
     """
     Initialize database tables
     אתחול טבלאות מסד הנתונים
     """
     from app import models  # Import models to register them
+    existing_tables = set(inspect(engine).get_table_names())
     Base.metadata.create_all(bind=engine)
+    if "sources" in existing_tables:
+        unique_content_hashes()
+    added = upgrade_schema()
+
+    db = SessionLocal()
+    try:
+        from app.services.generations import generations
+        generations.ensure(db)
+
+        # Source texts still stored inline move to compressed chunks first
+        from app.services.content_store import content_store
+        content_store.migrate(db)
+
+        # Word counts are kept on the source for listing
+        if any(column == "word_count" for _, column in added):
+            from app.services.search_engine import search_engine
+            search_engine.backfill_word_counts(db)
+
+        # Rows stored before the suffix index existed get their reversed forms
+        if any(column in models.REVERSED_COLUMNS for _, column in added):
+            from app.services.search_engine import search_engine
+            search_engine.backfill_reversed_forms(db)
+
+        # And offsets for the concordance
+        if any(column == "char_start" for _, column in added):
+            from app.services.search_engine import search_engine
+            search_engine.backfill_offsets(db)
+
+        # And content hashes, for duplicate uploads
+        if any(column == "content_hash" for _, column in added):
+            from app.services.search_engine import search_engine
+            search_engine.backfill_content_hashes(db)
+
+        # Likewise the pattern index for words stored before it existed
+        if "words" in existing_tables and "nikud_patterns" not in existing_tables:
+            from app.services.pattern_search import pattern_index
+            pattern_index.rebuild(db)
+
+        # And the phrase-search posting lists
+        if "words" in existing_tables and "word_postings" not in existing_tables:
+            from app.services.phrase_search import phrase_search
+            phrase_search.rebuild(db)
+
+        # And rule memberships of the stored forms
+        if "nikud_rules" in existing_tables and "word_rules" not in existing_tables:
+            from app.services.rule_index import rule_index
+            rule_index.rebuild(db)
+
+        # Words and postings partitioned by source (PostgreSQL only)
+        from app.services.partitions import word_partitions
+        if word_partitions.configured:
+            word_partitions.migrate(db)
+    finally:
+        db.close()
 
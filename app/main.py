@@ -3,16 +3,21 @@ FastAPI Application Entry Point
 נקודת כניסה לאפליקציית FastAPI
 """
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 
 from app.config import settings
 from app.database import init_db, get_db
-from app.routers import words, sources, analysis
+from app.routers import words, sources, analysis, rules, exports
 from app.services.search_engine import search_engine
+from app.services.metrics import metrics
+from app.services.shared_index import shared_indexes
+from app.services.word_dictionary import word_dictionary
+from app.services.invalidation import invalidation_bus
+from app.services.read_replica import GENERATION_COOKIE, GENERATION_HEADER, read_router
 
 
 @asynccontextmanager
@@ -20,8 +25,22 @@ async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     init_db()
+    if shared_indexes is not None or word_dictionary is not None:
+        db = next(get_db())
+        try:
+            if word_dictionary is not None:
+                word_dictionary.open(db)
+            if shared_indexes is not None:
+                shared_indexes.attach(db)
+        finally:
+            db.close()
+    if settings.invalidation_enabled:
+        invalidation_bus.start()
+    read_router.start()
     yield
     # Shutdown
+    invalidation_bus.stop(timeout=5)
+    read_router.stop(timeout=5)
 
 
 # Create FastAPI app
@@ -42,6 +61,26 @@ templates = Jinja2Templates(directory="templates")
 app.include_router(words.router)
 app.include_router(sources.router)
 app.include_router(analysis.router)
+app.include_router(rules.router)
+app.include_router(exports.router)
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """
+    קריאת הכתיבות של הלקוח - A request that committed a change to the
+    words returns the generation it reached, as a cookie and a header;
+    reads carrying it stay on the primary until the replica has caught up
+    """
+    if not read_router.enabled:
+        return await call_next(request)
+    writes = read_router.track()
+    response = await call_next(request)
+    if writes and response.status_code < 400:
+        generation = str(max(writes))
+        response.headers[GENERATION_HEADER] = generation
+        response.set_cookie(GENERATION_COOKIE, generation, max_age=3600, httponly=True, samesite="lax")
+    return response
 
 
 # Page routes
@@ -51,7 +90,7 @@ async def home(request: Request):
     דף הבית - חיפוש מילים
     Home page - Word search
     """
-    db = next(get_db())
+    db = read_router.session(read_router.required(request))
     try:
         stats = search_engine.get_statistics(db)
         sources_list = search_engine.get_sources(db)
@@ -92,7 +131,7 @@ async def stats_page(request: Request):
     דף סטטיסטיקות
     Statistics page
     """
-    db = next(get_db())
+    db = read_router.session(read_router.required(request))
     try:
         stats = search_engine.get_statistics(db)
         sources_list = search_engine.get_sources(db)
@@ -117,3 +156,11 @@ async def health_check():
     """Health check endpoint for Render"""
     return {"status": "healthy", "version": settings.app_version}
 
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics endpoint"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -4,23 +4,62 @@ SQLAlchemy database models
 """
 
 from sqlalchemy import (
-    Column, Integer, String, Text, Boolean, DateTime, ForeignKey, JSON
+    Column, Integer, String, Text, Boolean, DateTime, ForeignKey, JSON, Index, LargeBinary, and_
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
+# עמודות הפוכות לאינדקס סיומות: עמודה הפוכה -> עמודת המקור
+REVERSED_COLUMNS = {
+    "word_reversed": "word",
+    "word_plain_reversed": "word_plain",
+    "pattern_reversed": "nikud_pattern",
+}
+
+
+def _reversed(column: str):
+    """
+    ערך הפוך כברירת מחדל - Column default holding the reversed value of
+    another column, so suffix queries become prefix range scans
+    """
+    def default(context):
+        value = context.get_current_parameters().get(column)
+        return value[::-1] if value is not None else None
+    return default
+
+
+def _ordered_string(length: int):
+    # Byte-order collation on PostgreSQL keeps prefix ranges contiguous
+    return String(length).with_variant(String(length, collation="C"), "postgresql")
+
+
+def prefix_range(column, prefix: str):
+    """
+    טווח קידומת - Prefix match on a byte-ordered column as the range
+    [prefix, next prefix), which uses its b-tree index (LIKE 'x%' does not on SQLite)
+    """
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper)
+
 
 class Source(Base):
     """
     Text source model - מודל מקור טקסט
     """
     __tablename__ = "sources"
+    __table_args__ = (
+        # One source per content, so concurrent uploads of a text can't both store it
+        Index("ux_sources_content_hash", "content_hash", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
     file_path = Column(String(500), nullable=True)
-    content = Column(Text, nullable=True)
+    # Legacy inline text; content is stored compressed in source_chunks
+    content = deferred(Column(Text, nullable=True))
+    content_hash = Column(String(64))  # SHA-256 of the normalized content
+    word_count = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -52,13 +91,22 @@ class Word(Base):
     Word model with nikud analysis - מודל מילה עם ניתוח ניקוד
     """
     __tablename__ = "words"
+    __table_args__ = (
+        # Positional index: words around a position, in source order
+        Index("ix_words_source_position", "source_id", "position"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
     # Basic word data
     word = Column(String(100), nullable=False, index=True)  # עם ניקוד
     word_plain = Column(String(100), nullable=False, index=True)  # ללא ניקוד
-    nikud_pattern = Column(String(200), nullable=True)
+    nikud_pattern = Column(_ordered_string(200), nullable=True, index=True)
+
+    # Reversed forms for "ends with" queries
+    word_reversed = Column(_ordered_string(100), index=True, default=_reversed("word"))
+    word_plain_reversed = Column(_ordered_string(100), index=True, default=_reversed("word_plain"))
+    pattern_reversed = Column(_ordered_string(200), index=True, default=_reversed("nikud_pattern"))
     
     # Syllable analysis
     syllable_type = Column(String(50), nullable=True, index=True)
@@ -75,10 +123,15 @@ class Word(Base):
     
     # Special cases
     special_cases = Column(JSON, nullable=True)  # List of special cases
+    analyzer_version = Column(Integer, nullable=True, index=True)  # NULL - before versioning
     
     # Context and position
     position = Column(Integer, nullable=True)
-    context = Column(Text, nullable=True)
+    context = Column(Text, nullable=True)  # Legacy rows only; see concordance
+    char_start = Column(Integer, nullable=True)  # Offsets into Source.content
+    char_end = Column(Integer, nullable=True)
+    paragraph = Column(Integer, nullable=True)  # Paragraph (DOCX), row (XLSX) or line number
+    sheet = Column(String(100), nullable=True)  # XLSX sheet title
     
     # Foreign keys
     source_id = Column(Integer, ForeignKey("sources.id"), nullable=True)
@@ -120,3 +173,78 @@ class NikudRule(Base):
     def __repr__(self):
         return f"<NikudRule(id={self.id}, category='{self.category}', filter='{self.filter}')>"
 
+
+
+class NikudPattern(Base):
+    """
+    Distinct nikud pattern - תבנית ניקוד ייחודית
+    Backs wildcard pattern search together with PatternGram
+    """
+    __tablename__ = "nikud_patterns"
+
+    id = Column(Integer, primary_key=True, index=True)
+    pattern = Column(String(200), unique=True, nullable=False)
+
+    def __repr__(self):
+        return f"<NikudPattern(id={self.id}, pattern='{self.pattern}')>"
+
+
+class PatternGram(Base):
+    """
+    Pattern n-gram - n-גרם של תבנית ניקוד (with ^ and $ anchors)
+    """
+    __tablename__ = "pattern_grams"
+
+    gram = Column(String(10), primary_key=True)
+    pattern_id = Column(Integer, ForeignKey("nikud_patterns.id", ondelete="CASCADE"), primary_key=True)
+
+
+class WordRule(Base):
+    """
+    Rule membership - שיוך צורת מילה לכלל ניקוד
+    One row per (rule, pointed form) the rule matches; words under a rule
+    are found through Word.word
+    """
+    __tablename__ = "word_rules"
+
+    rule_id = Column(Integer, ForeignKey("nikud_rules.id", ondelete="CASCADE"), primary_key=True)
+    word = Column(String(100), primary_key=True, index=True)
+
+
+class WordPosting(Base):
+    """
+    Posting list - רשימת המיקומים של צורה במקור
+    One row per (term, source): the positions of every word whose pointed
+    or plain form equals the term, packed as ascending little-endian uint32
+    """
+    __tablename__ = "word_postings"
+
+    term = Column(String(100), primary_key=True)
+    source_id = Column(Integer, ForeignKey("sources.id", ondelete="CASCADE"), primary_key=True)
+    positions = Column(LargeBinary, nullable=False)
+
+
+class SourceChunk(Base):
+    """
+    Content chunk - קטע דחוס מתוכן מקור
+    A source's text in fixed-size character chunks, each zlib-compressed
+    UTF-8, so a character range is read by fetching only its chunks
+    """
+    __tablename__ = "source_chunks"
+
+    source_id = Column(Integer, ForeignKey("sources.id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+
+
+class Generation(Base):
+    """
+    Generation counter - מונה דורות
+    A number per group of tables, incremented in the same transaction as
+    every change to them, so caches and snapshots built from the database
+    can tell whether they are still current
+    """
+    __tablename__ = "generations"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
@@ -3,19 +3,29 @@ Text analysis endpoints
 נקודות קצה לניתוח טקסט
 """
 
-from fastapi import APIRouter, Depends
+import codecs
+import json
+from typing import AsyncIterator, List
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.database import get_db
+from app.services.read_replica import get_read_db
 from app.schemas import (
     TextAnalysisRequest, TextAnalysisResponse,
-    WordAnalysisResult, StatisticsResponse
+    WordAnalysisResult, StatisticsResponse, ReanalysisStatus
 )
 from app.services.nikud_analyzer import nikud_analyzer
-from app.services.search_engine import search_engine
+from app.services.reanalysis import reanalysis_job
+from app.services.search_engine import DuplicateSourceError, search_engine
 
 router = APIRouter(prefix="/api/analysis", tags=["analysis"])
 
+# Result lines per streamed chunk of /batch
+NDJSON_CHUNK_LINES = 500
+
 
 @router.post("/text", response_model=TextAnalysisResponse)
 async def analyze_text(
@@ -30,17 +40,22 @@ async def analyze_text(
     
     if request.save_to_db:
         # Save to database
-        source_id, analyses = search_engine.load_text(
-            db=db,
-            text=request.text,
-            source_name=request.source_name,
-            category_name=request.category
-        )
-        words = [WordAnalysisResult(**a.to_dict()) for a in analyses]
+        try:
+            source_id, analyses = search_engine.load_text(
+                db=db,
+                text=request.text,
+                source_name=request.source_name,
+                category_name=request.category
+            )
+        except DuplicateSourceError as e:
+            # Already stored - report the existing source
+            source_id = e.source["id"]
+            analyses = nikud_analyzer.analyze_text(request.text)
+        words = [WordAnalysisResult(**d) for d in analyses.iter_dicts()]
     else:
         # Just analyze without saving
         analyses = nikud_analyzer.analyze_text(request.text)
-        words = [WordAnalysisResult(**a.to_dict()) for a in analyses]
+        words = [WordAnalysisResult(**d) for d in analyses.iter_dicts()]
 
     return TextAnalysisResponse(
         source_id=source_id,
@@ -56,12 +71,77 @@ async def analyze_word(word: str):
     ניתוח מילה בודדת
     Analyze single word
     """
-    analysis = nikud_analyzer.analyze_word(word)
+    analysis = nikud_analyzer.analyze_cached(word.strip())
     return analysis.to_dict()
 
 
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    """
+    קריאת שורות מגוף הבקשה בזרימה - Stream body lines as they arrive. The
+    decoder is incremental, so a letter split between chunks stays whole,
+    and only newly decoded text is searched for line breaks.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending: List[str] = []  # Text of the current line, not yet ended
+    async for chunk in request.stream():
+        *lines, rest = decoder.decode(chunk).split("\n")
+        if lines:
+            lines[0] = "".join(pending) + lines[0]
+            pending = []
+            for line in lines:
+                yield line
+        if rest:
+            pending.append(rest)
+    pending.append(decoder.decode(b"", final=True))  # A truncated last letter
+    if any(pending):
+        yield "".join(pending)
+
+
+@router.post("/batch")
+async def analyze_batch(request: Request):
+    """
+    ניתוח מרוכז של מילים עם תשובת NDJSON
+    Batch analysis: accepts {"words": [...]} as JSON, or one word per line
+    as text/plain. Each distinct word is analyzed once and streamed back as
+    one JSON object per line, without per-item Pydantic validation.
+    """
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("application/json"):
+        try:
+            payload = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="גוף JSON לא תקין")
+        words = payload.get("words") if isinstance(payload, dict) else payload
+        if not isinstance(words, list) or not all(isinstance(w, str) for w in words):
+            raise HTTPException(status_code=422, detail="נדרשת רשימת מילים")
+    else:
+        # The body is drained before responding: StreamingResponse listens on
+        # the same receive channel for disconnects. Lines are deduped as they
+        # arrive, so only distinct words are held.
+        unique = {}
+        async for line in _iter_lines(request):
+            unique.setdefault(line.strip(), None)
+        words = list(unique)
+
+    def results():
+        # A sync generator: Starlette iterates it in a worker thread, so the
+        # analysis never blocks the event loop. Lines go out in chunks, one
+        # thread hop per chunk.
+        lines = []
+        for analysis in nikud_analyzer.analyze_unique(words):
+            lines.append(json.dumps(analysis.to_dict(), ensure_ascii=False) + "\n")
+            if len(lines) >= NDJSON_CHUNK_LINES:
+                yield "".join(lines)
+                lines = []
+        if lines:
+            yield "".join(lines)
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
 @router.get("/stats", response_model=StatisticsResponse)
-async def get_statistics(db: Session = Depends(get_db)):
+async def get_statistics(db: Session = Depends(get_read_db)):
     """
     קבלת סטטיסטיקות
     Get statistics
@@ -69,3 +149,24 @@ async def get_statistics(db: Session = Depends(get_db)):
     stats = search_engine.get_statistics(db)
     return StatisticsResponse(**stats)
 
+
+@router.get("/reanalyze", response_model=ReanalysisStatus)
+async def reanalysis_status(db: Session = Depends(get_db)):
+    """
+    מצב הניתוח מחדש
+    Progress of the re-analysis job and the number of stale rows left
+    """
+    return reanalysis_job.status(db)
+
+
+@router.post("/reanalyze", response_model=ReanalysisStatus, status_code=202)
+async def start_reanalysis(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """
+    ניתוח מחדש של מילים שמורות
+    Start re-analyzing stored words of an older analyzer version in the
+    background. Searches keep working while it runs.
+    """
+    if not reanalysis_job.start():
+        raise HTTPException(status_code=409, detail="ניתוח מחדש כבר רץ")
+    background_tasks.add_task(reanalysis_job.run)
+    return reanalysis_job.status(db)
@@ -0,0 +1,47 @@
+"""
+Export job endpoints
+נקודות קצה לעבודות ייצוא
+"""
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from app.schemas import ExportJobResponse
+from app.services.export_jobs import ExportJob, export_jobs
+
+router = APIRouter(prefix="/api/exports", tags=["exports"])
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def job_response(job: ExportJob) -> ExportJobResponse:
+    return ExportJobResponse(
+        **job.to_dict(),
+        status_url=str(router.url_path_for("export_status", job_id=job.job_id)),
+        file_url=str(router.url_path_for("export_file", job_id=job.job_id))
+    )
+
+
+@router.get("/{job_id}", response_model=ExportJobResponse)
+async def export_status(job_id: str):
+    """
+    מצב עבודת ייצוא
+    Export job status; the file is at file_url once status is done
+    """
+    job = export_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="עבודת ייצוא לא נמצאה")
+    return job_response(job)
+
+
+@router.get("/{job_id}/file")
+async def export_file(job_id: str):
+    """
+    הורדת קובץ ייצוא
+    The finished workbook, served from disk (with Range and conditional requests)
+    """
+    job = export_jobs.get(job_id)
+    if job is None or job.status != "done" or not export_jobs.path(job_id).exists():
+        raise HTTPException(status_code=404, detail="קובץ הייצוא אינו מוכן")
+    return FileResponse(export_jobs.served(job_id), media_type=XLSX_MEDIA_TYPE,
+                        filename="nikud_results.xlsx")
@@ -0,0 +1,39 @@
+"""
+Nikud rule endpoints
+נקודות קצה לכללי ניקוד
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.services.read_replica import get_read_db
+from app.models import NikudRule, Source
+from app.schemas import RuleSummary, RuleSourceCount
+from app.services.rule_index import rule_index
+
+router = APIRouter(prefix="/api/rules", tags=["rules"])
+
+
+@router.get("/", response_model=List[RuleSummary])
+async def list_rules(db: Session = Depends(get_read_db)):
+    """
+    רשימת כללים עם ספירות
+    Every rule with the number of forms and words matching it. Words under
+    a rule are listed with /api/words/search?rule_id=...
+    """
+    return rule_index.rules(db)
+
+
+@router.get("/{rule_id}/sources", response_model=List[RuleSourceCount])
+async def rule_source_counts(rule_id: int, db: Session = Depends(get_read_db)):
+    """
+    ספירת כלל לפי מקור
+    Words matching a rule in each source
+    """
+    if db.get(NikudRule, rule_id) is None:
+        raise HTTPException(status_code=404, detail="כלל לא נמצא")
+    counts = rule_index.source_counts(db, rule_id)
+    names = dict(db.query(Source.id, Source.name)
+                 .filter(Source.id.in_({count["source_id"] for count in counts})).all())
+    return [dict(count, source_name=names.get(count["source_id"])) for count in counts]
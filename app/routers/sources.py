@@ -8,15 +8,17 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.database import get_db
+from app.services.read_replica import get_read_db
 from app.schemas import SourceCreate, SourceResponse
-from app.services.search_engine import search_engine
+from app.services.search_engine import DuplicateSourceError, search_engine
+from app.services.content_hash import content_hash
+from app.services.ingestion import UploadError, ingest
 from app.models import Source
 
 router = APIRouter(prefix="/api/sources", tags=["sources"])
 
-
 @router.get("/", response_model=List[SourceResponse])
-async def list_sources(db: Session = Depends(get_db)):
+async def list_sources(db: Session = Depends(get_read_db)):
     """
     קבלת רשימת כל המקורות
     Get list of all sources
@@ -32,14 +34,24 @@ async def create_source(
 ):
     """
     טעינת מקור טקסט חדש
-    Load new text source
+    Load new text source. Content that was already loaded returns the
+    existing source instead of being analyzed again.
     """
-    source_id, analyses = search_engine.load_text(
-        db=db,
-        text=source.content,
-        source_name=source.name,
-        category_name=source.category
-    )
+    text_hash = content_hash(source.content)
+    duplicate = search_engine.find_duplicate(db, text_hash)
+    if duplicate:
+        return duplicate
+
+    try:
+        source_id, analyses = search_engine.load_text(
+            db=db,
+            text=source.content,
+            source_name=source.name,
+            category_name=source.category,
+            text_hash=text_hash
+        )
+    except DuplicateSourceError as e:
+        return e.source
 
     # Get the created source
     db_source = db.query(Source).filter(Source.id == source_id).first()
@@ -53,6 +65,17 @@ async def create_source(
     }
 
 
+def _duplicate_upload(duplicate: dict, filename: Optional[str]) -> dict:
+    """תשובת העלאה כפולה - The upload response for content already loaded"""
+    return {
+        "message": "הקובץ כבר נטען בעבר",
+        "source_id": duplicate["id"],
+        "word_count": duplicate["word_count"],
+        "filename": filename,
+        "duplicate": True
+    }
+
+
 @router.post("/upload")
 async def upload_file(
     file: UploadFile = File(...),
@@ -62,35 +85,43 @@ async def upload_file(
 ):
     """
     העלאת קובץ טקסט
-    Upload text file
+    Upload a text (UTF-8 or cp1255), DOCX or XLSX file. Words keep the
+    paragraph (DOCX), row (XLSX) or line they came from.
     """
-    # Read file content
-    content = await file.read()
-
-    # Try to decode as UTF-8
+    # Read and hash the file content, streamed and held to max_upload_size
     try:
-        text = content.decode('utf-8')
-    except UnicodeDecodeError:
-        try:
-            text = content.decode('utf-8-sig')
-        except UnicodeDecodeError:
-            text = content.decode('cp1255')  # Hebrew Windows encoding
+        ingested = ingest(file.file, file.filename)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    text, text_hash = ingested.text, ingested.text_hash
+
+    # The same content uploaded again returns the existing source
+    duplicate = search_engine.find_duplicate(db, text_hash)
+    if duplicate:
+        return _duplicate_upload(duplicate, file.filename)
 
     # Use filename as source name if not provided
     name = source_name or file.filename or "קובץ ללא שם"
 
-    source_id, analyses = search_engine.load_text(
-        db=db,
-        text=text,
-        source_name=name,
-        category_name=category
-    )
+    try:
+        source_id, analyses = search_engine.load_text(
+            db=db,
+            text=text,
+            source_name=name,
+            category_name=category,
+            text_hash=text_hash,
+            locations=ingested.locations
+        )
+    except DuplicateSourceError as e:
+        # Uploaded concurrently with the same content
+        return _duplicate_upload(e.source, file.filename)
 
     return {
         "message": "הקובץ נטען בהצלחה",
         "source_id": source_id,
         "word_count": len(analyses),
-        "filename": file.filename
+        "filename": file.filename,
+        "duplicate": False
     }
 
 
@@ -108,7 +139,7 @@ async def delete_source(source_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/categories")
-async def list_categories(db: Session = Depends(get_db)):
+async def list_categories(db: Session = Depends(get_read_db)):
     """
     קבלת רשימת קטגוריות
     Get list of categories
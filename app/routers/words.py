@@ -3,23 +3,44 @@ Word search and filter endpoints
 נקודות קצה לחיפוש וסינון מילים
 """
 
-from fastapi import APIRouter, Depends, Query, Response
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, RedirectResponse
 from sqlalchemy.orm import Session
 from typing import Optional
+import asyncio
 import math
+import time
 
+from app.config import settings
 from app.database import get_db
-from app.schemas import SearchFilters, SearchResponse, WordResponse
+from app.services.read_replica import get_read_db
+from app.schemas import (
+    SearchFilters, SearchResponse, WordResponse, PhraseSearchResponse, ConcordanceResponse,
+    SuggestResponse, FuzzyResponse
+)
 from app.services.search_engine import search_engine
-from app.services.excel_exporter import excel_exporter
+from app.services.pattern_search import PatternSyntaxError
+from app.services.phrase_search import phrase_search
+from app.services.suggest import suggest_index
+from app.services.fuzzy_search import fuzzy_index
+from app.services.export_jobs import export_jobs
+from app.routers.exports import job_response
 
 router = APIRouter(prefix="/api/words", tags=["words"])
 
+# Export polling interval: starts short, doubles up to the maximum
+EXPORT_POLL_SECONDS = 0.05
+EXPORT_POLL_MAX_SECONDS = 1.0
+
 
 @router.get("/search", response_model=SearchResponse)
 async def search_words(
     word: Optional[str] = Query(None, description="חיפוש מילה עם ניקוד"),
     word_plain: Optional[str] = Query(None, description="חיפוש מילה ללא ניקוד"),
+    fuzzy: Optional[float] = Query(None, ge=0, le=2, description="מרחק עריכה מקסימלי לחיפוש מקורב של word_plain"),
+    ends_with: Optional[str] = Query(None, description="מסתיים ב (עם או בלי ניקוד)"),
+    pattern_ends_with: Optional[str] = Query(None, description="תבנית ניקוד מסתיימת ב"),
+    nikud_pattern: Optional[str] = Query(None, description="תבנית ניקוד עם תווים כלליים"),
     syllable_type: Optional[str] = Query(None, description="סוג הברה"),
     has_shva: Optional[bool] = Query(None, description="יש שווא"),
     shva_type: Optional[str] = Query(None, description="סוג שווא"),
@@ -28,11 +49,12 @@ async def search_words(
     has_closed_syllable: Optional[bool] = Query(None, description="יש הברה סגורה"),
     source_id: Optional[int] = Query(None, description="מזהה מקור"),
     category_id: Optional[int] = Query(None, description="מזהה קטגוריה"),
+    rule_id: Optional[int] = Query(None, description="מזהה כלל ניקוד"),
     min_length: Optional[int] = Query(None, description="אורך מילה מינימלי"),
     max_length: Optional[int] = Query(None, description="אורך מילה מקסימלי"),
     page: int = Query(1, ge=1, description="מספר עמוד"),
     per_page: int = Query(50, ge=1, le=200, description="תוצאות לעמוד"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     חיפוש מילים לפי סינונים
@@ -41,6 +63,10 @@ async def search_words(
     filters = SearchFilters(
         word=word,
         word_plain=word_plain,
+        fuzzy=fuzzy,
+        ends_with=ends_with,
+        pattern_ends_with=pattern_ends_with,
+        nikud_pattern=nikud_pattern,
         syllable_type=syllable_type,
         has_shva=has_shva,
         shva_type=shva_type,
@@ -49,11 +75,15 @@ async def search_words(
         has_closed_syllable=has_closed_syllable,
         source_id=source_id,
         category_id=category_id,
+        rule_id=rule_id,
         min_length=min_length,
         max_length=max_length
     )
 
-    results, total = search_engine.search(db, filters, page, per_page)
+    try:
+        results, total = search_engine.search(db, filters, page, per_page)
+    except PatternSyntaxError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     pages = math.ceil(total / per_page) if total > 0 else 1
 
     return SearchResponse(
@@ -65,42 +95,164 @@ async def search_words(
     )
 
 
+@router.get("/concordance", response_model=ConcordanceResponse)
+async def word_concordance(
+    word: Optional[str] = Query(None, description="חיפוש מילה עם ניקוד"),
+    word_plain: Optional[str] = Query(None, description="חיפוש מילה ללא ניקוד"),
+    fuzzy: Optional[float] = Query(None, ge=0, le=2, description="מרחק עריכה מקסימלי לחיפוש מקורב של word_plain"),
+    ends_with: Optional[str] = Query(None, description="מסתיים ב (עם או בלי ניקוד)"),
+    pattern_ends_with: Optional[str] = Query(None, description="תבנית ניקוד מסתיימת ב"),
+    nikud_pattern: Optional[str] = Query(None, description="תבנית ניקוד עם תווים כלליים"),
+    syllable_type: Optional[str] = Query(None, description="סוג הברה"),
+    has_shva: Optional[bool] = Query(None, description="יש שווא"),
+    has_dagesh: Optional[bool] = Query(None, description="יש דגש"),
+    source_id: Optional[int] = Query(None, description="מזהה מקור"),
+    category_id: Optional[int] = Query(None, description="מזהה קטגוריה"),
+    rule_id: Optional[int] = Query(None, description="מזהה כלל ניקוד"),
+    chars: int = Query(40, ge=0, le=1000, description="תווי הקשר מכל צד"),
+    tokens: Optional[int] = Query(None, ge=1, le=50, description="מילות הקשר מכל צד (במקום תווים)"),
+    page: int = Query(1, ge=1, description="מספר עמוד"),
+    per_page: int = Query(100, ge=1, le=2000, description="תוצאות לעמוד"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    קונקורדנציה - מילת מפתח בהקשר
+    Keyword-in-context lines for the search hits, in source order
+    """
+    filters = SearchFilters(
+        word=word,
+        word_plain=word_plain,
+        fuzzy=fuzzy,
+        ends_with=ends_with,
+        pattern_ends_with=pattern_ends_with,
+        nikud_pattern=nikud_pattern,
+        syllable_type=syllable_type,
+        has_shva=has_shva,
+        has_dagesh=has_dagesh,
+        source_id=source_id,
+        category_id=category_id,
+        rule_id=rule_id
+    )
+
+    try:
+        results, total = search_engine.concordance(db, filters, page, per_page, chars, tokens)
+    except PatternSyntaxError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    pages = math.ceil(total / per_page) if total > 0 else 1
+
+    return ConcordanceResponse(
+        total=total,
+        page=page,
+        per_page=per_page,
+        pages=pages,
+        results=results
+    )
+
+
+@router.get("/phrase", response_model=PhraseSearchResponse)
+async def search_phrase(
+    q: str = Query(..., min_length=1, description="ביטוי לחיפוש (עם או בלי ניקוד)"),
+    distance: int = Query(1, ge=1, le=50, description="מרחק מקסימלי בין מילים עוקבות (1 - ביטוי מדויק)"),
+    source_id: Optional[int] = Query(None, description="מזהה מקור"),
+    page: int = Query(1, ge=1, description="מספר עמוד"),
+    per_page: int = Query(50, ge=1, le=200, description="תוצאות לעמוד"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    חיפוש ביטויים וקרבה
+    Phrase and proximity search
+    """
+    results, total = phrase_search.search(db, q, distance, source_id, page, per_page)
+    pages = math.ceil(total / per_page) if total > 0 else 1
+
+    return PhraseSearchResponse(
+        total=total,
+        page=page,
+        per_page=per_page,
+        pages=pages,
+        results=results
+    )
+
+
+@router.get("/suggest", response_model=SuggestResponse)
+async def suggest_words(
+    q: str = Query(..., min_length=1, max_length=100, description="קידומת להשלמה"),
+    limit: int = Query(10, ge=1, le=50, description="מספר הצעות"),
+    pointed: Optional[bool] = Query(None, description="הצעת צורות מנוקדות (ברירת מחדל: לפי הקידומת)"),
+    db: Session = Depends(get_db)
+):
+    """
+    השלמה אוטומטית
+    Most frequent forms starting with the prefix
+    """
+    return SuggestResponse(prefix=q, suggestions=suggest_index.suggest(db, q, limit, pointed))
+
+
+@router.get("/fuzzy", response_model=FuzzyResponse)
+async def fuzzy_words(
+    q: str = Query(..., min_length=1, max_length=100, description="מילה (ללא ניקוד)"),
+    max_distance: float = Query(2, ge=0, le=2, description="מרחק עריכה מקסימלי"),
+    limit: int = Query(20, ge=1, le=200, description="מספר תוצאות"),
+    db: Session = Depends(get_db)
+):
+    """
+    חיפוש מקורב ואותיות דומות
+    Plain forms close to the query, nearest first
+    """
+    return FuzzyResponse(query=q, matches=fuzzy_index.search(db, q, max_distance, limit))
+
+
 @router.get("/export")
 async def export_words(
     word: Optional[str] = Query(None),
     word_plain: Optional[str] = Query(None),
+    fuzzy: Optional[float] = Query(None, ge=0, le=2),
+    ends_with: Optional[str] = Query(None),
+    pattern_ends_with: Optional[str] = Query(None),
+    nikud_pattern: Optional[str] = Query(None),
     syllable_type: Optional[str] = Query(None),
     has_shva: Optional[bool] = Query(None),
     has_dagesh: Optional[bool] = Query(None),
     source_id: Optional[int] = Query(None),
     category_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    rule_id: Optional[int] = Query(None),
+    wait: float = Query(settings.export_wait_seconds, ge=0, le=300,
+                        description="שניות להמתנה לקובץ לפני החזרת מזהה עבודה"),
+    db: Session = Depends(get_read_db)
 ):
     """
     ייצוא תוצאות חיפוש לאקסל
-    Export search results to Excel
+    Export search results to Excel. The workbook is built in the background
+    (or found on disk, for the same filters and data): once it is ready -
+    within `wait` seconds - the response redirects to the file, otherwise
+    it is 202 with the job id to poll at /api/exports/{job_id}.
     """
     filters = SearchFilters(
         word=word,
         word_plain=word_plain,
+        fuzzy=fuzzy,
+        ends_with=ends_with,
+        pattern_ends_with=pattern_ends_with,
+        nikud_pattern=nikud_pattern,
         syllable_type=syllable_type,
         has_shva=has_shva,
         has_dagesh=has_dagesh,
         source_id=source_id,
-        category_id=category_id
-    )
-
-    # Get all results (no pagination for export)
-    results, _ = search_engine.search(db, filters, page=1, per_page=10000)
-
-    # Export to Excel
-    excel_bytes = excel_exporter.export_to_bytes(results)
-
-    return Response(
-        content=excel_bytes,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": "attachment; filename=nikud_results.xlsx"
-        }
+        category_id=category_id,
+        rule_id=rule_id
     )
 
+    job = export_jobs.request(db, filters)
+    # Polled with asyncio.sleep, so no thread is held while the workbook is
+    # built - here or by another worker process
+    deadline = time.monotonic() + wait
+    delay = EXPORT_POLL_SECONDS
+    while job.status == "running" and time.monotonic() < deadline:
+        await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+        delay = min(delay * 2, EXPORT_POLL_MAX_SECONDS)
+        job = export_jobs.get(job.job_id) or job
+    if job.status != "running":
+        if job.status == "failed":
+            raise HTTPException(status_code=job.error_status, detail=job.error)
+        return RedirectResponse(job_response(job).file_url, status_code=303)
+    return JSONResponse(job_response(job).model_dump(), status_code=202)
@@ -40,6 +40,7 @@ class SourceResponse(SourceBase):
     id: int
     created_at: datetime
     word_count: int = 0
+    duplicate: bool = False  # Same content as an already loaded source
     
     class Config:
         from_attributes = True
@@ -83,6 +84,8 @@ class WordAnalysisResult(WordBase):
 class WordResponse(WordAnalysisResult):
     id: int
     position: Optional[int] = None
+    paragraph: Optional[int] = None
+    sheet: Optional[str] = None
     context: Optional[str] = None
     source_name: Optional[str] = None
     category_name: Optional[str] = None
@@ -95,6 +98,10 @@ class WordResponse(WordAnalysisResult):
 class SearchFilters(BaseModel):
     word: Optional[str] = Field(None, description="חיפוש מילה עם ניקוד")
     word_plain: Optional[str] = Field(None, description="חיפוש מילה ללא ניקוד")
+    fuzzy: Optional[float] = Field(None, description="מרחק עריכה מקסימלי לחיפוש מקורב של word_plain")
+    ends_with: Optional[str] = Field(None, description="מסתיים ב (עם או בלי ניקוד)")
+    pattern_ends_with: Optional[str] = Field(None, description="תבנית ניקוד מסתיימת ב")
+    nikud_pattern: Optional[str] = Field(None, description="תבנית ניקוד עם תווים כלליים (? * [..] {n,m} +)")
     syllable_type: Optional[str] = Field(None, description="סוג הברה")
     has_shva: Optional[bool] = Field(None, description="יש שווא")
     shva_type: Optional[str] = Field(None, description="סוג שווא")
@@ -103,6 +110,7 @@ class SearchFilters(BaseModel):
     has_closed_syllable: Optional[bool] = Field(None, description="יש הברה סגורה")
     source_id: Optional[int] = Field(None, description="מזהה מקור")
     category_id: Optional[int] = Field(None, description="מזהה קטגוריה")
+    rule_id: Optional[int] = Field(None, description="מזהה כלל ניקוד")
     min_length: Optional[int] = Field(None, description="אורך מילה מינימלי")
     max_length: Optional[int] = Field(None, description="אורך מילה מקסימלי")
 
@@ -115,6 +123,90 @@ class SearchResponse(BaseModel):
     results: List[WordResponse]
 
 
+# Concordance schemas
+class ConcordanceLine(BaseModel):
+    id: int
+    source_id: int
+    source_name: Optional[str] = None
+    position: Optional[int] = None
+    paragraph: Optional[int] = None
+    sheet: Optional[str] = None
+    left: str
+    word: str
+    right: str
+
+
+class ConcordanceResponse(BaseModel):
+    total: int
+    page: int
+    per_page: int
+    pages: int
+    results: List[ConcordanceLine]
+
+
+# Phrase search schemas
+class PhraseMatch(BaseModel):
+    source_id: int
+    source_name: Optional[str] = None
+    start_position: int
+    end_position: int
+    words: List[str]
+    context: Optional[str] = None
+
+
+class PhraseSearchResponse(BaseModel):
+    total: int
+    page: int
+    per_page: int
+    pages: int
+    results: List[PhraseMatch]
+
+
+# Autocomplete schemas
+class Suggestion(BaseModel):
+    word: str
+    count: int
+
+
+class SuggestResponse(BaseModel):
+    prefix: str
+    suggestions: List[Suggestion]
+
+
+class FuzzyMatch(BaseModel):
+    word: str
+    distance: float
+    count: int
+
+
+class FuzzyResponse(BaseModel):
+    query: str
+    matches: List[FuzzyMatch]
+
+
+# Rule membership schemas
+class RuleCondition(BaseModel):
+    category: str
+    filter: str
+
+
+class RuleSummary(BaseModel):
+    id: int
+    conditions: List[RuleCondition]
+    result: Optional[str] = None
+    notes: Optional[str] = None
+    supported: bool
+    forms: int
+    words: int
+
+
+class RuleSourceCount(BaseModel):
+    source_id: Optional[int] = None
+    source_name: Optional[str] = None
+    words: int
+    forms: int
+
+
 # Statistics schemas
 class SyllableDistribution(BaseModel):
     type: str
@@ -146,8 +238,32 @@ class TextAnalysisResponse(BaseModel):
     message: str
 
 
+class ReanalysisStatus(BaseModel):
+    status: str  # idle, running, done, failed
+    version: int
+    forms_total: int
+    forms_done: int
+    forms_changed: int
+    forms_skipped: int
+    rows_updated: int
+    stale_rows: Optional[int] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+
+
 # Export schemas  
 class ExportRequest(BaseModel):
     filters: Optional[SearchFilters] = None
     format: str = Field("xlsx", description="פורמט הייצוא")
 
+
+class ExportJobResponse(BaseModel):
+    job_id: str
+    status: str  # running, done, failed
+    generation: int
+    rows: Optional[int] = None
+    bytes: Optional[int] = None
+    error: Optional[str] = None
+    status_url: str
+    file_url: str
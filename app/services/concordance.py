@@ -0,0 +1,172 @@
+"""
+קונקורדנציה - מילת מפתח בהקשר
+Keyword-in-context windows sliced from the stored source texts by offsets
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import Word
+from app.services.content_store import content_store
+from app.services.metrics import metrics, SQL_QUERY_SECONDS
+from app.services.nikud_analyzer import NikudMarks
+
+# חלונות באותו מקור שקרובים מזה נקראים כמחרוזת אחת
+MERGE_GAP = 4096
+
+_NEWLINES = str.maketrans("\r\n\t", "   ")
+_MARKS = "".join(NikudMarks.ALL_NIKUD)
+
+
+class Hit(NamedTuple):
+    id: int
+    source_id: int
+    position: Optional[int]
+    char_start: int
+    char_end: int
+
+
+class Window(NamedTuple):
+    left: str
+    keyword: str
+    right: str
+
+
+class Concordance:
+    """
+    קונקורדנציה - Windows around hits are read per source: nearby windows
+    are merged and the merged ranges are read from the content store, which
+    fetches only the chunks they cover, so no sentence text is stored per word.
+    """
+
+    def __init__(self, merge_gap: int = MERGE_GAP):
+        self.merge_gap = merge_gap
+
+    @staticmethod
+    def hits(rows: Iterable) -> List[Hit]:
+        """Rows with id, source_id, position, char_start, char_end that have offsets"""
+        return [Hit(r.id, r.source_id, r.position, r.char_start, r.char_end)
+                for r in rows if r.char_start is not None and r.source_id is not None]
+
+    def token_bounds(self, db: Session, hits: List[Hit], tokens: int) -> Dict[int, Tuple[int, int]]:
+        """
+        גבולות לפי מילים - Character range from `tokens` words before each hit
+        to `tokens` words after it. Positions within a source are consecutive,
+        so only the two edge words are read, through the (source_id, position) index.
+        """
+        bounds = {hit.id: (hit.char_start, hit.char_end) for hit in hits}
+        by_source: Dict[int, List[Hit]] = defaultdict(list)
+        for hit in hits:
+            if hit.position is not None:
+                by_source[hit.source_id].append(hit)
+        if not by_source or tokens <= 0:
+            return bounds
+
+        with metrics.timer(SQL_QUERY_SECONDS, "concordance_tokens"):
+            for source_id, source_hits in by_source.items():
+                last = db.execute(
+                    select(func.max(Word.position)).where(Word.source_id == source_id)
+                ).scalar() or 0
+                edges = {hit.id: (max(0, hit.position - tokens), min(last, hit.position + tokens))
+                         for hit in source_hits}
+                wanted = sorted({p for pair in edges.values() for p in pair})
+                offsets = {}
+                for start in range(0, len(wanted), 5000):
+                    offsets.update((r.position, (r.char_start, r.char_end)) for r in db.execute(
+                        select(Word.position, Word.char_start, Word.char_end)
+                        .where(Word.source_id == source_id,
+                               Word.position.in_(wanted[start:start + 5000]),
+                               Word.char_start.isnot(None))
+                    ))
+                for hit in source_hits:
+                    left, right = edges[hit.id]
+                    lo = offsets[left][0] if left in offsets else hit.char_start
+                    hi = offsets[right][1] if right in offsets else hit.char_end
+                    bounds[hit.id] = (min(lo, hit.char_start), max(hi, hit.char_end))
+        return bounds
+
+    @staticmethod
+    def char_bounds(hits: List[Hit], chars: int) -> Dict[int, Tuple[int, int]]:
+        """גבולות לפי תווים - `chars` characters on each side of every hit"""
+        return {hit.id: (max(0, hit.char_start - chars), hit.char_end + chars) for hit in hits}
+
+    def read(self, db: Session, ranges: Dict[int, List[Tuple[int, int]]]) -> Dict[int, List[Tuple[int, str]]]:
+        """
+        קריאת טווחים - For each source, the merged (start, text) pieces that
+        cover the requested character ranges; one query per source
+        """
+        chunks: Dict[int, List[Tuple[int, str]]] = {}
+        for source_id, spans in ranges.items():
+            merged: List[List[int]] = []
+            for lo, hi in sorted(spans):
+                if merged and lo - merged[-1][1] <= self.merge_gap:
+                    merged[-1][1] = max(merged[-1][1], hi)
+                else:
+                    merged.append([lo, hi])
+            texts = content_store.read_ranges(db, source_id, [(lo, hi) for lo, hi in merged])
+            chunks[source_id] = [(lo, text) for (lo, _), text in zip(merged, texts)]
+        return chunks
+
+    def windows(
+        self,
+        db: Session,
+        hits: List[Hit],
+        chars: Optional[int] = None,
+        tokens: Optional[int] = None
+    ) -> Dict[int, Window]:
+        """
+        חלונות הקשר - Left context, keyword and right context per hit id,
+        `tokens` words or else `chars` characters to each side
+        """
+        if not hits:
+            return {}
+        if tokens:
+            bounds = self.token_bounds(db, hits, tokens)
+        else:
+            bounds = self.char_bounds(hits, chars or 0)
+
+        ranges: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        for hit in hits:
+            ranges[hit.source_id].append(bounds[hit.id])
+        chunks = self.read(db, ranges)
+
+        result = {}
+        for hit in hits:
+            lo, hi = bounds[hit.id]
+            # The chunk that covers this range starts at or before lo
+            chunk = next((c for c in reversed(chunks[hit.source_id]) if c[0] <= lo), None)
+            if chunk is None:
+                continue
+            start, text = chunk
+
+            def part(a, b):
+                return text[a - start:b - start].translate(_NEWLINES)
+
+            # A character cut may land inside a letter's marks
+            result[hit.id] = Window(part(lo, hit.char_start).lstrip(_MARKS),
+                                    part(hit.char_start, hit.char_end),
+                                    part(hit.char_end, hi))
+        return result
+
+    def contexts(self, db: Session, rows: Iterable, chars: int = 60) -> Dict[int, str]:
+        """
+        הקשר לתוצאות חיפוש - Context strings for rows without a stored
+        context: `chars` characters to each side, cut back to whole words
+        """
+        hits = self.hits(rows)
+        contexts = {}
+        for word_id, window in self.windows(db, hits, chars=chars).items():
+            left, right = window.left, window.right
+            if len(left) == chars and " " in left:
+                left = left[left.index(" ") + 1:]
+            if len(right) == chars and " " in right:
+                right = right[:right.rindex(" ")]
+            contexts[word_id] = (left + window.keyword + right).strip()
+        return contexts
+
+
+# Singleton instance
+concordance = Concordance()
@@ -0,0 +1,59 @@
+"""
+טביעת תוכן של מקורות
+Content hashes of source texts, for detecting repeated uploads
+"""
+
+import hashlib
+
+from app.services.nikud_analyzer import MARK_RANK, canonicalize
+
+
+class ContentHasher:
+    """
+    גיבוב מצטבר - SHA-256 of the normalized text (canonical mark order,
+    LF line endings, no leading or trailing whitespace), fed in chunks. The
+    last letter of each chunk is held back with its marks, any trailing
+    whitespace and a CR before it, so a chunk boundary never changes the
+    result.
+    """
+
+    def __init__(self):
+        self._hash = hashlib.sha256()
+        self._carry = ""
+        self._started = False
+
+    def _feed(self, text: str):
+        text = canonicalize(text).replace("\r\n", "\n").replace("\r", "\n")
+        self._hash.update(text.encode("utf-8"))
+
+    def update(self, text: str) -> "ContentHasher":
+        text = self._carry + text
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                self._carry = ""
+                return self
+            self._started = True
+
+        cut = len(text.rstrip())
+        while cut > 0 and text[cut - 1] in MARK_RANK:
+            cut -= 1
+        cut = max(cut - 1, 0)
+        # A CR stays with the rest of its line ending, which may be a CRLF
+        # split by this boundary (the held-back "letter" can be the LF)
+        while cut > 0 and text[cut - 1] == "\r":
+            cut -= 1
+        self._feed(text[:cut])
+        self._carry = text[cut:]
+        return self
+
+    def hexdigest(self) -> str:
+        final = self._hash.copy()
+        tail = canonicalize(self._carry.rstrip()).replace("\r\n", "\n").replace("\r", "\n")
+        final.update(tail.encode("utf-8"))
+        return final.hexdigest()
+
+
+def content_hash(text: str) -> str:
+    """טביעת תוכן - Hash of a whole text, equal to hashing it in chunks"""
+    return ContentHasher().update(text).hexdigest()
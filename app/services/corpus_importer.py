@@ -0,0 +1,306 @@
+"""
+ייבוא מרוכז של חוברות אקסל מנותחות מראש
+Bulk import of pre-analyzed Excel workbooks (word lists and rule tables)
+"""
+
+import json
+import math
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from openpyxl import load_workbook
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models import Word, Source, Category, NikudRule, WordRule
+from app.services.nikud_analyzer import ANALYZER_VERSION, NikudAnalyzer, NikudMarks, WordAnalysis
+from app.services.pattern_search import pattern_index
+from app.services.phrase_search import phrase_search
+from app.services.suggest import suggest_index
+from app.services.content_hash import content_hash
+from app.services.search_engine import search_engine
+from app.services.content_store import content_store
+from app.services.rule_index import rule_index
+from app.services.generations import generations
+from app.services.partitions import word_partitions
+
+# עמודות חובה בגיליון מילים / כללים
+WORD_COLUMN = "מילים"
+RULE_COLUMNS = ("קטגוריה", "מסנן")
+
+# עמודות תנועה שנבדקות מול check_contains
+VOWEL_COLUMNS = ("קמץ", "פתח", "צירה", "סגול", "חיריק", "שורוק", "מלאופום", "חולם")
+
+# ערכי "שונות 1" מול המקרים המיוחדים של המנתח
+SPECIAL_CASE_COLUMN = {"קמץ המשתנה": "קמץ קטן", "פתח גנובה": "פתח גנובה"}
+
+# כותרות טבלת הכללים מול עמודות NikudRule
+RULE_FIELDS = {
+    "קטגוריה": "category", "מסנן": "filter",
+    "קטגוריה2": "category2", "מסנן2": "filter2",
+    "קטגוריה3": "category3", "מסנן3": "filter3",
+    "קטגוריה4": "category4", "מסנן4": "filter4",
+    "הערות": "notes",
+}
+
+
+def _text(value) -> Optional[str]:
+    """ערך תא כמחרוזת - Cell value as a stripped string (None for empty)"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+class CorpusImporter:
+    """ייבוא קורפוס מקבצי אקסל"""
+
+    def __init__(self, analyzer: NikudAnalyzer = None, batch_size: int = 2000):
+        self.analyzer = analyzer or NikudAnalyzer()
+        self.batch_size = batch_size
+
+    def iter_sheets(self, path: Path) -> Iterator[Tuple[str, Iterator[tuple]]]:
+        """
+        קריאת גיליונות במצב זרימה
+        Yield (sheet title, row iterator) using openpyxl's read-only mode
+        """
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                yield sheet.title, sheet.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    def cross_check(self, row: Dict[str, object], analysis: WordAnalysis) -> List[str]:
+        """
+        השוואת העמודות המחושבות מראש לתוצאת המנתח
+        Return the precomputed columns that disagree with the analyzer
+        """
+        word = analysis.word
+        mismatches = []
+
+        def check(column, actual, expected):
+            if column in row and expected is not None and expected != actual:
+                mismatches.append(column)
+
+        check("ללא ניקוד", analysis.word_plain, _text(row.get("ללא ניקוד")))
+
+        for column, actual in (("ספירת ש", analysis.word_plain.count('ש')),
+                               ("ספירת דגש", word.count(NikudMarks.DAGESH))):
+            value = row.get(column)
+            if isinstance(value, (int, float)):
+                check(column, actual, int(value))
+
+        check("פתוח/ סגור", analysis.syllable_type.value, _text(row.get("פתוח/ סגור")))
+        check("שווא", "יש" if analysis.has_shva else "אין", _text(row.get("שווא")))
+
+        # Only shva kinds the analyzer also produces are comparable
+        shva_kind = _text(row.get("סוג שווא"))
+        shva_values = {s.value for s in analysis.shva_types}
+        if "סוג שווא" in row and shva_kind and shva_kind in {
+                "נע", "נח", "נע ונח", "שני שווא נע", "שני שווא נח"}:
+            if shva_kind not in shva_values:
+                mismatches.append("סוג שווא")
+
+        if "שונות 1" in row:
+            expected = SPECIAL_CASE_COLUMN.get(_text(row.get("שונות 1")))
+            actual = [c for c in analysis.special_cases if c in SPECIAL_CASE_COLUMN.values()]
+            if (expected is None and actual) or (expected and expected not in actual):
+                mismatches.append("שונות 1")
+
+        for column in VOWEL_COLUMNS:
+            if column in row:
+                expected = _text(row.get(column)) == "יש"
+                if self.analyzer.check_contains(word, column) != expected:
+                    mismatches.append(column)
+
+        return mismatches
+
+    def _get_category_id(self, db: Session, name: Optional[str], cache: Dict[str, int]) -> Optional[int]:
+        if not name:
+            return None
+        if name not in cache:
+            category = db.query(Category).filter(Category.name == name).first()
+            if not category:
+                category = Category(name=name)
+                db.add(category)
+                db.flush()
+            cache[name] = category.id
+        return cache[name]
+
+    def import_words(
+        self,
+        db: Session,
+        path: Path,
+        header: tuple,
+        rows: Iterator[tuple],
+        category_name: Optional[str] = None,
+        sheet: Optional[str] = None
+    ) -> Dict:
+        """
+        ייבוא גיליון מילים
+        Import a word sheet. The source is keyed by file name and its words are
+        replaced, so running the import again yields the same rows.
+        """
+        columns = [_text(c) for c in header]
+        source = db.query(Source).filter(Source.file_path == path.name).first()
+        replaced = ({}, {})
+        if source:
+            replaced = suggest_index.source_counts(db, source.id)
+            db.query(Word).filter(Word.source_id == source.id).delete(synchronize_session=False)
+        else:
+            source = Source(id=word_partitions.reserve(db), name=path.stem, file_path=path.name)
+            db.add(source)
+            db.flush()
+
+        categories: Dict[str, int] = {}
+        dicts: Dict[str, dict] = {}
+        mismatches = Counter()
+        samples = []
+        words = []
+        batch = []
+        offset = 0  # Offsets into the stored content, one word per line
+
+        for number, values in enumerate(rows, start=2):  # Row 1 is the header
+            row = {c: v for c, v in zip(columns, values) if c}
+            word = _text(row.get(WORD_COLUMN))
+            if not word:
+                continue
+
+            analysis = self.analyzer.analyze_cached(word)
+            data = dicts.get(analysis.word)
+            if data is None:
+                data = dicts[analysis.word] = analysis.to_dict()
+
+            wrong = self.cross_check(row, analysis)
+            mismatches.update(wrong)
+            if wrong and len(samples) < 20:
+                samples.append({"word": word, "columns": wrong})
+
+            batch.append(dict(
+                data,
+                position=len(words),
+                char_start=offset,
+                char_end=offset + len(analysis.word),
+                paragraph=number,
+                sheet=sheet,
+                analyzer_version=ANALYZER_VERSION,
+                source_id=source.id,
+                category_id=self._get_category_id(
+                    db, _text(row.get("מקור")) or category_name, categories)
+            ))
+            words.append(analysis.word)
+            offset += len(analysis.word) + 1
+
+            if len(batch) >= self.batch_size:
+                db.execute(insert(Word), batch)
+                batch = []
+
+        if batch:
+            db.execute(insert(Word), batch)
+        pattern_index.register(db, (data["nikud_pattern"] for data in dicts.values()))
+        phrase_search.index_source(db, source.id, ((w, dicts[w]["word_plain"]) for w in words))
+
+        content = "\n".join(words)
+        content_store.write(db, source.id, content)
+        # The hash is unique: a text already stored by another source keeps it there
+        text_hash = content_hash(content)
+        duplicate = search_engine.find_duplicate(db, text_hash)
+        source.content_hash = text_hash if duplicate is None or duplicate["id"] == source.id else None
+        source.word_count = len(words)
+        rule_index.prune(db, replaced[1])
+        rule_index.register(db, dicts)
+        generations.bump(db)
+        db.commit()
+        suggest_index.remove_counts(*replaced)
+        pointed = Counter(words)
+        plain = Counter()
+        for word, count in pointed.items():
+            plain[dicts[word]["word_plain"]] += count
+        suggest_index.add_counts(plain, pointed)
+
+        return {
+            "source_id": source.id,
+            "words": len(words),
+            "mismatches": dict(mismatches),
+            "mismatch_samples": samples,
+        }
+
+    def import_rules(self, db: Session, header: tuple, rows: Iterator[tuple]) -> Dict:
+        """
+        ייבוא טבלת כללים
+        Import a rule table. The sheet may hold several sections, each starting
+        with its own header row; the rules table is replaced as a whole.
+        """
+        db.query(WordRule).delete(synchronize_session=False)
+        db.query(NikudRule).delete(synchronize_session=False)
+
+        columns = [_text(c) for c in header]
+        batch = []
+        for values in rows:
+            cells = [_text(v) for v in values]
+            if not any(cells):
+                continue
+            if cells[:2] == list(RULE_COLUMNS):
+                columns = cells  # Header of the next section
+                continue
+
+            # 'תוצאה' is the direct result in single-level sections and the
+            # final result in multi-level ones
+            multi_level = "קטגוריה2" in columns
+            rule = {"category": "", "filter": ""}
+            for column, value in zip(columns, cells):
+                if column == "תוצאה":
+                    rule["final_result" if multi_level else "result"] = value
+                elif column in RULE_FIELDS and value is not None:
+                    rule[RULE_FIELDS[column]] = value
+            batch.append(rule)
+
+        if batch:
+            db.execute(insert(NikudRule), batch)
+        db.commit()
+        memberships = rule_index.rebuild(db)
+        return {"rules": len(batch), "memberships": memberships}
+
+    def import_workbook(self, db: Session, path: Path, category_name: Optional[str] = None) -> Dict:
+        """
+        ייבוא חוברת עבודה - Import every recognized sheet of a workbook.
+        Word sheets start with a 'מילים' header followed by data rows; rule
+        sheets start with 'קטגוריה', 'מסנן'. Other sheets are skipped.
+        """
+        path = Path(path)
+        report = {"file": path.name, "sheets": {}}
+        for title, rows in self.iter_sheets(path):
+            header = next(rows, None)
+            if not header:
+                continue
+            names = [_text(c) for c in header]
+            if names[:2] == list(RULE_COLUMNS):
+                report["sheets"][title] = self.import_rules(db, header, rows)
+            elif names[0] == WORD_COLUMN and not report["sheets"]:
+                # Auxiliary sheets after the main word list only hold lookup values
+                report["sheets"][title] = self.import_words(
+                    db, path, header, rows, category_name, sheet=title)
+        return report
+
+    def import_rules_json(self, db: Session, path: Path) -> Dict:
+        """
+        ייבוא כללים מ-JSON - Import a rule table exported row by row from the
+        rules sheet (nikud_rules.json): the first row's keys are its header,
+        empty cells are NaN.
+        """
+        records = json.loads(Path(path).read_text(encoding="utf-8"))
+        if not records:
+            return {"rules": 0}
+        header = tuple(records[0])
+
+        def cell(value):
+            return None if isinstance(value, float) and math.isnan(value) else value
+
+        rows = (tuple(cell(record.get(key)) for key in header) for record in records)
+        return self.import_rules(db, header, rows)
+
+
+# Singleton instance
+corpus_importer = CorpusImporter()
@@ -11,6 +11,8 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.utils.dataframe import dataframe_to_rows
 
+from app.services.metrics import metrics, EXPORT_SECONDS, EXPORT_BYTES
+
 
 class ExcelExporter:
     """מחלקה לייצוא נתונים לאקסל"""
@@ -167,6 +169,13 @@ class ExcelExporter:
         ייצוא התוצאות לאקסל והחזרת bytes
         Export results to Excel and return bytes
         """
+        with metrics.timer(EXPORT_SECONDS):
+            content = self._export(results)
+        if metrics.enabled:
+            EXPORT_BYTES.observe(len(content))
+        return content
+
+    def _export(self, results: List[Dict]) -> bytes:
         df = self.prepare_dataframe(results)
 
         # Create workbook
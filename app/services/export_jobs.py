@@ -0,0 +1,368 @@
+"""
+ייצוא ברקע עם מטמון קבצים
+Export jobs: workbooks are built in the background and kept on local disk,
+keyed by the normalized filters and the words generation, so a repeated
+export is served from the file
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.schemas import SearchFilters
+from app.services.excel_exporter import ExcelExporter, excel_exporter
+from app.services.generations import generations
+from app.services.metrics import metrics
+from app.services.nikud_analyzer import canonicalize
+from app.services.read_replica import read_router
+from app.services.search_engine import search_engine
+
+logger = logging.getLogger(__name__)
+
+# Rows per export (the search has no pagination here)
+EXPORT_LIMIT = 10000
+# Bumped when the workbook layout changes, so older files are not served
+EXPORT_FORMAT = 1
+# A running marker older than this belongs to a build that died with its process
+STALE_MARKER_SECONDS = 600
+
+JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+POINTED_FILTERS = ("word", "word_plain", "ends_with")
+
+
+class ExportJob:
+    """עבודת ייצוא - One workbook being built (or built) for one key"""
+
+    def __init__(self, job_id: str, filters: Optional[SearchFilters], generation: int):
+        self.job_id = job_id
+        self.filters = filters  # None for a job read back from disk
+        self.generation = generation
+        self.status = "running"  # running, done, failed
+        self.rows: Optional[int] = None
+        self.bytes: Optional[int] = None
+        self.error: Optional[str] = None
+        self.error_status: Optional[int] = None
+        self.created_at = time.time()
+        self.finished = threading.Event()
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        return self.finished.wait(timeout)
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "generation": self.generation,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "error": self.error,
+        }
+
+
+class ExportJobs:
+    """
+    עבודות ייצוא - The job id is a hash of the normalized filters, the
+    words generation and the workbook format: the same export of the same
+    data always gets the same id, and any change to the words gives a new
+    one, so a file never needs invalidating. Files are written under a
+    temporary name and renamed, so a file that exists is complete; other
+    worker processes sharing the directory serve it too. A build claims
+    its id with a running marker (<id>.running, created exclusively), so
+    every process reports the job as running and none builds it twice; a
+    failed build leaves its error in the job's meta file. Only builds in
+    flight are kept in memory - finished jobs are read back from disk.
+    Once the directory holds more than max_bytes, the least recently
+    served files are removed.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, workers: int = 2,
+                 exporter: Optional[ExcelExporter] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.exporter = exporter or excel_exporter
+        self.jobs: Dict[str, ExportJob] = {}
+        self.hits = 0
+        self.builds = 0
+        self.failures = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export")
+
+    @staticmethod
+    def normalize(filters: SearchFilters) -> Dict:
+        """סינונים מנורמלים - Set filters only, pointed text in canonical order"""
+        normalized = {}
+        for name, value in filters.model_dump(exclude_none=True).items():
+            if isinstance(value, str):
+                value = value.strip()
+                if not value:
+                    continue
+                if name in POINTED_FILTERS:
+                    value = canonicalize(value)
+            normalized[name] = value
+        return normalized
+
+    def job_id(self, filters: SearchFilters, generation: int) -> str:
+        key = json.dumps({"filters": self.normalize(filters), "generation": generation,
+                          "format": EXPORT_FORMAT, "limit": EXPORT_LIMIT},
+                         sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+    def path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.xlsx"
+
+    def _meta_path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.json"
+
+    def _marker_path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.running"
+
+    def _marker_fresh(self, job_id: str) -> bool:
+        try:
+            return time.time() - self._marker_path(job_id).stat().st_mtime < STALE_MARKER_SECONDS
+        except FileNotFoundError:
+            return False
+
+    def _claim(self, job_id: str) -> bool:
+        """תפיסת בנייה - Create the running marker, unless a live build holds it"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        marker = self._marker_path(job_id)
+        for _ in range(2):
+            try:
+                os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                if self._marker_fresh(job_id):
+                    return False
+                try:
+                    marker.unlink()  # Stale - its build died
+                except FileNotFoundError:
+                    pass
+        return False
+
+    def _release(self, job_id: str):
+        with self._lock:
+            self.jobs.pop(job_id, None)
+        try:
+            self._marker_path(job_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    def request(self, db: Session, filters: SearchFilters) -> ExportJob:
+        """
+        בקשת ייצוא - The job for these filters at the current words
+        generation: finished if its file is on disk, otherwise running -
+        here or in another process - and started now if no one builds it
+        """
+        generation = generations.get(db)
+        job_id = self.job_id(filters, generation)
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                return job
+            if self.path(job_id).exists():
+                return self._from_disk(job_id)
+            job = ExportJob(job_id, filters, generation)
+            if not self._claim(job_id):
+                return job  # Built by another process; get() follows it
+            self.jobs[job_id] = job
+        self._executor.submit(self._build, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        """
+        מצב עבודה - A build of this process, or the state another process
+        left on disk: a file, a running marker or a failure
+        """
+        if not JOB_ID.match(job_id):
+            return None
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        return self._from_disk(job_id)
+
+    def _from_disk(self, job_id: str) -> Optional[ExportJob]:
+        if self.path(job_id).exists():
+            status = "done"
+        elif self._marker_fresh(job_id):
+            status = "running"
+        else:
+            status = None
+        meta = self._meta(job_id)
+        if status is None and meta.get("status") != "failed":
+            return None
+        job = ExportJob(job_id, None, meta.get("generation", 0))
+        if status == "done":
+            self._finish(job, meta)
+        elif status is None:
+            job.error, job.error_status = meta.get("error"), meta.get("error_status", 500)
+            job.status = "failed"
+            job.finished.set()
+        return job
+
+    def _meta(self, job_id: str) -> Dict:
+        try:
+            return json.loads(self._meta_path(job_id).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _finish(job: ExportJob, meta: Dict):
+        job.rows, job.bytes = meta.get("rows"), meta.get("bytes")
+        job.status = "done"
+        job.finished.set()
+
+    def _build(self, job: ExportJob):
+        # At least the generation the id was computed for
+        db = read_router.session(job.generation)
+        try:
+            results, _ = search_engine.search(db, job.filters, page=1, per_page=EXPORT_LIMIT)
+            content = self.exporter.export_to_bytes(results)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            meta = {"filters": self.normalize(job.filters), "generation": job.generation,
+                    "rows": len(results), "bytes": len(content), "built_at": time.time()}
+            self._write(self._meta_path(job.job_id), json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+            self._write(self.path(job.job_id), content)
+            self.builds += 1
+            self._finish(job, meta)
+            self.evict(keep=job.job_id)
+        except Exception as e:
+            self.failures += 1
+            job.error = str(e)
+            job.error_status = 400 if isinstance(e, ValueError) else 500
+            if job.error_status == 500:
+                logger.exception("export %s failed", job.job_id)
+            try:
+                self._write(self._meta_path(job.job_id), json.dumps(
+                    {"status": "failed", "generation": job.generation, "error": job.error,
+                     "error_status": job.error_status, "built_at": time.time()},
+                    ensure_ascii=False).encode("utf-8"))
+            except OSError:
+                logger.exception("export %s: failure not recorded", job.job_id)
+            job.status = "failed"
+            job.finished.set()
+        finally:
+            db.close()
+            self._release(job.job_id)
+
+    def _write(self, path: Path, content: bytes):
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as f:
+                f.write(content)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def served(self, job_id: str) -> Path:
+        """הגשה מהדיסק - Mark the file recently used and return its path"""
+        path = self.path(job_id)
+        self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """
+        פינוי - Remove the least recently served files until the directory
+        fits in max_bytes, and failure records, dead markers and the staged
+        files of dead builds once stale. Staged files still being written
+        count toward max_bytes.
+        """
+        stale = time.time() - STALE_MARKER_SECONDS
+        staged = 0
+        for path in self.directory.glob("*.tmp"):
+            try:
+                stat = path.stat()
+                if stat.st_mtime < stale:
+                    path.unlink()
+                else:
+                    staged += stat.st_size
+            except OSError:
+                pass  # Renamed or removed by another process
+        for path in list(self.directory.glob("*.running")) + list(self.directory.glob("*.json")):
+            try:
+                if path.stat().st_mtime < stale and not self.path(path.stem).exists():
+                    path.unlink()
+            except OSError:
+                pass  # Removed by another process
+        files = []
+        for path in self.directory.glob("*.xlsx"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Removed by another process
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = staged + sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path.stem == keep:
+                continue
+            for victim in (path, self._meta_path(path.stem)):
+                try:
+                    victim.unlink()
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+        self.evictions += removed
+        return removed
+
+    def stats(self) -> Dict:
+        sizes, staged = [], []
+        for pattern, found in (("*.xlsx", sizes), ("*.tmp", staged)):
+            for path in self.directory.glob(pattern):
+                try:
+                    found.append(path.stat().st_size)
+                except OSError:
+                    pass  # Renamed or removed meanwhile
+        return {
+            "directory": str(self.directory),
+            "files": len(sizes),
+            "bytes": sum(sizes) + sum(staged),
+            "max_bytes": self.max_bytes,
+            "running": sum(job.status == "running" for job in list(self.jobs.values())),
+            "hits": self.hits,
+            "builds": self.builds,
+            "failures": self.failures,
+            "evictions": self.evictions,
+        }
+
+    def collect(self) -> List[str]:
+        """מדדי Prometheus - Files served, built and evicted"""
+        stats = self.stats()
+        return [
+            "# TYPE nikud_export_cache_hits_total counter",
+            f"nikud_export_cache_hits_total {stats['hits']}",
+            "# TYPE nikud_export_builds_total counter",
+            f"nikud_export_builds_total {stats['builds']}",
+            "# TYPE nikud_export_failures_total counter",
+            f"nikud_export_failures_total {stats['failures']}",
+            "# TYPE nikud_export_evictions_total counter",
+            f"nikud_export_evictions_total {stats['evictions']}",
+            "# TYPE nikud_export_cache_bytes gauge",
+            f"nikud_export_cache_bytes {stats['bytes']}",
+        ]
+
+
+# Singleton instance
+export_jobs = ExportJobs(
+    Path(settings.export_dir or os.path.join(tempfile.gettempdir(), "nikud_exports")),
+    settings.export_cache_bytes, settings.export_workers)
+metrics.register_collector(export_jobs.collect)
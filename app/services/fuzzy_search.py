@@ -0,0 +1,240 @@
+"""
+חיפוש מקורב ואותיות דומות
+Fuzzy word_plain lookup: similar-letter classes and edit distance
+"""
+
+import sys
+import threading
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.generations import WORDS
+from app.services.invalidation import invalidation_bus
+from app.services.metrics import metrics
+from app.services.nikud_analyzer import remove_nikud
+from app.services.suggest import suggest_index
+
+# אותיות סופיות זהות לרגילות
+FINAL_FORMS = str.maketrans("ךםןףץ", "כמנפצ")
+
+
+class LetterCosts:
+    """
+    עלויות החלפה - Substitution costs between letters. Letters in a
+    confusable group cost that group's weight to swap; final forms cost
+    nothing; anything else costs 1. The skeleton maps every connected group
+    to one letter, for candidate lookup.
+    """
+
+    def __init__(self, groups: Dict[str, float]):
+        self.costs: Dict[Tuple[str, str], float] = {}
+        parent: Dict[str, str] = {}
+
+        def root(letter):
+            while parent.get(letter, letter) != letter:
+                letter = parent[letter]
+            return letter
+
+        for letters, cost in groups.items():
+            letters = letters.translate(FINAL_FORMS)
+            for a, b in combinations(letters, 2):
+                if a != b:
+                    for pair in ((a, b), (b, a)):
+                        self.costs[pair] = min(cost, self.costs.get(pair, 1.0))
+                    parent[root(b)] = root(a)
+        self.skeleton_table = str.maketrans({letter: root(letter) for letter in parent})
+
+    def skeleton(self, word: str) -> str:
+        return word.translate(FINAL_FORMS).translate(self.skeleton_table)
+
+    def distances(self, word: str, forms: List[str]) -> np.ndarray:
+        """
+        מרחק עריכה משוקלל - Weighted optimal-string-alignment distance
+        (insert, delete, substitute, swap adjacent letters) from the word to
+        every form. All forms advance together, one query letter at a time;
+        within a row, insertions are a running minimum.
+        """
+        word = word.translate(FINAL_FORMS)
+        if not forms or not word:
+            return np.array([float(len(form)) for form in forms])
+        forms = [form.translate(FINAL_FORMS) for form in forms]
+        width = max(map(len, forms))
+
+        # Code points -> small codes, so substitution costs are a table lookup
+        padded = "".join(form.ljust(width, "\0") for form in forms)
+        alphabet = sorted(set(padded) | set(word))
+        table = np.ones((len(alphabet), len(alphabet)))
+        np.fill_diagonal(table, 0.0)
+        index = {char: i for i, char in enumerate(alphabet)}
+        for (a, b), cost in self.costs.items():
+            if a in index and b in index:
+                table[index[a], index[b]] = cost
+        points = np.frombuffer(padded.encode("utf-32-le"), dtype="<u4").reshape(len(forms), width)
+        codes = np.searchsorted(np.array([ord(c) for c in alphabet], dtype=np.uint32), points)
+        query = [index[c] for c in word]
+
+        steps = np.arange(width + 1, dtype=float)
+        previous2 = None
+        previous = np.tile(steps, (len(forms), 1))
+        for i, letter in enumerate(query, 1):
+            best = np.minimum(previous[:, 1:] + 1, previous[:, :-1] + table[letter][codes])
+            if i > 1 and width > 1:
+                swapped = (codes[:, :-1] == letter) & (codes[:, 1:] == query[i - 2])
+                best[:, 1:] = np.where(swapped, np.minimum(best[:, 1:], previous2[:, :-2] + 1), best[:, 1:])
+            row = np.concatenate((np.full((len(forms), 1), float(i)), best), axis=1)
+            previous2, previous = previous, np.minimum.accumulate(row - steps, axis=1) + steps
+        return previous[np.arange(len(forms)), [len(form) for form in forms]]
+
+
+def deletions(word: str, depth: int) -> Set[str]:
+    """כל המחרוזות שמתקבלות במחיקת עד depth אותיות - Symmetric-delete keys"""
+    keys = {word}
+    level = {word}
+    for _ in range(depth):
+        level = {w[:i] + w[i + 1:] for w in level for i in range(len(w))}
+        keys |= level
+    return keys
+
+
+class FuzzyIndex:
+    """
+    אינדקס מקורב - Symmetric-deletion dictionary over the skeletons of the
+    distinct plain forms. A query's deletions are looked up directly, so
+    its cost depends on the query length and the number of near forms, not
+    on the size of the dictionary. Candidates are then checked with the
+    weighted distance. Words shorter than five letters allow one edit, since
+    at two edits nearly every short form would match. Forms and counts come
+    from the autocomplete index, which keeps this index current as sources
+    come and go.
+    """
+
+    def __init__(self, groups: Optional[Dict[str, float]] = None, max_distance: int = 2):
+        self.letters = LetterCosts(settings.fuzzy_letter_groups if groups is None else groups)
+        self.max_distance = max_distance
+        self.groups: Dict[str, Set[str]] = {}      # skeleton -> forms
+        self.deletes: Dict[str, List[str]] = {}    # deletion -> skeletons
+        self.built = False
+        self._lock = threading.Lock()
+
+    def _add(self, forms: Iterable[str]):
+        for form in forms:
+            skeleton = self.letters.skeleton(form)
+            group = self.groups.get(skeleton)
+            if group is None:
+                group = self.groups[skeleton] = set()
+                for key in deletions(skeleton, self.max_distance):
+                    skeletons = self.deletes.get(key)
+                    if skeletons is None:
+                        self.deletes[key] = [skeleton]
+                    else:
+                        skeletons.append(skeleton)
+            group.add(form)
+
+    def _remove(self, forms: Iterable[str]):
+        for form in forms:
+            skeleton = self.letters.skeleton(form)
+            group = self.groups.get(skeleton)
+            if group is None:
+                continue
+            group.discard(form)
+            if not group:
+                del self.groups[skeleton]
+                for key in deletions(skeleton, self.max_distance):
+                    skeletons = self.deletes.get(key)
+                    if skeletons is not None and skeleton in skeletons:
+                        skeletons.remove(skeleton)
+                        if not skeletons:
+                            del self.deletes[key]
+
+    def load(self, forms: Iterable[str]):
+        """בנייה מרשימת צורות - Replace the index with these forms"""
+        with self._lock:
+            self.groups, self.deletes = {}, {}
+            self._add(forms)
+            self.built = True
+
+    def build(self, db: Session):
+        suggest_index.ensure_built(db)
+        if suggest_index.shared is None:
+            self.load(list(suggest_index.plain.counts))
+
+    def refresh(self, db: Session, generation: int = None):
+        """שינוי בתהליך אחר - Reload from the autocomplete index, rebuilt just before"""
+        if self.built and suggest_index.shared is None:
+            self.load(list(suggest_index.plain.counts))
+
+    def update(self, added: List[str], removed: List[str]):
+        """שינוי באוצר המילים - Called by the autocomplete index"""
+        if not self.built or suggest_index.shared is not None:
+            return
+        with self._lock:
+            self._remove(removed)
+            self._add(added)
+
+    def search(self, db: Session, word: str, max_distance: Optional[float] = None,
+               limit: Optional[int] = None) -> List[Dict]:
+        """
+        חיפוש מקורב - Plain forms within `max_distance` of the word, nearest
+        first and then by occurrence count
+        """
+        word = remove_nikud(word).strip()
+        if not word:
+            return []
+        if not self.built or suggest_index.shared is not None:
+            self.build(db)
+        limit_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if len(word) < 5:
+            limit_distance = min(limit_distance, 1)
+
+        skeleton = self.letters.skeleton(word)
+        depth = int(limit_distance)
+        candidates: Set[str] = set()
+        for key in deletions(skeleton, depth):
+            candidates.update(self.deletes.get(key, ()))
+
+        forms = [form for candidate in candidates
+                 if abs(len(candidate) - len(skeleton)) <= depth
+                 for form in self.groups.get(candidate, ())]
+        counts = suggest_index.plain.counts
+        matches = [(float(distance), -counts.get(form, 0), form)
+                   for form, distance in zip(forms, self.letters.distances(word, forms))
+                   if distance <= limit_distance]
+        matches.sort()
+        return [{"word": form, "distance": distance, "count": -count}
+                for distance, count, form in matches[:limit]]
+
+    def forms(self, db: Session, word: str, max_distance: Optional[float] = None) -> List[str]:
+        """הצורות הקרובות בלבד - Matching forms, for the word_plain search filter"""
+        return [match["word"] for match in self.search(db, word, max_distance)]
+
+    def stats(self) -> Dict:
+        if suggest_index.shared is not None:
+            # Mapped tables - their pages belong to the snapshot file
+            return {"skeletons": len(self.groups), "deletes": len(self.deletes), "memory_bytes": 0}
+        size = sys.getsizeof(self.groups) + sys.getsizeof(self.deletes)
+        size += sum(sys.getsizeof(key) + sys.getsizeof(group) for key, group in self.groups.items())
+        size += sum(sys.getsizeof(key) + sys.getsizeof(group) for key, group in self.deletes.items())
+        return {"skeletons": len(self.groups), "deletes": len(self.deletes), "memory_bytes": size}
+
+    def collect(self) -> List[str]:
+        """מדדי Prometheus - Index size and memory footprint"""
+        if not self.built:
+            return []
+        stats = self.stats()
+        return [
+            "# TYPE nikud_fuzzy_deletes gauge",
+            f'nikud_fuzzy_deletes {stats["deletes"]}',
+            "# TYPE nikud_fuzzy_memory_bytes gauge",
+            f'nikud_fuzzy_memory_bytes {stats["memory_bytes"]}',
+        ]
+
+
+# Singleton instance
+fuzzy_index = FuzzyIndex(max_distance=settings.fuzzy_max_distance)
+suggest_index.listeners.append(fuzzy_index.update)
+invalidation_bus.subscribe(WORDS, fuzzy_index.refresh)  # After suggest_index.refresh
+metrics.register_collector(fuzzy_index.collect)
@@ -0,0 +1,47 @@
+"""
+מוני דורות
+Generation counters of the stored data, read by caches and snapshots to
+decide whether they must be rebuilt
+"""
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models import Generation
+from app.services.invalidation import invalidation_bus
+
+# מילים ושכבות הניתוח שלהן - Words, their forms and analyses
+WORDS = "words"
+
+
+class Generations:
+    """
+    מוני דורות - bump() is called next to every change, before the caller
+    commits, so the new number becomes visible together with the change
+    and is published to the other processes on commit
+    """
+
+    names = (WORDS,)
+
+    def ensure(self, db: Session):
+        """יצירת המונים החסרים - Called by init_db"""
+        existing = set(db.execute(select(Generation.name)).scalars())
+        for name in self.names:
+            if name not in existing:
+                db.add(Generation(name=name, value=0))
+        db.commit()
+
+    def bump(self, db: Session, name: str = WORDS) -> int:
+        """קידום - Increment a counter (no commit); returns the new value"""
+        db.execute(update(Generation).where(Generation.name == name)
+                   .values(value=Generation.value + 1))
+        value = self.get(db, name)  # The row stays locked until the commit
+        invalidation_bus.publish(db, name, value)
+        return value
+
+    def get(self, db: Session, name: str = WORDS) -> int:
+        return db.execute(select(Generation.value).where(Generation.name == name)).scalar() or 0
+
+
+# Singleton instance
+generations = Generations()
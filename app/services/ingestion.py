@@ -0,0 +1,251 @@
+"""
+קליטת קבצים
+Format-aware reading of uploaded files: plain text, DOCX paragraphs and
+XLSX rows, streamed and capped at the upload size limit
+"""
+
+import codecs
+import os
+import zipfile
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from xml.etree.ElementTree import ParseError, iterparse
+
+from openpyxl import load_workbook
+
+from app.config import settings
+from app.services.content_hash import ContentHasher
+
+READ_CHUNK_SIZE = 64 * 1024
+TEXT_ENCODINGS = ("utf-8-sig", "cp1255")  # cp1255 - Hebrew Windows encoding
+
+# WordprocessingML namespace
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_LINE_BREAKS = str.maketrans({"\r": " ", "\n": " ", "\v": " "})
+
+# Uncompressed XML is held to this many times the upload limit (markup
+# outweighs the text it carries) and to this many times the uploaded
+# archive's own size (text compresses well, empty markup far better) -
+# parsing costs per element, so an archive inflating past either is
+# rejected before (or while) it is parsed
+MARKUP_RATIO = 2
+INFLATION_RATIO = 50
+MIN_MARKUP_BYTES = 1024 * 1024
+
+
+class UploadError(ValueError):
+    """קובץ שלא ניתן לקלוט - Rejected upload, with the HTTP status to report"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Location(NamedTuple):
+    """מיקום בקובץ - Sheet (XLSX only) and paragraph or row number"""
+    sheet: Optional[str]
+    paragraph: int
+
+
+class IngestedText(NamedTuple):
+    text: str
+    text_hash: str
+    # Location of each line of `text`; None for plain text (line numbers)
+    locations: Optional[List[Location]]
+
+
+def _too_large(limit: int) -> UploadError:
+    return UploadError(f"הקובץ גדול מהמותר ({limit:,} בתים)", status_code=413)
+
+
+def _stream_size(stream: BinaryIO) -> int:
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def _check_size(stream: BinaryIO, limit: int):
+    """גודל הקובץ לפני פתיחתו - Archives are only opened when within the limit"""
+    if _stream_size(stream) > limit:
+        raise _too_large(limit)
+
+
+def _markup_cap(stream: BinaryIO, limit: int) -> int:
+    """תקרת XML - Uncompressed bytes an archive of this size may hold"""
+    return min(limit * MARKUP_RATIO, max(_stream_size(stream) * INFLATION_RATIO, MIN_MARKUP_BYTES))
+
+
+def read_text(stream: BinaryIO, limit: int) -> IngestedText:
+    """
+    קובץ טקסט - Decode chunk by chunk (UTF-8, else cp1255), hashing while
+    reading and stopping as soon as more than `limit` bytes were read
+    """
+    for encoding in TEXT_ENCODINGS:
+        stream.seek(0)
+        decoder = codecs.getincrementaldecoder(encoding)()
+        hasher = ContentHasher()
+        parts = []
+        size = 0
+        try:
+            while chunk := stream.read(READ_CHUNK_SIZE):
+                size += len(chunk)
+                if size > limit:
+                    raise _too_large(limit)
+                part = decoder.decode(chunk)
+                parts.append(part)
+                hasher.update(part)
+            part = decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            continue
+        parts.append(part)
+        hasher.update(part)
+        return IngestedText("".join(parts), hasher.hexdigest(), None)
+    raise UploadError("קידוד הקובץ אינו נתמך")
+
+
+class _MemberReader:
+    """
+    קריאה מוגבלת מהארכיון - A zip member read for parsing, failing once
+    more than `cap` uncompressed bytes came out of it
+    """
+
+    def __init__(self, member: BinaryIO, cap: int, limit: int):
+        self.member = member
+        self.cap = cap
+        self.limit = limit
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.member.read(size)
+        self.size += len(data)
+        if self.size > self.cap:
+            raise _too_large(self.limit)
+        return data
+
+
+def _check_inflated(archive: zipfile.ZipFile, names: Iterable[str], cap: int, limit: int):
+    """גודל אחרי פריסה - Declared uncompressed sizes against the markup cap"""
+    if sum(archive.getinfo(name).file_size for name in names) > cap:
+        raise _too_large(limit)
+
+
+def iter_docx_paragraphs(stream: BinaryIO, limit: int) -> Iterator[Tuple[Location, str]]:
+    """
+    פסקאות DOCX - Paragraphs of the document body in order, parsed as a
+    stream of XML events. Each paragraph is cleared once read and the body
+    is emptied after each of its children, so the document tree is never
+    built. Empty paragraphs are skipped but still counted. The document
+    XML is held to the markup cap, both as declared and as read.
+    """
+    cap = _markup_cap(stream, limit)
+    try:
+        archive = zipfile.ZipFile(stream)
+        _check_inflated(archive, ["word/document.xml"], cap, limit)
+        member = archive.open("word/document.xml")
+    except (zipfile.BadZipFile, KeyError):
+        raise UploadError("קובץ DOCX לא תקין")
+
+    number = 0
+    depth = 0
+    body = None
+    parts: List[str] = []
+    with archive, member:
+        try:
+            for event, element in iterparse(_MemberReader(member, cap, limit),
+                                            events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if element.tag == _W + "body":
+                        body = element
+                    continue
+                depth -= 1
+                tag = element.tag
+                if tag == _W + "t":
+                    parts.append(element.text or "")
+                elif tag in (_W + "tab", _W + "br", _W + "cr"):
+                    parts.append(" ")
+                elif tag == _W + "p":
+                    number += 1
+                    text = "".join(parts).strip()
+                    parts = []
+                    element.clear()
+                    if text:
+                        yield Location(None, number), text
+                if body is not None and depth == 2:
+                    body.clear()  # A child of the body (document > body > child) is done
+        except ParseError:
+            raise UploadError("קובץ DOCX לא תקין")
+
+
+def iter_xlsx_rows(stream: BinaryIO, limit: int) -> Iterator[Tuple[Location, str]]:
+    """
+    שורות XLSX - Non-empty rows of every sheet, cells joined by tabs, read
+    with openpyxl's read-only row iterator. The workbook's XML is held to
+    the markup cap before it is opened.
+    """
+    cap = _markup_cap(stream, limit)
+    try:
+        with zipfile.ZipFile(stream) as archive:
+            xml = [name for name in archive.namelist() if name.endswith(".xml")]
+            _check_inflated(archive, xml, cap, limit)
+        stream.seek(0)
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except UploadError:
+        raise
+    except (zipfile.BadZipFile, KeyError, OSError, ValueError):
+        raise UploadError("קובץ XLSX לא תקין")
+    try:
+        for sheet in workbook.worksheets:
+            for number, values in enumerate(sheet.iter_rows(values_only=True), start=1):
+                cells = [str(value).strip() for value in values if value is not None]
+                text = "\t".join(cell for cell in cells if cell)
+                if text:
+                    yield Location(sheet.title, number), text
+    finally:
+        workbook.close()
+
+
+def assemble(blocks: Iterator[Tuple[Location, str]], limit: int) -> IngestedText:
+    """
+    איסוף פסקאות לטקסט - One line per paragraph or row, hashed as it grows.
+    The extracted text is held to `limit` bytes too (the readers bound the
+    markup around it).
+    """
+    hasher = ContentHasher()
+    lines: List[str] = []
+    locations: List[Location] = []
+    size = 0
+    for location, text in blocks:
+        text = text.translate(_LINE_BREAKS)
+        size += len(text.encode("utf-8")) + 1
+        if size > limit:
+            raise _too_large(limit)
+        hasher.update("\n" + text if lines else text)
+        lines.append(text)
+        locations.append(location)
+    if not lines:
+        raise UploadError("לא נמצא טקסט בקובץ")
+    return IngestedText("\n".join(lines), hasher.hexdigest(), locations)
+
+
+READERS = {
+    ".docx": iter_docx_paragraphs,
+    ".xlsx": iter_xlsx_rows,
+}
+
+
+def ingest(stream: BinaryIO, filename: Optional[str], limit: Optional[int] = None) -> IngestedText:
+    """
+    קליטת קובץ לפי סוגו - Text, locations and content hash of an uploaded
+    file, chosen by its extension
+    """
+    limit = limit or settings.max_upload_size
+    extension = os.path.splitext(filename or "")[1].lower() or ".txt"
+    if extension not in settings.allowed_extensions:
+        raise UploadError(f"סוג קובץ לא נתמך: {extension}")
+
+    _check_size(stream, limit)
+    reader = READERS.get(extension)
+    if reader is None:
+        return read_text(stream, limit)
+    return assemble(reader(stream, limit), limit)
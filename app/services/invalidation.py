@@ -0,0 +1,203 @@
+"""
+אפיק ביטול מטמונים בין שרתים
+Invalidation bus: generation bumps committed by one process reach every
+other process (and node), which refreshes its in-memory state
+"""
+
+import logging
+import select as io_select
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.models import Generation
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# ערוץ ההודעות ב-PostgreSQL - NOTIFY channel, payload "<name>:<value>"
+CHANNEL = "nikud_generations"
+
+Handler = Callable[[Session, int], None]
+
+
+class InvalidationBus:
+    """
+    אפיק ביטול - Writers publish every generation bump: on PostgreSQL with
+    pg_notify in the bumping transaction, so the notification goes out
+    with the commit and never for a rollback. A background thread in every
+    process LISTENs (on other databases it polls the generations table)
+    and calls the handlers subscribed to that counter, in subscription
+    order, with a fresh session. A process skips the values it bumped
+    itself - its own state was updated along with the change.
+    """
+
+    def __init__(self, poll_seconds: float = 2.0):
+        self.poll_seconds = poll_seconds
+        self.handlers: Dict[str, List[Handler]] = {}
+        self.known: Dict[str, int] = {}
+        self.received = 0
+        self.applied = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._own: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def listening(self) -> bool:
+        return engine.dialect.name == "postgresql"
+
+    def subscribe(self, name: str, handler: Handler):
+        """הרשמה - Call handler(db, generation) when another process bumps `name`"""
+        self.handlers.setdefault(name, []).append(handler)
+
+    def publish(self, db: Session, name: str, value: int):
+        """פרסום - Called by Generations.bump inside the writer's transaction"""
+        with self._lock:
+            self._own.setdefault(name, set()).add(value)
+        db.info.setdefault("generation_bumps", []).append((name, value))
+        if self.listening:
+            db.execute(text("SELECT pg_notify(:channel, :payload)"),
+                       {"channel": CHANNEL, "payload": f"{name}:{value}"})
+
+    def _rolled_back(self, session: Session):
+        # A rolled-back value may be committed later by another process
+        bumps = session.info.pop("generation_bumps", None)
+        if bumps:
+            with self._lock:
+                for name, value in bumps:
+                    self._own.get(name, set()).discard(value)
+
+    def _committed(self, session: Session):
+        session.info.pop("generation_bumps", None)
+
+    def _deliver(self, name: str, values: List[int]):
+        """
+        מסירה - Values of `name` seen since the last delivery. Handlers run
+        once if any of them came from another process.
+        """
+        self.received += len(values)
+        with self._lock:
+            own = self._own.get(name, set())
+            known = self.known.get(name, 0)
+            # Bumps of one counter commit in order (the row stays locked
+            # until commit), so values up to the known one were delivered
+            foreign = [value for value in values if value > known and value not in own]
+            own.difference_update(values)
+            self.known[name] = max([known] + values)
+        if not foreign or not self.handlers.get(name):
+            return
+        db = SessionLocal()
+        try:
+            for handler in self.handlers[name]:
+                try:
+                    handler(db, max(foreign))
+                except Exception as e:
+                    db.rollback()
+                    self._failed(e)
+            self.applied += 1
+        finally:
+            db.close()
+
+    def _failed(self, error: Exception):
+        self.errors += 1
+        self.last_error = str(error)
+        logger.warning("invalidation bus: %s", error)
+
+    def poll(self):
+        """קריאת המונים - Deliver every counter that moved since the last read"""
+        db = SessionLocal()
+        try:
+            current = dict(db.execute(select(Generation.name, Generation.value)).all())
+        finally:
+            db.close()
+        for name, value in current.items():
+            known = self.known.get(name)
+            if known is None:
+                self.known[name] = value  # First read - nothing to invalidate yet
+            elif value > known:
+                self._deliver(name, list(range(known + 1, value + 1)))
+
+    def _listen(self):
+        raw = engine.raw_connection()
+        raw.detach()  # Never handed back to the pool in LISTEN state
+        try:
+            connection = raw.driver_connection
+            connection.autocommit = True
+            connection.cursor().execute(f"LISTEN {CHANNEL}")
+            self.poll()  # Bumps committed while not listening
+            while not self._stop.is_set():
+                if hasattr(connection, "poll"):  # psycopg2
+                    if io_select.select([connection], [], [], self.poll_seconds) == ([], [], []):
+                        continue
+                    connection.poll()
+                    notifies, connection.notifies[:] = list(connection.notifies), []
+                else:  # psycopg 3
+                    notifies = list(connection.notifies(timeout=self.poll_seconds))
+                for notify in notifies:
+                    name, _, value = notify.payload.rpartition(":")
+                    if value.isdigit():
+                        self._deliver(name, [int(value)])
+        finally:
+            raw.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.listening:
+                    self._listen()
+                else:
+                    self.poll()
+                    self._stop.wait(self.poll_seconds)
+            except Exception as e:
+                self._failed(e)
+                self._stop.wait(self.poll_seconds)
+
+    def start(self):
+        """הפעלה - Start the subscriber thread (once per process)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.poll()  # Baseline, so changes from now on are delivered
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="invalidation-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        return {
+            "mode": "listen" if self.listening else "poll",
+            "running": self._thread is not None and self._thread.is_alive(),
+            "generations": dict(self.known),
+            "received": self.received,
+            "applied": self.applied,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    def collect(self) -> List[str]:
+        """מדדי Prometheus - Notifications received and applied"""
+        return [
+            "# TYPE nikud_invalidations_received_total counter",
+            f"nikud_invalidations_received_total {self.received}",
+            "# TYPE nikud_invalidations_applied_total counter",
+            f"nikud_invalidations_applied_total {self.applied}",
+            "# TYPE nikud_invalidation_errors_total counter",
+            f"nikud_invalidation_errors_total {self.errors}",
+        ]
+
+
+# Singleton instance
+invalidation_bus = InvalidationBus(settings.invalidation_poll_seconds)
+event.listen(Session, "after_commit", invalidation_bus._committed)
+event.listen(Session, "after_rollback", invalidation_bus._rolled_back)
+metrics.register_collector(invalidation_bus.collect)
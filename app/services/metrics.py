@@ -0,0 +1,193 @@
+"""
+מדדי ביצועים בפורמט Prometheus
+Lightweight Prometheus metrics: histograms, counters and collectors
+"""
+
+import threading
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from app.config import settings
+
+# גבולות ברירת מחדל בשניות
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WORD_BUCKETS = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.01)
+BYTES_BUCKETS = (10_000, 100_000, 1_000_000, 5_000_000, 20_000_000, 100_000_000)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """היסטוגרמה מצטברת - Cumulative histogram, optionally labelled"""
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = DEFAULT_BUCKETS,
+                 labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = labelnames
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [bucket counts..., +Inf count, sum]
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    """מונה - Monotonic counter, optionally labelled"""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *labels: str):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class _Timer:
+    """מדידת זמן לבלוק - Context manager observing elapsed seconds"""
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(perf_counter() - self.started, *self.labels)
+        return False
+
+
+class _NullTimer:
+    """טיימר ריק כשהמדדים כבויים - No-op timer used when metrics are disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """רישום מדדים"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: List = []
+        self._collectors: List[Callable[[], List[str]]] = []
+        self._caches: Dict[str, Callable] = {}
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], List[str]]):
+        """מדדים המחושבים בזמן הגרידה - Lines computed at scrape time"""
+        self._collectors.append(collector)
+
+    def register_cache(self, name: str, cache_info: Callable):
+        """
+        רישום מטמון - Expose hits, misses and size of a cache whose
+        cache_info() returns an lru_cache-style (hits, misses, currsize)
+        """
+        self._caches[name] = cache_info
+
+    def _render_caches(self) -> List[str]:
+        if not self._caches:
+            return []
+        infos = [(name, info()) for name, info in self._caches.items()]
+        lines = []
+        for metric, kind, field in (("nikud_cache_hits_total", "counter", "hits"),
+                                    ("nikud_cache_misses_total", "counter", "misses"),
+                                    ("nikud_cache_size", "gauge", "currsize")):
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, info in infos:
+                lines.append(f'{metric}{{cache="{name}"}} {getattr(info, field)}')
+        return lines
+
+    def timer(self, histogram: Histogram, *labels: str):
+        """
+        מדידת זמן - Time a block into the histogram; a shared no-op object
+        is returned when metrics are disabled.
+        """
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(histogram, labels)
+
+    def render(self) -> str:
+        """פורמט טקסט של Prometheus - Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        lines.extend(self._render_caches())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+metrics = MetricsRegistry(enabled=settings.metrics_enabled)
+
+# Hot-path metrics
+ANALYZE_WORD_SECONDS = metrics.histogram(
+    "nikud_analyze_word_seconds", "Time to analyze one word", WORD_BUCKETS)
+LOAD_TEXT_PHASE_SECONDS = metrics.histogram(
+    "nikud_load_text_phase_seconds", "load_text time per phase", labelnames=("phase",))
+SQL_QUERY_SECONDS = metrics.histogram(
+    "nikud_sql_query_seconds", "SearchEngine query time", labelnames=("query",))
+EXPORT_SECONDS = metrics.histogram(
+    "nikud_export_seconds", "Excel export duration")
+EXPORT_BYTES = metrics.histogram(
+    "nikud_export_bytes", "Excel export size in bytes", BYTES_BUCKETS)
+
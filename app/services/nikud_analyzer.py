@@ -3,10 +3,25 @@
 Nikud Analyzer Module for Hebrew Text
 """
 
-from typing import List, Set
-from dataclasses import dataclass
+import re
+import sys
+import unicodedata
+from array import array
+from collections.abc import Sequence
+from functools import lru_cache
+from itertools import product
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set
 from enum import Enum
 
+import numpy as np
+
+from app.services.metrics import metrics, ANALYZE_WORD_SECONDS
+
+# גרסת כללי הניתוח - Stamped on stored words. Bump it whenever a rule change
+# alters analyses (shva classification, kamatz katan, ...); stored rows of an
+# older version are then brought up to date by the re-analysis job.
+ANALYZER_VERSION = 1
+
 
 class NikudMarks:
     """סימני ניקוד בעברית"""
@@ -61,31 +76,294 @@ class ShvaType(Enum):
     NA_AND_NAH = "נע ונח"
 
 
-@dataclass
-class WordAnalysis:
-    """תוצאת ניתוח מילה"""
+# טבלאות מחושבות מראש - Precomputed lookup tables
+# כל סימן ניקוד מקבל ביט קבוע לפי סדר נקודות הקוד
+MARK_ORDER = tuple(sorted(NikudMarks.ALL_NIKUD))
+MARK_BITS: Dict[str, int] = {mark: 1 << i for i, mark in enumerate(MARK_ORDER)}
+
+# תו בתבנית הניקוד לכל אות/סימן
+PATTERN_CHARS: Dict[str, str] = {letter: 'ל' for letter in NikudMarks.HEBREW_LETTERS}
+for _mark in NikudMarks.ALL_NIKUD:
+    if _mark == NikudMarks.SHVA:
+        PATTERN_CHARS[_mark] = 'ש'
+    elif _mark == NikudMarks.DAGESH:
+        PATTERN_CHARS[_mark] = 'ד'
+    elif _mark in NikudMarks.VOWELS:
+        PATTERN_CHARS[_mark] = 'ת'
+    elif _mark in NikudMarks.HATAF_VOWELS:
+        PATTERN_CHARS[_mark] = 'ח'
+    else:
+        PATTERN_CHARS[_mark] = 'נ'
+
+# קודים מספריים קטנים לערכי enum
+SYLLABLE_TYPES = tuple(SyllableType)
+SYLLABLE_CODES = {s: i for i, s in enumerate(SYLLABLE_TYPES)}
+SHVA_TYPES = tuple(ShvaType)
+SHVA_CODES = {s: i for i, s in enumerate(SHVA_TYPES)}
+SPECIAL_CASES = ("קמץ קטן", "פתח גנובה", "שני שוואים")
+SPECIAL_CASE_BITS = {case: 1 << i for i, case in enumerate(SPECIAL_CASES)}
+
+# דגלים בוליאניים
+FLAG_SHVA = 1
+FLAG_DAGESH = 2
+
+
+# מפרידי מילים
+SEPARATORS = ' \t\n\r,.;:!?()[]{}"\'\u05C3\u05BE\u2013\u2014\u2022\u00B7\u05F4\u05F3'
+
+# A token is a maximal run of non-separators. Characters that are neither
+# letters nor nikud (cantillation, digits, Latin) are dropped without
+# splitting the word, and runs without a letter are skipped.
+_LETTERS = ''.join(sorted(NikudMarks.HEBREW_LETTERS))
+_NIKUD = ''.join(sorted(NikudMarks.ALL_NIKUD))
+_TOKEN_RE = re.compile('[^' + re.escape(SEPARATORS) + ']+')
+_WORD_RE = re.compile('[' + _NIKUD + ']*[' + _LETTERS + '][' + _LETTERS + _NIKUD + ']*')
+_DROP_RE = re.compile('[^' + re.escape(SEPARATORS) + _LETTERS + _NIKUD + ']+')
+_NON_WORD_RE = re.compile('[^' + _LETTERS + _NIKUD + ']+')
+_LETTER_RE = re.compile('[' + _LETTERS + ']')
+
+# טבלת translate להסרת ניקוד
+NIKUD_DELETE_TABLE = str.maketrans('', '', ''.join(NikudMarks.ALL_NIKUD))
+
+
+class Token(NamedTuple):
+    """מילה ומיקומה בטקסט - A word and its [start, end) offsets in the text"""
     word: str
-    word_plain: str  # ללא ניקוד
-    nikud_pattern: str
-    syllable_type: SyllableType
-    has_shva: bool
-    shva_types: List[ShvaType]
-    nikud_marks: Set[str]
-    has_dagesh: bool
-    has_open_syllable: bool
-    has_closed_syllable: bool
-    special_cases: List[str]  # מקרים מיוחדים
-    
+    start: int
+    end: int
+
+
+def iter_tokens(text: str) -> Iterator[Token]:
+    """פירוק טקסט למילים עם מיקומים - Yield Hebrew words with their offsets"""
+    if not _DROP_RE.search(text):
+        # Only letters, nikud and separators: every word is a plain match
+        for match in _WORD_RE.finditer(text):
+            yield Token(match.group(), match.start(), match.end())
+        return
+
+    non_word = _NON_WORD_RE
+    has_letter = _LETTER_RE.search
+    for match in _TOKEN_RE.finditer(text):
+        word = match.group()
+        if non_word.search(word):
+            word = non_word.sub('', word)
+        if has_letter(word):
+            yield Token(word, match.start(), match.end())
+
+
+def tokenize(text: str) -> List[str]:
+    """פירוק טקסט למילים - Hebrew words of the text, in order"""
+    return _WORD_RE.findall(_DROP_RE.sub('', text))
+
+
+def remove_nikud(text: str) -> str:
+    """הסרת ניקוד מטקסט"""
+    return text.translate(NIKUD_DELETE_TABLE)
+
+
+# סדר קנוני של הסימנים על אות - Canonical order of the marks on a letter:
+# shin/sin dot, dagesh, rafe, vowel or shva, meteg, then anything else
+# (cantillation) in its original order. NFC and NFD texts differ only in this
+# order, since Hebrew has no precomposed letters outside the presentation forms.
+_COMBINING = ''.join(chr(c) for c in range(0x0591, 0x05C8)
+                     if unicodedata.combining(chr(c)) or chr(c) == '\u05C7')
+MARK_RANK: Dict[str, int] = {mark: 5 for mark in _COMBINING}
+MARK_RANK.update({NikudMarks.SHIN_DOT: 0, NikudMarks.SIN_DOT: 0, NikudMarks.DAGESH: 1,
+                  NikudMarks.RAFE: 2, NikudMarks.METEG: 4, '\u05C7': 3})
+for _mark in {NikudMarks.SHVA} | NikudMarks.VOWELS | NikudMarks.HATAF_VOWELS:
+    MARK_RANK[_mark] = 3
+
+# Presentation forms (e.g. U+FB2C) are decomposed to letter + marks
+_PRESENTATION_TABLE = str.maketrans({
+    chr(c): unicodedata.normalize('NFD', chr(c)) for c in range(0xFB1D, 0xFB50)
+    if unicodedata.normalize('NFD', chr(c)) != chr(c)
+})
+_PRESENTATION_RE = re.compile('[\uFB1D-\uFB4F]')
+
+
+def _canonical_run(run: str) -> str:
+    return ''.join(sorted(run, key=MARK_RANK.__getitem__))
+
+
+# Every run of two or three nikud marks, precomputed
+_CANONICAL_RUNS: Dict[str, str] = {
+    ''.join(run): _canonical_run(''.join(run))
+    for length in (2, 3) for run in product(sorted(NikudMarks.ALL_NIKUD), repeat=length)
+}
+_MARK_RUN_RE = re.compile('[' + _COMBINING + ']{2,}')
+# Two adjacent marks out of order - texts without one are already canonical
+_UNORDERED_RE = re.compile(
+    '(?=[' + ''.join(m for m in _COMBINING if MARK_RANK[m]) + '][' + _COMBINING + '])(?:'
+    + '|'.join('[' + ''.join(m for m in _COMBINING if MARK_RANK[m] == rank) + ']'
+               '[' + ''.join(m for m in _COMBINING if MARK_RANK[m] < rank) + ']'
+               for rank in range(1, 6))
+    + ')')
+
+
+# Long texts are checked with a rank per code point of the Hebrew block
+_RANK_TABLE = np.full(0x71, -1, dtype=np.int8)  # last slot: outside the block
+for _mark, _rank in MARK_RANK.items():
+    _RANK_TABLE[ord(_mark) - 0x0590] = _rank
+_ARRAY_CHECK_CHARS = 4096
+
+
+def _is_canonical(text: str) -> bool:
+    if len(text) < _ARRAY_CHECK_CHARS:
+        return not _UNORDERED_RE.search(text)
+    offsets = np.frombuffer(text.encode('utf-32-le'), dtype='<u4') - np.uint32(0x0590)
+    ranks = _RANK_TABLE[np.minimum(offsets, 0x70)]
+    return not np.any((ranks[1:] >= 0) & (ranks[:-1] > ranks[1:]))
+
+
+def _reorder(match) -> str:
+    run = match.group()
+    return _CANONICAL_RUNS.get(run) or _canonical_run(run)
+
+
+def canonicalize(text: str) -> str:
+    """
+    סדר סימנים קנוני - Put the marks of every letter in the canonical order,
+    so the same pointed word is always the same string
+    """
+    if _PRESENTATION_RE.search(text):
+        text = text.translate(_PRESENTATION_TABLE)
+    if _is_canonical(text):
+        return text
+    return _MARK_RUN_RE.sub(_reorder, text)
+
+
+def marks_from_bits(bits: int) -> List[str]:
+    """פענוח מסכת ביטים לרשימת סימני ניקוד"""
+    return [mark for mark in MARK_ORDER if bits & MARK_BITS[mark]]
+
+
+class WordAnalysis:
+    """
+    תוצאת ניתוח מילה
+    Compact word analysis: interned strings, small-int codes and bitmasks.
+    The enum/set/list views are decoded on access.
+    """
+    __slots__ = ("word", "word_plain", "nikud_pattern",
+                 "syllable_code", "shva_codes", "mark_bits", "flags", "special_bits")
+
+    def __init__(
+        self,
+        word: str,
+        word_plain: str,
+        nikud_pattern: str,
+        syllable_type: SyllableType,
+        has_shva: bool,
+        shva_types: List[ShvaType],
+        nikud_marks: Set[str],
+        has_dagesh: bool,
+        has_open_syllable: bool = False,
+        has_closed_syllable: bool = False,
+        special_cases: Optional[List[str]] = None
+    ):
+        # has_open_syllable / has_closed_syllable are derived from syllable_type
+        mark_bits = 0
+        for mark in nikud_marks:
+            mark_bits |= MARK_BITS[mark]
+        special_bits = 0
+        for case in special_cases or []:
+            special_bits |= SPECIAL_CASE_BITS[case]
+        self._set(
+            word, word_plain, nikud_pattern,
+            SYLLABLE_CODES[syllable_type],
+            bytes(SHVA_CODES[s] for s in shva_types),
+            mark_bits,
+            (FLAG_SHVA if has_shva else 0) | (FLAG_DAGESH if has_dagesh else 0),
+            special_bits
+        )
+
+    def _set(self, word, word_plain, nikud_pattern, syllable_code,
+             shva_codes, mark_bits, flags, special_bits):
+        self.word = sys.intern(word)
+        self.word_plain = sys.intern(word_plain)
+        self.nikud_pattern = sys.intern(nikud_pattern)
+        self.syllable_code = syllable_code
+        self.shva_codes = shva_codes
+        self.mark_bits = mark_bits
+        self.flags = flags
+        self.special_bits = special_bits
+
+    @classmethod
+    def from_codes(
+        cls,
+        word: str,
+        word_plain: str,
+        nikud_pattern: str,
+        syllable_code: int,
+        shva_codes: bytes,
+        mark_bits: int,
+        flags: int,
+        special_bits: int
+    ) -> "WordAnalysis":
+        """בנייה ישירה מקודים - Build from already encoded values"""
+        analysis = cls.__new__(cls)
+        analysis._set(word, word_plain, nikud_pattern, syllable_code,
+                      shva_codes, mark_bits, flags, special_bits)
+        return analysis
+
+    @property
+    def syllable_type(self) -> SyllableType:
+        return SYLLABLE_TYPES[self.syllable_code]
+
+    @property
+    def shva_types(self) -> List[ShvaType]:
+        return [SHVA_TYPES[c] for c in self.shva_codes]
+
+    @property
+    def nikud_marks(self) -> Set[str]:
+        return set(marks_from_bits(self.mark_bits))
+
+    @property
+    def has_shva(self) -> bool:
+        return bool(self.flags & FLAG_SHVA)
+
+    @property
+    def has_dagesh(self) -> bool:
+        return bool(self.flags & FLAG_DAGESH)
+
+    @property
+    def has_open_syllable(self) -> bool:
+        return self.syllable_code == SYLLABLE_CODES[SyllableType.OPEN]
+
+    @property
+    def has_closed_syllable(self) -> bool:
+        return self.syllable_code == SYLLABLE_CODES[SyllableType.CLOSED]
+
+    @property
+    def special_cases(self) -> List[str]:
+        return [case for case in SPECIAL_CASES if self.special_bits & SPECIAL_CASE_BITS[case]]
+
+    def codes(self) -> tuple:
+        """הייצוג המקודד - Encoded representation"""
+        return (self.word, self.word_plain, self.nikud_pattern, self.syllable_code,
+                self.shva_codes, self.mark_bits, self.flags, self.special_bits)
+
+    def __eq__(self, other):
+        if not isinstance(other, WordAnalysis):
+            return NotImplemented
+        return self.codes() == other.codes()
+
+    def __hash__(self):
+        return hash(self.codes())
+
+    def __repr__(self):
+        return (f"WordAnalysis(word='{self.word}', syllable_type={self.syllable_type}, "
+                f"shva_types={self.shva_types})")
+
     def to_dict(self) -> dict:
         """Convert to dictionary for API response"""
         return {
             "word": self.word,
             "word_plain": self.word_plain,
             "nikud_pattern": self.nikud_pattern,
-            "syllable_type": self.syllable_type.value,
+            "syllable_type": SYLLABLE_TYPES[self.syllable_code].value,
             "has_shva": self.has_shva,
-            "shva_types": [s.value for s in self.shva_types],
-            "nikud_marks": list(self.nikud_marks),
+            "shva_types": [SHVA_TYPES[c].value for c in self.shva_codes],
+            "nikud_marks": marks_from_bits(self.mark_bits),
             "has_dagesh": self.has_dagesh,
             "has_open_syllable": self.has_open_syllable,
             "has_closed_syllable": self.has_closed_syllable,
@@ -93,38 +371,96 @@ class WordAnalysis:
         }
 
 
+class AnalysisBatch(Sequence):
+    """
+    ניתוח טקסט שלם במבנה דחוס
+    Array-backed analysis of a whole text: each distinct form is analyzed
+    and stored once, tokens are an array of indexes into the form table.
+    """
+    __slots__ = ("forms", "form_ids", "_lookup", "_dicts")
+
+    def __init__(self):
+        self.forms: List[WordAnalysis] = []
+        self.form_ids = array('I')
+        self._lookup: Dict[str, int] = {}
+        self._dicts: Dict[int, dict] = {}
+
+    def form_id(self, word: str) -> Optional[int]:
+        """מזהה הצורה אם כבר נותחה - Form id if already analyzed"""
+        return self._lookup.get(word)
+
+    def add_form(self, analysis: WordAnalysis) -> int:
+        """הוספת צורה חדשה לטבלה - Add a distinct form"""
+        form_id = len(self.forms)
+        self.forms.append(analysis)
+        self._lookup[analysis.word] = form_id
+        return form_id
+
+    def alias(self, word: str, form_id: int):
+        """כתיב נוסף של צורה קיימת - Another spelling (mark order) of a form"""
+        self._lookup[word] = form_id
+
+    def append(self, form_id: int):
+        """הוספת מופע - Append a token occurrence"""
+        self.form_ids.append(form_id)
+
+    def __len__(self) -> int:
+        return len(self.form_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.forms[i] for i in self.form_ids[index]]
+        return self.forms[self.form_ids[index]]
+
+    def __iter__(self) -> Iterator[WordAnalysis]:
+        forms = self.forms
+        for form_id in self.form_ids:
+            yield forms[form_id]
+
+    def counts(self) -> List[int]:
+        """מספר מופעים לכל צורה - Occurrence count per form id"""
+        counts = [0] * len(self.forms)
+        for form_id in self.form_ids:
+            counts[form_id] += 1
+        return counts
+
+    def iter_dicts(self) -> Iterator[dict]:
+        """
+        המרה עצלה למילונים - Lazily convert to the to_dict() shape,
+        building each distinct form's dict only once.
+        """
+        forms = self.forms
+        cache = self._dicts
+        for form_id in self.form_ids:
+            result = cache.get(form_id)
+            if result is None:
+                result = cache[form_id] = forms[form_id].to_dict()
+            yield result
+
+    def to_dicts(self) -> List[dict]:
+        return list(self.iter_dicts())
+
+
 class NikudAnalyzer:
     """מנתח ניקוד לטקסט עברי"""
 
-    def __init__(self):
+    def __init__(self, cache_size: int = 65536):
         self.marks = NikudMarks()
+        # Memo of analyze_word for repeated isolated words (WordAnalysis is immutable)
+        self.analyze_cached = lru_cache(maxsize=cache_size)(self.analyze_word)
+        # Mapped dictionary of analyzed forms, consulted before computing
+        # (app.services.word_dictionary.WordDictionary)
+        self.dictionary = None
 
     def remove_nikud(self, text: str) -> str:
         """הסרת ניקוד מטקסט"""
-        result = ""
-        for char in text:
-            if char not in self.marks.ALL_NIKUD:
-                result += char
-        return result
+        return text.translate(NIKUD_DELETE_TABLE)
 
     def extract_nikud_pattern(self, word: str) -> str:
         """חילוץ תבנית הניקוד מהמילה"""
-        pattern = []
-        for char in word:
-            if char in self.marks.HEBREW_LETTERS:
-                pattern.append('ל')  # לציון אות
-            elif char in self.marks.ALL_NIKUD:
-                if char == self.marks.SHVA:
-                    pattern.append('ש')  # שווא
-                elif char == self.marks.DAGESH:
-                    pattern.append('ד')  # דגש
-                elif char in self.marks.VOWELS:
-                    pattern.append('ת')  # תנועה
-                elif char in self.marks.HATAF_VOWELS:
-                    pattern.append('ח')  # חטף
-                else:
-                    pattern.append('נ')  # ניקוד אחר
-        return ''.join(pattern)
+        # ל=אות, ש=שווא, ד=דגש, ת=תנועה, ח=חטף, נ=ניקוד אחר
+        get = PATTERN_CHARS.get
+        return ''.join([get(char, '') for char in word])
 
     def check_ends_with(self, word: str, pattern: str) -> bool:
         """בדיקה אם המילה מסתיימת בתבנית מסוימת"""
@@ -298,73 +634,84 @@ class NikudAnalyzer:
 
     def analyze_word(self, word: str) -> WordAnalysis:
         """ניתוח מלא של מילה"""
-        word = word.strip()
+        with metrics.timer(ANALYZE_WORD_SECONDS):
+            return self._analyze_word(word)
+
+    def _analyze_word(self, word: str) -> WordAnalysis:
+        word = canonicalize(word.strip())
+        if self.dictionary is not None:
+            analysis = self.dictionary.lookup(word)
+            if analysis is not None:
+                return analysis
         word_plain = self.remove_nikud(word)
         nikud_pattern = self.extract_nikud_pattern(word)
 
-        nikud_marks = set()
+        mark_bits = 0
         for char in word:
-            if char in self.marks.ALL_NIKUD:
-                nikud_marks.add(char)
-
-        has_shva = self.marks.SHVA in word
-        shva_types = self.analyze_shva(word)
-        syllable_type = self.check_syllable_type(word)
-        has_dagesh = self.marks.DAGESH in word
-
-        special_cases = []
+            bit = MARK_BITS.get(char)
+            if bit:
+                mark_bits |= bit
+
+        shva_count = word.count(self.marks.SHVA)
+        flags = FLAG_SHVA if shva_count else 0
+        if self.marks.DAGESH in word:
+            flags |= FLAG_DAGESH
+        shva_codes = bytes(SHVA_CODES[s] for s in self.analyze_shva(word))
+        syllable_code = SYLLABLE_CODES[self.check_syllable_type(word)]
+
+        special_bits = 0
         if self.check_kamatz_katan(word):
-            special_cases.append("קמץ קטן")
+            special_bits |= SPECIAL_CASE_BITS["קמץ קטן"]
         if self.check_ends_with(word, "ח ופתח"):
-            special_cases.append("פתח גנובה")
-        if len([c for c in word if c == self.marks.SHVA]) >= 2:
-            special_cases.append("שני שוואים")
-
-        return WordAnalysis(
-            word=word,
-            word_plain=word_plain,
-            nikud_pattern=nikud_pattern,
-            syllable_type=syllable_type,
-            has_shva=has_shva,
-            shva_types=shva_types,
-            nikud_marks=nikud_marks,
-            has_dagesh=has_dagesh,
-            has_open_syllable=(syllable_type == SyllableType.OPEN),
-            has_closed_syllable=(syllable_type == SyllableType.CLOSED),
-            special_cases=special_cases
-        )
+            special_bits |= SPECIAL_CASE_BITS["פתח גנובה"]
+        if shva_count >= 2:
+            special_bits |= SPECIAL_CASE_BITS["שני שוואים"]
 
-    def analyze_text(self, text: str) -> List[WordAnalysis]:
-        """ניתוח טקסט שלם"""
-        words = []
-        separators = ' \t\n\r,.;:!?()[]{}"\'\u05C3\u05BE\u2013\u2014\u2022\u00B7\u05F4\u05F3'
-        current_word = []
-
-        for char in text:
-            if char in separators:
-                if current_word:
-                    word = ''.join(current_word)
-                    if any(c in self.marks.HEBREW_LETTERS for c in word):
-                        words.append(word)
-                    current_word = []
-            else:
-                if char in self.marks.HEBREW_LETTERS or char in self.marks.ALL_NIKUD:
-                    current_word.append(char)
-
-        if current_word:
-            word = ''.join(current_word)
-            if any(c in self.marks.HEBREW_LETTERS for c in word):
-                words.append(word)
+        return WordAnalysis.from_codes(
+            word, word_plain, nikud_pattern, syllable_code,
+            shva_codes, mark_bits, flags, special_bits
+        )
 
-        results = []
+    def analyze_unique(self, words: Iterable[str]) -> Iterator[WordAnalysis]:
+        """
+        ניתוח רשימת מילים ללא כפילויות
+        Analyze each distinct word once, yielding results as they are produced
+        """
+        seen = set()
+        for word in words:
+            word = canonicalize(word.strip())
+            if not word or word in seen:
+                continue
+            seen.add(word)
+            yield self.analyze_cached(word)
+
+    def tokenize(self, text: str) -> List[str]:
+        """פירוק טקסט למילים"""
+        return tokenize(text)
+
+    def analyze_words(self, words: Iterable[str]) -> AnalysisBatch:
+        """ניתוח רצף מילים - each distinct form is analyzed once"""
+        results = AnalysisBatch()
         for word in words:
             if word and len(word) > 1:
-                analysis = self.analyze_word(word)
-                results.append(analysis)
+                form_id = results.form_id(word)
+                if form_id is None:
+                    # Spellings that differ only in mark order share a form
+                    analysis = self.analyze_word(word)
+                    form_id = results.form_id(analysis.word)
+                    if form_id is None:
+                        form_id = results.add_form(analysis)
+                    results.alias(word, form_id)
+                results.append(form_id)
 
         return results
 
+    def analyze_text(self, text: str) -> AnalysisBatch:
+        """ניתוח טקסט שלם"""
+        return self.analyze_words(self.tokenize(text))
+
 
 # Singleton instance
 nikud_analyzer = NikudAnalyzer()
+metrics.register_cache("analysis", nikud_analyzer.analyze_cached.cache_info)
 
@@ -0,0 +1,227 @@
+"""
+חלוקת טבלת המילים למחיצות לפי מקור
+Per-source partitions of the words and posting tables on PostgreSQL: a
+search filtered by source reads one partition, and deleting a source drops
+its partitions instead of deleting its rows one by one
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Table, event, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import AddConstraint
+
+from app.config import settings
+from app.database import engine
+from app.models import Source, Word, WordPosting
+
+logger = logging.getLogger(__name__)
+
+# Serializes migrations of concurrently starting workers
+MIGRATION_LOCK = 0x6E696B75
+# Dropping the partitions of a failed load waits at most this long for its locks
+RELEASE_LOCK_TIMEOUT = "100ms"
+
+
+class PartitionError(ValueError):
+    """The tables cannot be partitioned as they are"""
+
+
+class WordPartitions:
+    """
+    מחיצות לפי מקור - With PARTITION_WORDS on PostgreSQL, `words` and
+    `word_postings` are LIST-partitioned by source_id, one partition per
+    source (<table>_s<source id>). A load reserves its source id and
+    attaches the partitions in a short transaction of its own before it
+    starts, so the locks attaching takes are not held through the load;
+    if the load rolls back, its empty partitions are dropped. There is no
+    default partition, so attaching never scans or locks one - every word
+    belongs to a source.
+    Whether the tables are partitioned is read from the catalog, so the
+    setting only decides whether init_db migrates them; on other databases
+    the tables stay plain and add/drop are no-ops.
+    """
+
+    tables = (Word.__table__, WordPosting.__table__)
+
+    @property
+    def configured(self) -> bool:
+        return settings.partition_words and engine.dialect.name == "postgresql"
+
+    def partitioned(self, db: Session) -> bool:
+        """האם הטבלאות מחולקות - Whether `words` is a partitioned table"""
+        if db.get_bind().dialect.name != "postgresql":
+            return False
+        return db.execute(text(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('words')")).first() is not None
+
+    @staticmethod
+    def partition_name(table: str, source_id: int) -> str:
+        return f"{table}_s{int(source_id)}"
+
+    def _attach(self, conn: Connection, table: str, source_id: int):
+        partition = self.partition_name(table, source_id)
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {partition} (LIKE {table})"))
+        attached = conn.execute(text(
+            "SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(:partition)"),
+            {"partition": partition}).first()
+        if attached is None:
+            conn.execute(text(
+                f"ALTER TABLE {table} ATTACH PARTITION {partition} FOR VALUES IN ({int(source_id)})"))
+
+    def reserve(self, db: Session) -> Optional[int]:
+        """
+        מחיצות למקור חדש - Take the next source id and attach its
+        partitions, committed on a connection of their own, before the
+        caller's transaction writes anything. Attaching takes SHARE UPDATE
+        EXCLUSIVE on the parents and, for the cloned foreign key, SHARE ROW
+        EXCLUSIVE on sources - for the attach only, not for the whole load.
+        Returns the id to create the source with, or None when the tables
+        are plain and the database assigns it.
+        """
+        if not self.partitioned(db):
+            return None
+        with db.get_bind().engine.begin() as conn:
+            source_id = conn.execute(text("SELECT nextval(pg_get_serial_sequence('sources', 'id'))")).scalar()
+            for table in self.tables:
+                self._attach(conn, table.name, source_id)
+        db.info.setdefault("reserved_partitions", []).append(source_id)
+        return source_id
+
+    def _committed(self, session: Session):
+        session.info.pop("reserved_partitions", None)
+
+    def _ended(self, session: Session, transaction):
+        # Ended without a commit (rolled back or closed), after its
+        # connection was released: drop the load's empty partitions, unless
+        # that would keep searches waiting - then they stay under an unused id
+        if transaction.parent is not None:
+            return
+        for source_id in session.info.pop("reserved_partitions", ()):
+            try:
+                with session.get_bind().engine.begin() as conn:
+                    conn.execute(text(f"SET LOCAL lock_timeout = '{RELEASE_LOCK_TIMEOUT}'"))
+                    for table in self.tables:
+                        conn.execute(text(f"DROP TABLE IF EXISTS {self.partition_name(table.name, source_id)}"))
+            except Exception as e:
+                logger.warning("partitions of source %d left behind: %s", source_id, e)
+
+    def _detach(self, conn: Connection, table: str, source_id: int):
+        partition = self.partition_name(table, source_id)
+        pending = conn.execute(text(
+            "SELECT inhdetachpending FROM pg_inherits WHERE inhrelid = to_regclass(:partition)"),
+            {"partition": partition}).scalar()
+        if pending is None:
+            return  # Not attached (or already gone)
+        # An interrupted concurrent detach is completed instead of restarted
+        mode = "FINALIZE" if pending else "CONCURRENTLY"
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition} {mode}"))
+
+    def drop(self, db: Session, source_id: int) -> bool:
+        """
+        מחיקת המחיצות של מקור - Detach the source's partitions, then drop
+        them, before the caller deletes the source. DETACH ... CONCURRENTLY
+        takes only SHARE UPDATE EXCLUSIVE on the parents, so searches keep
+        running, but it waits for every transaction that used the parents -
+        the caller's transaction is committed first, and must not take
+        other locks (the rule-index lock included) until this returns. The
+        detached tables are dropped in a short transaction of their own; a
+        delete that fails afterwards leaves the source without words, and
+        deleting it again completes it. Returns False when the tables are
+        plain and the rows must be deleted.
+        """
+        if not self.partitioned(db):
+            return False
+        db.commit()
+        bind = db.get_bind().engine
+        with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for table in self.tables:
+                self._detach(conn, table.name, source_id)
+        with bind.begin() as conn:
+            for table in self.tables:
+                conn.execute(text(f"DROP TABLE IF EXISTS {self.partition_name(table.name, source_id)}"))
+        return True
+
+    def _partition_table(self, conn: Connection, table: Table, source_ids: List[int]):
+        name = table.name
+        old = f"{name}_unpartitioned"
+        conn.execute(text(f"ALTER TABLE {name} RENAME TO {old}"))
+        conn.execute(text(
+            f"CREATE TABLE {name} (LIKE {old} INCLUDING DEFAULTS INCLUDING IDENTITY) "
+            f"PARTITION BY LIST (source_id)"))
+        for source_id in source_ids:
+            conn.execute(text(
+                f"CREATE TABLE {self.partition_name(name, source_id)} PARTITION OF {name} "
+                f"FOR VALUES IN ({source_id})"))
+        conn.execute(text(f"INSERT INTO {name} SELECT * FROM {old}"))
+
+        # The id sequence moves to the new table before the old one goes
+        for column in table.columns:
+            sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, :column)"),
+                                    {"table": old, "column": column.name}).scalar()
+            if sequence:
+                conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {name}.{column.name}"))
+            sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, :column)"),
+                                    {"table": name, "column": column.name}).scalar()
+            if sequence:
+                conn.execute(text(
+                    f"SELECT setval('{sequence}', COALESCE(MAX({column.name}), 0) + 1, false) FROM {name}"))
+        conn.execute(text(f"DROP TABLE {old}"))
+
+        # Keys and indexes, created once on the parent for every partition.
+        # A primary key must contain the partition key - words keeps its id
+        # index instead.
+        key = [column.name for column in table.primary_key]
+        if "source_id" in key:
+            conn.execute(text(f"ALTER TABLE {name} ADD PRIMARY KEY ({', '.join(key)})"))
+        for constraint in table.foreign_key_constraints:
+            conn.execute(AddConstraint(constraint))
+        for index in table.indexes:
+            index.create(bind=conn)
+
+    def migrate(self, db: Session) -> Dict:
+        """
+        המרה לטבלאות מחולקות - Rewrite plain `words` and `word_postings` as
+        partitioned tables, one partition per source, in one transaction.
+        Called by init_db when configured and by `app.cli partition-words`;
+        a no-op when already done.
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            raise PartitionError("חלוקה למחיצות נתמכת רק ב-PostgreSQL")
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK})
+        if self.partitioned(db):
+            db.commit()
+            return self.stats(db)
+        orphans = db.execute(select(Word.id).where(Word.source_id.is_(None)).limit(1)).first()
+        if orphans is not None:
+            db.rollback()
+            raise PartitionError("יש מילים ללא מקור - לא ניתן לחלק את טבלת המילים לפי מקור")
+        source_ids = list(db.execute(select(Source.id).order_by(Source.id)).scalars())
+        conn = db.connection()
+        for table in self.tables:
+            self._partition_table(conn, table, source_ids)
+        db.commit()
+        logger.info("partitioned words by source: %d partitions", len(source_ids))
+        return self.stats(db)
+
+    def stats(self, db: Session) -> Dict:
+        partitioned = self.partitioned(db)
+        counts: Iterable = []
+        if partitioned:
+            counts = db.execute(text(
+                "SELECT parent.relname, count(*) FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "WHERE parent.relname IN ('words', 'word_postings') GROUP BY parent.relname")).all()
+        return {
+            "configured": self.configured,
+            "partitioned": partitioned,
+            "partitions": dict(counts),
+        }
+
+
+# Singleton instance
+word_partitions = WordPartitions()
+event.listen(Session, "after_commit", word_partitions._committed)
+event.listen(Session, "after_transaction_end", word_partitions._ended)
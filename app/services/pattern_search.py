@@ -0,0 +1,263 @@
+"""
+חיפוש לפי תבנית ניקוד עם תווים כלליים
+Nikud-pattern search with wildcards, backed by indexes
+
+Query syntax over the pattern alphabet (ל ש ד ת ח נ, see extract_nikud_pattern):
+    ל        the pattern character itself
+    ?        any one character
+    *        any run of characters (possibly empty)
+    [לש]     one of the listed characters
+    {n} {n,m} +   repetition of the previous item
+Spaces and '-' are ignored, so "לת-ל-ש*" reads like the word's shape.
+"""
+
+import re
+from typing import Iterable, List, NamedTuple, Optional, Set
+
+from sqlalchemy import and_, false, func, select
+from sqlalchemy.orm import Session
+
+from app.database import insert_ignoring_conflicts
+from app.models import Word, NikudPattern, PatternGram, prefix_range
+from app.services.nikud_analyzer import PATTERN_CHARS
+
+PATTERN_ALPHABET = frozenset(PATTERN_CHARS.values())
+GRAM_SIZE = 3
+
+# Beyond this many matching patterns the words query verifies with a regex instead of IN (...)
+MAX_IN_PATTERNS = 500
+
+_IGNORED = frozenset(" -")
+_REPEAT_RE = re.compile(r"\{(\d+)(?:,(\d*))?\}")
+
+
+class PatternSyntaxError(ValueError):
+    """שגיאת תחביר בשאילתת תבנית"""
+
+
+class _Item(NamedTuple):
+    chars: Optional[str]  # None matches any character
+    min: int
+    max: Optional[int]  # None - unbounded
+
+
+class PatternQuery:
+    """
+    שאילתת תבנית מהודרת - A parsed pattern query: a verification regex plus
+    the literal parts (exact value, prefix, suffix, n-grams) an index can use
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.items = self._parse(text)
+        self.regex = "^" + "".join(self._item_regex(item) for item in self.items) + "$"
+        self._compiled = re.compile(self.regex)
+
+        literal = self._literal_runs()
+        self.exact = literal[0] if len(literal) == 1 and self._is_fixed() else None
+        self.prefix = literal[0] if self._starts_fixed() else ""
+        self.suffix = literal[-1] if self._ends_fixed() else ""
+        self.grams = self._grams(literal)
+
+    @staticmethod
+    def _parse(text: str) -> List[_Item]:
+        items: List[_Item] = []
+        i = 0
+        while i < len(text):
+            char = text[i]
+            if char in _IGNORED:
+                i += 1
+            elif char in PATTERN_ALPHABET:
+                items.append(_Item(char, 1, 1))
+                i += 1
+            elif char == "?":
+                items.append(_Item(None, 1, 1))
+                i += 1
+            elif char == "*":
+                items.append(_Item(None, 0, None))
+                i += 1
+            elif char == "[":
+                end = text.find("]", i)
+                chars = text[i + 1:end] if end != -1 else ""
+                if not chars or not set(chars) <= PATTERN_ALPHABET:
+                    raise PatternSyntaxError(f"קבוצת תווים לא תקינה במיקום {i}")
+                items.append(_Item("".join(sorted(set(chars))), 1, 1))
+                i = end + 1
+            elif char in "{+":
+                if not items or items[-1].max != 1 or items[-1].min != 1:
+                    raise PatternSyntaxError(f"חזרה ללא פריט במיקום {i}")
+                if char == "+":
+                    low, high, i = 1, None, i + 1
+                else:
+                    match = _REPEAT_RE.match(text, i)
+                    if not match:
+                        raise PatternSyntaxError(f"חזרה לא תקינה במיקום {i}")
+                    low = int(match.group(1))
+                    high = low if match.group(2) is None else (
+                        int(match.group(2)) if match.group(2) else None)
+                    if high is not None and high < low:
+                        raise PatternSyntaxError(f"טווח חזרה הפוך במיקום {i}")
+                    i = match.end()
+                items[-1] = items[-1]._replace(min=low, max=high)
+            else:
+                raise PatternSyntaxError(f"תו לא מוכר '{char}' במיקום {i}")
+        if not items:
+            raise PatternSyntaxError("תבנית ריקה")
+        return items
+
+    @staticmethod
+    def _item_regex(item: _Item) -> str:
+        if item.chars is None:
+            atom = "."
+        elif len(item.chars) == 1:
+            atom = item.chars
+        else:
+            atom = f"[{item.chars}]"
+        if (item.min, item.max) == (1, 1):
+            return atom
+        if (item.min, item.max) == (0, None):
+            return atom + "*"
+        if item.max is None:
+            return f"{atom}{{{item.min},}}"
+        if item.min == item.max:
+            return f"{atom}{{{item.min}}}"
+        return f"{atom}{{{item.min},{item.max}}}"
+
+    @staticmethod
+    def _is_literal(item: _Item) -> bool:
+        return item.chars is not None and len(item.chars) == 1 and item.min == item.max
+
+    def _is_fixed(self) -> bool:
+        return all(self._is_literal(item) for item in self.items)
+
+    def _starts_fixed(self) -> bool:
+        return self._is_literal(self.items[0])
+
+    def _ends_fixed(self) -> bool:
+        return self._is_literal(self.items[-1])
+
+    def _literal_runs(self) -> List[str]:
+        """רצפים מילוליים - Runs of fixed characters, in order"""
+        runs, current = [], []
+        for item in self.items:
+            if self._is_literal(item):
+                current.append(item.chars * item.min)
+            else:
+                if current:
+                    runs.append("".join(current))
+                current = []
+                # A bounded repetition still contributes its mandatory part
+                if item.chars is not None and len(item.chars) == 1 and item.min:
+                    runs.append(item.chars * item.min)
+        if current:
+            runs.append("".join(current))
+        return runs
+
+    def _grams(self, runs: List[str]) -> Set[str]:
+        """n-גרמים חובה - Grams every matching pattern must contain"""
+        grams = set()
+        for index, run in enumerate(runs):
+            if index == 0 and self._starts_fixed():
+                run = "^" + run
+            if index == len(runs) - 1 and self._ends_fixed():
+                run = run + "$"
+            grams.update(pattern_grams(run, anchored=False))
+        return grams
+
+    def matches(self, pattern: str) -> bool:
+        return self._compiled.match(pattern) is not None
+
+
+def pattern_grams(pattern: str, anchored: bool = True) -> Set[str]:
+    """n-גרמים של תבנית - GRAM_SIZE-grams of '^pattern$'"""
+    if anchored:
+        pattern = f"^{pattern}$"
+    return {pattern[i:i + GRAM_SIZE] for i in range(len(pattern) - GRAM_SIZE + 1)}
+
+
+class PatternIndex:
+    """
+    אינדקס תבניות - Distinct nikud patterns and their n-grams. Patterns are
+    registered when words are stored; patterns whose words were deleted stay
+    behind and simply match no rows.
+    """
+
+    def register(self, db: Session, patterns: Iterable[Optional[str]]):
+        """
+        רישום תבניות חדשות - Add unseen patterns and their grams (no commit).
+        Patterns are inserted with ON CONFLICT DO NOTHING: one a concurrent
+        load inserted first is skipped, and its grams are that load's to add.
+        """
+        patterns = {p for p in patterns if p}
+        ordered = sorted(patterns)
+        for start in range(0, len(ordered), 500):
+            batch = ordered[start:start + 500]
+            existing = set(db.execute(
+                select(NikudPattern.pattern).where(NikudPattern.pattern.in_(batch))
+            ).scalars())
+            new = [{"pattern": p} for p in batch if p not in existing]
+            if not new:
+                continue
+            inserted = db.execute(
+                insert_ignoring_conflicts(db, NikudPattern.__table__)
+                .returning(NikudPattern.id, NikudPattern.pattern), new
+            ).all()
+            if inserted:
+                db.execute(PatternGram.__table__.insert(), [
+                    {"gram": gram, "pattern_id": pattern_id}
+                    for pattern_id, pattern in inserted for gram in pattern_grams(pattern)
+                ])
+
+    def rebuild(self, db: Session) -> int:
+        """בנייה מחדש מטבלת המילים - Rebuild from the words table"""
+        db.query(PatternGram).delete(synchronize_session=False)
+        db.query(NikudPattern).delete(synchronize_session=False)
+        patterns = db.execute(select(Word.nikud_pattern).distinct()).scalars().all()
+        self.register(db, patterns)
+        db.commit()
+        return len(patterns)
+
+    def matching_patterns(self, db: Session, query: PatternQuery) -> List[str]:
+        """
+        תבניות תואמות - Distinct patterns matching the query. Candidates must
+        contain all of its grams; without grams every distinct pattern is a
+        candidate, which is cheap since there are far fewer patterns than words.
+        """
+        statement = select(NikudPattern.pattern)
+        if query.grams:
+            grams = sorted(query.grams)
+            statement = (
+                statement.join(PatternGram, PatternGram.pattern_id == NikudPattern.id)
+                .where(PatternGram.gram.in_(grams))
+                .group_by(NikudPattern.id, NikudPattern.pattern)
+                .having(func.count() == len(grams))
+            )
+        return [pattern for pattern in db.execute(statement).scalars() if query.matches(pattern)]
+
+    def condition(self, db: Session, text: str):
+        """
+        תנאי חיפוש - SQL condition on Word for a pattern query:
+        exact value      -> equality on the nikud_pattern index;
+        few patterns     -> IN (...) on the nikud_pattern index;
+        many patterns    -> prefix/suffix index ranges plus a regex check
+        """
+        query = PatternQuery(text)
+        if query.exact is not None:
+            return Word.nikud_pattern == query.exact
+
+        patterns = self.matching_patterns(db, query)
+        if not patterns:
+            return false()
+        if len(patterns) <= MAX_IN_PATTERNS:
+            return Word.nikud_pattern.in_(patterns)
+
+        conditions = [Word.nikud_pattern.regexp_match(query.regex)]
+        if query.prefix:
+            conditions.append(prefix_range(Word.nikud_pattern, query.prefix))
+        if query.suffix:
+            conditions.append(prefix_range(Word.pattern_reversed, query.suffix[::-1]))
+        return and_(*conditions)
+
+
+# Singleton instance
+pattern_index = PatternIndex()
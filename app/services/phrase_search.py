@@ -0,0 +1,206 @@
+"""
+חיפוש ביטויים וקרבה בעזרת אינדקס מיקומים
+Phrase and proximity search over per-form posting lists
+"""
+
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.models import Word, Source, WordPosting
+from app.services.metrics import metrics, SQL_QUERY_SECONDS
+from app.services.nikud_analyzer import canonicalize, tokenize
+from app.services.concordance import Hit, concordance
+
+# מיקומים לפי מקור - source_id -> ascending positions
+Postings = Dict[int, np.ndarray]
+
+
+def pack_positions(positions: array) -> bytes:
+    if sys.byteorder == "big":
+        positions = array('I', positions)
+        positions.byteswap()
+    return positions.tobytes()
+
+
+def unpack_positions(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<u4").astype(np.int64)
+
+
+class PhraseSearch:
+    """
+    חיפוש ביטויים - A query of several words matches where they occur in
+    order, each at most `distance` words after the previous one (distance 1
+    is an exact phrase). Each term's posting lists are read from
+    word_postings and intersected in memory, not with self-joins.
+    """
+
+    def __init__(self, max_terms: int = 10):
+        self.max_terms = max_terms
+
+    # Index maintenance
+
+    def index_source(self, db: Session, source_id: int, words: Iterable[Tuple[str, str]]):
+        """
+        בניית רשימות המופעים של מקור - Replace a source's posting lists.
+        `words` yields (word, word_plain) for positions 0, 1, ...; every position is
+        listed under both its pointed and its plain form. No commit.
+        """
+        lists: Dict[str, array] = {}
+        for position, (word, word_plain) in enumerate(words):
+            for term in (word, word_plain) if word != word_plain else (word,):
+                positions = lists.get(term)
+                if positions is None:
+                    positions = lists[term] = array('I')
+                positions.append(position)
+
+        self.remove_source(db, source_id)
+        rows = [{"term": term, "source_id": source_id, "positions": pack_positions(positions)}
+                for term, positions in lists.items()]
+        for start in range(0, len(rows), 5000):
+            db.execute(insert(WordPosting), rows[start:start + 5000])
+
+    def remove_source(self, db: Session, source_id: int):
+        db.query(WordPosting).filter(WordPosting.source_id == source_id).delete(
+            synchronize_session=False)
+
+    def rebuild(self, db: Session, source_ids: Optional[Iterable[int]] = None) -> int:
+        """בנייה מחדש מטבלת המילים - Rebuild the sources' (default: all) lists from the words table"""
+        if source_ids is None:
+            source_ids = db.execute(select(Source.id)).scalars().all()
+        source_ids = list(source_ids)
+        for source_id in source_ids:
+            rows = db.execute(
+                select(Word.word, Word.word_plain)
+                .where(Word.source_id == source_id)
+                .order_by(Word.position)
+            ).all()
+            self.index_source(db, source_id, rows)
+        db.commit()
+        return len(source_ids)
+
+    # Search
+
+    @staticmethod
+    def terms(text: str) -> List[str]:
+        """מילות השאילתה - Query words as stored (single letters are not stored)"""
+        return [word for word in tokenize(canonicalize(text)) if len(word) > 1]
+
+    def postings(self, db: Session, terms: List[str], source_id: Optional[int] = None
+                 ) -> Dict[str, Postings]:
+        """רשימות המופעים של המונחים - Posting lists per term and source"""
+        statement = (select(WordPosting.term, WordPosting.source_id, WordPosting.positions)
+                     .where(WordPosting.term.in_(set(terms))))
+        if source_id:
+            statement = statement.where(WordPosting.source_id == source_id)
+
+        result: Dict[str, Postings] = {term: {} for term in terms}
+        with metrics.timer(SQL_QUERY_SECONDS, "phrase_postings"):
+            rows = db.execute(statement).all()
+        for term, source, data in rows:
+            result[term][source] = unpack_positions(data)
+        return result
+
+    @staticmethod
+    def _match_spans(lists: List[np.ndarray], distance: int) -> List[Tuple[int, int]]:
+        """
+        חיתוך רשימות - (first, last) spans where each list has a position at
+        most `distance` after the previous match. The nearest one is taken,
+        which finds a span whenever one exists; every start is advanced at
+        once with a binary search into the next list.
+        """
+        starts = lists[0]
+        previous = starts
+        for positions in lists[1:]:
+            if not len(starts):
+                break
+            j = np.searchsorted(positions, previous, side="right")
+            found = j < len(positions)
+            following = positions[np.minimum(j, len(positions) - 1)]
+            keep = found & (following <= previous + distance)
+            starts, previous = starts[keep], following[keep]
+        return list(zip(starts.tolist(), previous.tolist()))
+
+    def find(
+        self,
+        db: Session,
+        text: str,
+        distance: int = 1,
+        source_id: Optional[int] = None
+    ) -> List[Tuple[int, int, int]]:
+        """
+        מציאת מופעים - All (source_id, first, last) matches, in source order
+        """
+        terms = self.terms(text)[:self.max_terms]
+        if not terms:
+            return []
+
+        lists = self.postings(db, terms, source_id)
+        sources = set.intersection(*(set(lists[term]) for term in terms))
+        matches = []
+        for source in sorted(sources):
+            spans = self._match_spans([lists[term][source] for term in terms], distance)
+            matches.extend((source, first, last) for first, last in spans)
+        return matches
+
+    def search(
+        self,
+        db: Session,
+        text: str,
+        distance: int = 1,
+        source_id: Optional[int] = None,
+        page: int = 1,
+        per_page: int = 50
+    ) -> Tuple[List[Dict], int]:
+        """
+        חיפוש ביטוי - A page of matches with their words and context
+        """
+        matches = self.find(db, text, distance, source_id)
+        total = len(matches)
+        page_matches = matches[(page - 1) * per_page:page * per_page]
+        if not page_matches:
+            return [], total
+
+        # The matched spans, read through the (source_id, position) index
+        with metrics.timer(SQL_QUERY_SECONDS, "phrase_spans"):
+            rows = db.execute(
+                select(Word.source_id, Word.position, Word.word, Word.context,
+                       Word.char_start, Word.char_end)
+                .where(or_(*(
+                    and_(Word.source_id == source, Word.position.between(first, last))
+                    for source, first, last in page_matches
+                )))
+            ).all()
+            names = dict(db.execute(
+                select(Source.id, Source.name)
+                .where(Source.id.in_({source for source, _, _ in page_matches}))
+            ).all())
+        words = {(row.source_id, row.position): row for row in rows}
+        spans = [[words[(source, p)] for p in range(first, last + 1) if (source, p) in words]
+                 for source, first, last in page_matches]
+
+        # Context around the whole span, sliced from the source by offsets
+        contexts = concordance.contexts(db, [
+            Hit(i, span[0].source_id, span[0].position, span[0].char_start, span[-1].char_end)
+            for i, span in enumerate(spans) if span and span[0].char_start is not None
+        ])
+
+        results = []
+        for i, ((source, first, last), span) in enumerate(zip(page_matches, spans)):
+            results.append({
+                "source_id": source,
+                "source_name": names.get(source),
+                "start_position": first,
+                "end_position": last,
+                "words": [row.word for row in span],
+                "context": contexts.get(i, span[0].context if span else None),
+            })
+        return results, total
+
+
+# Singleton instance
+phrase_search = PhraseSearch()
@@ -0,0 +1,185 @@
+"""
+ניתוב קריאות לשרת העתק
+Read routing: search, statistics, exports and listings read from the
+replica while it is reachable and has caught up with the reader's own
+writes; everything else - and every read without a replica - uses the
+primary
+"""
+
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from fastapi import Request
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.database import ReplicaSessionLocal, SessionLocal
+from app.models import Generation
+from app.services.generations import WORDS
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# The words generation a client has written, returned on write requests
+# and sent back (cookie or header) on reads
+GENERATION_COOKIE = "nikud_generation"
+GENERATION_HEADER = "X-Nikud-Generation"
+
+# Words generations committed while serving the current request (see track)
+_request_writes: ContextVar[Optional[List[int]]] = ContextVar("request_writes", default=None)
+
+
+class ReadRouter:
+    """
+    ניתוב קריאות - A background thread reads the replica's words
+    generation every check_seconds; a failed read marks the replica
+    unhealthy until a later one succeeds. A read goes to the replica only
+    when it is healthy and its generation is at least the one the client
+    wrote (read-your-writes) - otherwise to the primary, so a client never
+    misses its own upload while replication catches up.
+    """
+
+    def __init__(self, replica: Optional[sessionmaker], check_seconds: float = 1.0):
+        self.replica = replica
+        self.check_seconds = check_seconds
+        self.healthy = False
+        self.replica_generation = -1
+        self.checked_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.routed = {"replica": 0, "primary": 0}
+        self.fallbacks = {"unhealthy": 0, "behind": 0}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.replica is not None
+
+    def check(self) -> bool:
+        """בדיקת תקינות - Read the replica's words generation"""
+        db = self.replica()
+        try:
+            value = db.execute(select(Generation.value).where(Generation.name == WORDS)).scalar()
+            if value is None:
+                raise LookupError("replica has no words generation")
+            self.replica_generation = value
+            if not self.healthy:
+                logger.info("read replica healthy at generation %d", value)
+            self.healthy = True
+        except Exception as e:
+            if self.healthy:
+                logger.warning("read replica unhealthy: %s", e)
+            self.healthy = False
+            self.last_error = str(e)
+        finally:
+            db.close()
+            self.checked_at = time.monotonic()
+        return self.healthy
+
+    def _run(self):
+        while not self._stop.wait(self.check_seconds):
+            self.check()
+
+    def start(self):
+        """הפעלה - Check now, then keep checking in the background"""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self.check()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="read-replica-check", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def session(self, required: int = 0) -> Session:
+        """
+        סשן לקריאה - A replica session when the replica is healthy and at
+        `required` or later, a primary session otherwise
+        """
+        if not self.enabled:
+            return SessionLocal()
+        running = self._thread is not None and self._thread.is_alive()
+        if not running and (self.checked_at is None
+                            or time.monotonic() - self.checked_at >= self.check_seconds):
+            self.check()  # No checker thread (scripts, tests) - check inline
+        if not self.healthy:
+            self.fallbacks["unhealthy"] += 1
+        elif self.replica_generation < required:
+            self.fallbacks["behind"] += 1
+        else:
+            self.routed["replica"] += 1
+            return self.replica()
+        self.routed["primary"] += 1
+        return SessionLocal()
+
+    @staticmethod
+    def required(request: Request) -> int:
+        """הדור שהלקוח כתב - From the header or the cookie, 0 if neither"""
+        value = request.headers.get(GENERATION_HEADER) or request.cookies.get(GENERATION_COOKIE)
+        return int(value) if value and value.isdigit() else 0
+
+    @staticmethod
+    def track() -> List[int]:
+        """
+        מעקב כתיבות - Start collecting the words generations committed
+        while serving this request. The list is shared with the endpoint's
+        task and threadpool thread, which run in copies of this context.
+        """
+        writes: List[int] = []
+        _request_writes.set(writes)
+        return writes
+
+    @staticmethod
+    def _committed(session: Session):
+        # Runs before the invalidation bus pops the session's bumps
+        writes = _request_writes.get()
+        if writes is not None:
+            writes.extend(value for name, value in session.info.get("generation_bumps", ())
+                          if name == WORDS)
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "healthy": self.healthy,
+            "replica_generation": self.replica_generation if self.enabled else None,
+            "last_error": self.last_error,
+            "routed": dict(self.routed),
+            "fallbacks": dict(self.fallbacks),
+        }
+
+    def collect(self) -> List[str]:
+        """מדדי Prometheus - Reads per target and why they fell back"""
+        if not self.enabled:
+            return []
+        lines = ["# TYPE nikud_read_routed_total counter"]
+        lines += [f'nikud_read_routed_total{{target="{t}"}} {n}' for t, n in self.routed.items()]
+        lines.append("# TYPE nikud_read_fallbacks_total counter")
+        lines += [f'nikud_read_fallbacks_total{{reason="{r}"}} {n}' for r, n in self.fallbacks.items()]
+        lines += ["# TYPE nikud_replica_healthy gauge", f"nikud_replica_healthy {int(self.healthy)}",
+                  "# TYPE nikud_replica_generation gauge", f"nikud_replica_generation {self.replica_generation}"]
+        return lines
+
+
+def get_read_db(request: Request) -> Iterator[Session]:
+    """
+    Dependency for read-only endpoints - a replica session when routing allows
+    תלות לנקודות קצה לקריאה בלבד
+    """
+    db = read_router.session(read_router.required(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Singleton instance
+read_router = ReadRouter(ReplicaSessionLocal, settings.replica_check_seconds)
+event.listen(Session, "after_commit", read_router._committed, insert=True)
+metrics.register_collector(read_router.collect)
@@ -0,0 +1,213 @@
+"""
+ניתוח מחדש של מילים שמורות
+Re-analysis of stored words whose analyzer version is out of date
+"""
+
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Word, REVERSED_COLUMNS
+from app.services.nikud_analyzer import ANALYZER_VERSION, NikudAnalyzer, canonicalize, nikud_analyzer
+from app.services.pattern_search import pattern_index
+from app.services.phrase_search import phrase_search
+from app.services.suggest import suggest_index
+from app.services.fuzzy_search import fuzzy_index
+from app.services.rule_index import rule_index
+from app.services.generations import generations
+from app.services.metrics import metrics, SQL_QUERY_SECONDS
+
+# Analysis columns compared against (and written from) WordAnalysis.to_dict()
+ANALYSIS_COLUMNS = (
+    "word_plain", "nikud_pattern", "syllable_type", "has_shva", "shva_types",
+    "nikud_marks", "has_dagesh", "has_open_syllable", "has_closed_syllable", "special_cases",
+)
+WRITTEN_COLUMNS = ANALYSIS_COLUMNS + tuple(REVERSED_COLUMNS)
+
+_words = Word.__table__
+_version = func.coalesce(_words.c.analyzer_version, 0)
+
+
+def stale_filter():
+    """שורות מגרסה ישנה - Rows analyzed before the current analyzer version"""
+    return or_(Word.analyzer_version.is_(None), Word.analyzer_version != ANALYZER_VERSION)
+
+
+class ReanalysisJob:
+    """
+    עבודת ניתוח מחדש - Brings stale rows up to the current analyzer version.
+    Work is done per distinct (form, version) group: each form is analyzed
+    once and compared with a stored row of the group. Groups whose analysis
+    did not change only get their version stamp; the others are rewritten
+    with one batched UPDATE per batch. Each batch commits on its own, so
+    searches keep running against a mix of old and new rows, and a stopped
+    job resumes where it left off.
+
+    Progress is kept per process; run it from one worker or the CLI.
+    """
+
+    def __init__(self, analyzer: NikudAnalyzer = None, batch_size: int = 500):
+        self.analyzer = analyzer or nikud_analyzer
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._state = self._idle()
+
+    @staticmethod
+    def _idle() -> Dict:
+        return {"status": "idle", "version": ANALYZER_VERSION, "forms_total": 0, "forms_done": 0,
+                "forms_changed": 0, "forms_skipped": 0, "rows_updated": 0,
+                "started_at": None, "finished_at": None, "error": None}
+
+    def status(self, db: Optional[Session] = None) -> Dict:
+        """מצב העבודה - Job progress, with the number of stale rows left"""
+        with self._lock:
+            state = dict(self._state)
+        if db is not None:
+            with metrics.timer(SQL_QUERY_SECONDS, "reanalysis_stale"):
+                state["stale_rows"] = db.query(func.count(Word.id)).filter(stale_filter()).scalar()
+        return state
+
+    def start(self) -> bool:
+        """סימון התחלה - False when a run is already in progress"""
+        with self._lock:
+            if self._state["status"] == "running":
+                return False
+            self._state = dict(self._idle(), status="running",
+                               started_at=datetime.now(timezone.utc).isoformat())
+            return True
+
+    def _progress(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self._state[key] += value
+
+    def _finish(self, status: str, error: Optional[str] = None):
+        with self._lock:
+            self._state.update(status=status, error=error,
+                               finished_at=datetime.now(timezone.utc).isoformat())
+
+    def stale_groups(self, db: Session) -> List[Tuple[str, int, int]]:
+        """(form, version, sample row id) for every stale group"""
+        with metrics.timer(SQL_QUERY_SECONDS, "reanalysis_groups"):
+            return [tuple(row) for row in db.execute(
+                select(Word.word, _version, func.min(Word.id))
+                .where(stale_filter())
+                .group_by(Word.word, _version)
+                .order_by(Word.word)
+            ).all()]
+
+    def _analysis(self, form: str) -> Dict:
+        data = self.analyzer.analyze_cached(form).to_dict()
+        data.update({reversed_column: data[column][::-1] or None
+                     for reversed_column, column in REVERSED_COLUMNS.items()})
+        return data
+
+    def run_batch(self, db: Session, groups: List[Tuple[str, int, int]]) -> Tuple[int, set]:
+        """
+        עיבוד אצווה - Analyze and update one batch of groups and commit.
+        Returns the rows updated and the forms whose plain spelling changed.
+        """
+        samples = {row.id: row for row in db.execute(
+            select(Word.id, *[getattr(Word, column) for column in ANALYSIS_COLUMNS])
+            .where(Word.id.in_([sample_id for _, _, sample_id in groups]))
+        ).all()}
+
+        unchanged, changed, plain_changed, skipped = [], [], set(), 0
+        patterns = set()
+        for form, version, sample_id in groups:
+            if canonicalize(form) != form:
+                skipped += 1  # Left to the canonicalize command, which rewrites the form
+                continue
+            data = self._analysis(form)
+            sample = samples[sample_id]
+            if all(getattr(sample, column) == data[column] for column in ANALYSIS_COLUMNS):
+                unchanged.append({"b_word": form, "b_version": version})
+            else:
+                values = {f"v_{column}": data[column] for column in WRITTEN_COLUMNS}
+                changed.append(dict(values, b_word=form, b_version=version))
+                patterns.add(data["nikud_pattern"])
+                if sample.word_plain != data["word_plain"]:
+                    plain_changed.add(form)
+
+        where = (_words.c.word == bindparam("b_word")) & (_version == bindparam("b_version"))
+        rows = 0
+        conn = db.connection()
+        with metrics.timer(SQL_QUERY_SECONDS, "reanalysis_update"):
+            if unchanged:
+                rows += max(conn.execute(_words.update().where(where).values(
+                    analyzer_version=ANALYZER_VERSION), unchanged).rowcount, 0)
+            if changed:
+                rows += max(conn.execute(_words.update().where(where).values(
+                    analyzer_version=ANALYZER_VERSION,
+                    **{column: bindparam(f"v_{column}") for column in WRITTEN_COLUMNS}), changed).rowcount, 0)
+                pattern_index.register(db, patterns)
+                rule_index.refresh(db, (params["b_word"] for params in changed))
+                generations.bump(db)
+        db.commit()
+
+        self._progress(forms_done=len(groups), forms_changed=len(changed),
+                       forms_skipped=skipped, rows_updated=rows)
+        return rows, plain_changed
+
+    def run(self, db: Optional[Session] = None) -> Dict:
+        """
+        הרצה - Re-analyze every stale group. Opens its own session when
+        none is given (background runs). Call start() first.
+        """
+        own = db is None
+        db = db or SessionLocal()
+        try:
+            groups = self.stale_groups(db)
+            with self._lock:
+                self._state["forms_total"] = len(groups)
+
+            plain_changed = set()
+            for start in range(0, len(groups), self.batch_size):
+                _, plain = self.run_batch(db, groups[start:start + self.batch_size])
+                plain_changed |= plain
+
+            if self._state["forms_changed"]:
+                pattern_index.rebuild(db)  # Drops patterns no longer used
+            if plain_changed:
+                forms = sorted(plain_changed)
+                source_ids = set()
+                for start in range(0, len(forms), self.batch_size):
+                    source_ids.update(db.execute(
+                        select(Word.source_id).where(Word.word.in_(forms[start:start + self.batch_size]))
+                        .distinct()).scalars())
+                source_ids.discard(None)
+                phrase_search.rebuild(db, sorted(source_ids))
+                if suggest_index.built:
+                    suggest_index.build(db)
+                    if fuzzy_index.built:
+                        fuzzy_index.build(db)
+            self._finish("done")
+        except Exception as e:
+            db.rollback()
+            self._finish("failed", str(e))
+            raise
+        finally:
+            if own:
+                db.close()
+        return self.status()
+
+    def collect(self) -> List[str]:
+        """מדדי Prometheus - Progress of the current or last run"""
+        state = self.status()
+        return [
+            "# TYPE nikud_reanalysis_forms gauge",
+            f'nikud_reanalysis_forms{{state="total"}} {state["forms_total"]}',
+            f'nikud_reanalysis_forms{{state="done"}} {state["forms_done"]}',
+            f'nikud_reanalysis_forms{{state="changed"}} {state["forms_changed"]}',
+            "# TYPE nikud_reanalysis_rows_updated gauge",
+            f'nikud_reanalysis_rows_updated {state["rows_updated"]}',
+        ]
+
+
+# Singleton instance
+reanalysis_job = ReanalysisJob()
+metrics.register_collector(reanalysis_job.collect)
@@ -0,0 +1,310 @@
+"""
+שיוך מילים לכללי ניקוד
+Rule membership: which nikud rules each distinct word form satisfies,
+evaluated once per form and stored for index lookups
+"""
+
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import exists, func, select, text
+from sqlalchemy.orm import Session
+
+from app.database import insert_ignoring_conflicts
+from app.models import NikudRule, Word, WordRule
+from app.services.nikud_analyzer import NikudAnalyzer, NikudMarks, WordAnalysis, nikud_analyzer
+from app.services.metrics import metrics, SQL_QUERY_SECONDS
+
+Predicate = Callable[[str, WordAnalysis], bool]
+
+# Orders pruning against concurrent registration (PostgreSQL advisory lock)
+RULE_LOCK = 0x6E696B72
+
+# סימנים שנצמדים לאות - Marks that may follow a letter, in any number
+_MARKS = "[\u0591-\u05C7]"
+_LETTER = "[א-ת]"
+
+# שמות סימנים בביטויי המסננים - Mark names used in filter phrases
+MARK_NAMES = {
+    "שווא": NikudMarks.SHVA, "קמץ": NikudMarks.KAMATZ, "פתח": NikudMarks.PATAH,
+    "צירה": NikudMarks.TZERE, "סגול": NikudMarks.SEGOL, "חיריק": NikudMarks.HIRIQ,
+    "חולם": NikudMarks.HOLAM, "קובוץ": NikudMarks.KUBUTZ, "דגש": NikudMarks.DAGESH,
+    "חטף קמץ": NikudMarks.HATAF_KAMATZ, "חטף פתח": NikudMarks.HATAF_PATAH,
+    "חטף סגול": NikudMarks.HATAF_SEGOL,
+}
+
+# Filters the analyzer's own checks already define
+ENDS_WITH_FILTERS = {"א", "ה", "ע", "ה דגושה", "קמץ", "צירה י", "חיריק י", "מלאופום", "חולם",
+                     "ח ופתח", "שווא אות שווא"}
+CONTAINS_FILTERS = {"שווא", "קמץ", "חטף קמץ", "פתח", "חטף פתח", "צירה", "סגול", "חטף סגול",
+                    "חיריק", "שורוק", "מלאופום", "חולם"}
+SYLLABLE_FILTERS = {"פתוחה", "סגורה"}
+
+
+def compile_phrase(phrase: str) -> Optional[str]:
+    """
+    ביטוי מסנן לביטוי רגולרי - Turn a filter phrase such as 'אות ושווא',
+    'קמץ שני אותיות ושווא' or 'ש אות ושווא' into a regex over the pointed
+    word: 'אות' is any letter, a single letter is itself, 'שני אותיות' is two
+    letters and a mark name (optionally joined by ו) is that mark on the
+    letter before it. Returns None for phrases outside this vocabulary.
+    """
+    words = phrase.replace("חטף ", "חטף_").split()
+    parts: List[str] = []
+    has_letter = False
+    for word in words:
+        name = word.replace("_", " ")
+        mark = MARK_NAMES.get(name) or (MARK_NAMES.get(name[1:]) if name.startswith("ו") else None)
+        if mark:
+            if not has_letter:
+                parts.append(_LETTER)
+                has_letter = True
+            parts.append(f"{_MARKS}*?{mark}")
+            continue
+        if word == "אות":
+            letter = _LETTER
+        elif word == "אותיות" and parts and parts[-1] == "שני":
+            parts.pop()
+            letter = f"{_LETTER}{_MARKS}*{_LETTER}"
+        elif word == "שני":
+            parts.append("שני")
+            continue
+        elif len(word) == 1 and re.match(_LETTER, word):
+            letter = word
+        else:
+            return None
+        if has_letter:
+            parts.append(f"{_MARKS}*")
+        parts.append(letter)
+        has_letter = True
+    if not parts or "שני" in parts:
+        return None
+    return "".join(parts)
+
+
+class RuleEvaluator:
+    """
+    הערכת כללים - Compiles each rule's (category, filter) conditions into
+    predicates over a word and its analysis. A rule matches when all of its
+    conditions hold; a rule with a condition outside the known vocabulary
+    is reported as unsupported and matches nothing.
+    """
+
+    def __init__(self, analyzer: NikudAnalyzer = None):
+        self.analyzer = analyzer or nikud_analyzer
+
+    @staticmethod
+    def conditions(rule) -> List[Tuple[str, str]]:
+        pairs = [(rule.category, rule.filter), (rule.category2, rule.filter2),
+                 (rule.category3, rule.filter3), (rule.category4, rule.filter4)]
+        return [(category.strip(), (value or "").strip()) for category, value in pairs
+                if category and category.strip()]
+
+    def _contains(self, value: str) -> Optional[Predicate]:
+        if value in CONTAINS_FILTERS:
+            return lambda word, analysis: self.analyzer.check_contains(word, value)
+        if value in SYLLABLE_FILTERS:
+            return lambda word, analysis: analysis.syllable_type.value == value
+        if value.startswith("שני ") and value[4:] in MARK_NAMES:
+            mark = MARK_NAMES[value[4:]]
+            return lambda word, analysis: word.count(mark) >= 2
+        pattern = compile_phrase(value)
+        if pattern is None:
+            return None
+        regex = re.compile(pattern)
+        return lambda word, analysis: regex.search(word) is not None
+
+    def _ends_with(self, value: str) -> Optional[Predicate]:
+        if value in ENDS_WITH_FILTERS:
+            return lambda word, analysis: self.analyzer.check_ends_with(word, value)
+        pattern = compile_phrase(value)
+        if pattern is None:
+            return None
+        regex = re.compile(pattern + f"{_MARKS}*$")
+        return lambda word, analysis: regex.search(word) is not None
+
+    def _starts_with(self, value: str) -> Optional[Predicate]:
+        pattern = compile_phrase(value)
+        if pattern is None:
+            return None
+        regex = re.compile(pattern)
+        return lambda word, analysis: regex.match(word) is not None
+
+    def condition(self, category: str, value: str) -> Optional[Predicate]:
+        """תנאי בודד - Predicate for one (category, filter) pair, or None"""
+        if category == "מכיל":
+            return self._contains(value)
+        if category in ("לא מכיל", "אינו מכיל"):
+            inner = self._contains(value)
+            return inner and (lambda word, analysis: not inner(word, analysis))
+        if category == "מסתיים ב":
+            return self._ends_with(value)
+        if category in ("אינו מסתיים ב", "לא מסתיים ב"):
+            inner = self._ends_with(value)
+            return inner and (lambda word, analysis: not inner(word, analysis))
+        if category == "מתחיל ב":
+            return self._starts_with(value)
+        if category == "שווא" and value in ("יש", "אין"):
+            expected = value == "יש"
+            return lambda word, analysis: analysis.has_shva == expected
+        if category == "פתוח/סגור" and value in SYLLABLE_FILTERS:
+            return lambda word, analysis: analysis.syllable_type.value == value
+        if category == "סוג שווא" and value == "ריק":
+            # A step of the sheet's flow (type not decided yet), not a test
+            return lambda word, analysis: True
+        return None
+
+    def compile(self, rule) -> Optional[List[Predicate]]:
+        """כלל שלם - The rule's predicates, or None if any is unsupported"""
+        conditions = self.conditions(rule)
+        predicates = [self.condition(category, value) for category, value in conditions]
+        if not predicates or any(predicate is None for predicate in predicates):
+            return None
+        return predicates
+
+
+class RuleIndex:
+    """
+    אינדקס שיוך לכללים - (form, rule_id) rows in word_rules. Forms are
+    evaluated when their words are stored, and only the memberships not
+    stored yet are inserted. Forms that match no rule have no rows and are
+    evaluated again on every load. Replacing the rules rebuilds the table,
+    deleting a source prunes forms no longer used.
+
+    On PostgreSQL, registering takes a shared advisory lock and pruning an
+    exclusive one, both until commit: a prune waits for loads in flight, so
+    it sees their words, and never removes memberships a load relies on.
+    Callers register and prune last, just before the commit.
+    """
+
+    def __init__(self, evaluator: RuleEvaluator = None, batch_size: int = 500):
+        self.evaluator = evaluator or RuleEvaluator()
+        self.batch_size = batch_size
+
+    @staticmethod
+    def lock(db: Session, exclusive: bool):
+        """נעילת האינדקס - The advisory lock of the memberships, held to the end of the transaction"""
+        if db.get_bind().dialect.name != "postgresql":
+            return  # SQLite serializes writers
+        function = "pg_advisory_xact_lock" if exclusive else "pg_advisory_xact_lock_shared"
+        db.execute(text(f"SELECT {function}(:key)"), {"key": RULE_LOCK})
+
+    def compiled(self, db: Session) -> Dict[int, List[Predicate]]:
+        """Supported rules by id"""
+        rules = db.query(NikudRule).all()
+        compiled = {rule.id: self.evaluator.compile(rule) for rule in rules}
+        return {rule_id: predicates for rule_id, predicates in compiled.items() if predicates}
+
+    def memberships(self, forms: Iterable[str], rules: Dict[int, List[Predicate]]) -> List[dict]:
+        rows = []
+        analyze = self.evaluator.analyzer.analyze_cached
+        for form in forms:
+            analysis = analyze(form)
+            for rule_id, predicates in rules.items():
+                if all(predicate(form, analysis) for predicate in predicates):
+                    rows.append({"word": form, "rule_id": rule_id})
+        return rows
+
+    def register(self, db: Session, forms: Iterable[str], rules: Dict[int, List[Predicate]] = None) -> int:
+        """
+        הוספת צורות - Evaluate each form and insert the memberships it is
+        missing (no commit). Inserts skip rows a concurrent load added
+        first. Returns the number of rows added.
+        """
+        forms = sorted({form for form in forms if form})
+        if not forms:
+            return 0
+        rules = self.compiled(db) if rules is None else rules
+        if not rules:
+            return 0
+        self.lock(db, exclusive=False)
+        added = 0
+        for start in range(0, len(forms), self.batch_size):
+            chunk = forms[start:start + self.batch_size]
+            rows = self.memberships(chunk, rules)
+            if not rows:
+                continue
+            stored = set(db.execute(
+                select(WordRule.word, WordRule.rule_id).where(WordRule.word.in_(chunk))).tuples())
+            rows = [row for row in rows if (row["word"], row["rule_id"]) not in stored]
+            if rows:
+                added += len(db.execute(
+                    insert_ignoring_conflicts(db, WordRule.__table__).returning(WordRule.word), rows).all())
+        return added
+
+    def refresh(self, db: Session, forms: Iterable[str]) -> int:
+        """הערכה מחדש - Re-evaluate forms whose analysis changed (no commit)"""
+        forms = sorted(set(forms))
+        self.lock(db, exclusive=False)
+        for start in range(0, len(forms), self.batch_size):
+            db.query(WordRule).filter(WordRule.word.in_(forms[start:start + self.batch_size])) \
+                .delete(synchronize_session=False)
+        return self.register(db, forms)
+
+    def prune(self, db: Session, forms: Iterable[str]):
+        """ניקוי - Drop memberships of forms no stored word uses (no commit)"""
+        forms = sorted(set(forms))
+        if not forms:
+            return
+        self.lock(db, exclusive=True)
+        for start in range(0, len(forms), self.batch_size):
+            chunk = forms[start:start + self.batch_size]
+            unused = db.execute(
+                select(WordRule.word).where(WordRule.word.in_(chunk))
+                .where(~exists().where(Word.word == WordRule.word)).distinct()
+            ).scalars().all()
+            if unused:
+                db.query(WordRule).filter(WordRule.word.in_(unused)).delete(synchronize_session=False)
+
+    def rebuild(self, db: Session) -> int:
+        """בנייה מחדש - Evaluate every stored form against the current rules"""
+        db.query(WordRule).delete(synchronize_session=False)
+        forms = db.execute(select(Word.word).distinct()).scalars().all()
+        rules = self.compiled(db)
+        added = self.register(db, forms, rules)
+        db.commit()
+        return added
+
+    def rules(self, db: Session) -> List[Dict]:
+        """
+        כללים וספירות - Every rule with its matching forms and word count.
+        Unsupported rules are listed with supported=False.
+        """
+        with metrics.timer(SQL_QUERY_SECONDS, "rule_counts"):
+            counts = {row.rule_id: (row.forms, row.words) for row in db.execute(
+                select(WordRule.rule_id,
+                       func.count(func.distinct(WordRule.word)).label("forms"),
+                       func.count(Word.id).label("words"))
+                .join(Word, Word.word == WordRule.word)
+                .group_by(WordRule.rule_id)
+            ).all()}
+        results = []
+        for rule in db.query(NikudRule).order_by(NikudRule.id).all():
+            forms, words = counts.get(rule.id, (0, 0))
+            results.append({
+                "id": rule.id,
+                "conditions": [{"category": c, "filter": f} for c, f in self.evaluator.conditions(rule)],
+                "result": rule.final_result or rule.result,
+                "notes": rule.notes,
+                "supported": self.evaluator.compile(rule) is not None,
+                "forms": forms,
+                "words": words,
+            })
+        return results
+
+    def source_counts(self, db: Session, rule_id: int) -> List[Dict]:
+        """ספירה לפי מקור - Words matching a rule in each source"""
+        with metrics.timer(SQL_QUERY_SECONDS, "rule_source_counts"):
+            rows = db.execute(
+                select(Word.source_id, func.count(Word.id).label("words"),
+                       func.count(func.distinct(Word.word)).label("forms"))
+                .join(WordRule, WordRule.word == Word.word)
+                .where(WordRule.rule_id == rule_id)
+                .group_by(Word.source_id)
+                .order_by(func.count(Word.id).desc())
+            ).all()
+        return [{"source_id": row.source_id, "words": row.words, "forms": row.forms} for row in rows]
+
+
+# Singleton instance
+rule_index = RuleIndex()
@@ -5,35 +5,79 @@ Search and Filter Engine for Hebrew Texts with Nikud - SQLAlchemy adapted
 
 from typing import List, Dict, Optional, Any, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_, and_
+from sqlalchemy import func, or_, and_, select, update
+from sqlalchemy.exc import IntegrityError
 import json
 
-from app.models import Word, Source, Category, NikudRule
-from app.services.nikud_analyzer import NikudAnalyzer, WordAnalysis
+from app.config import settings
+from app.models import Word, Source, Category, NikudRule, WordRule, REVERSED_COLUMNS, prefix_range
+from app.services.nikud_analyzer import (
+    NikudAnalyzer, NikudMarks, AnalysisBatch, nikud_analyzer, iter_tokens, canonicalize,
+    ANALYZER_VERSION
+)
+from app.services.vector_analyzer import vector_analyzer
+from app.services.pattern_search import pattern_index
+from app.services.phrase_search import phrase_search
+from app.services.suggest import suggest_index
+from app.services.content_hash import content_hash
+from app.services.ingestion import Location
+from app.services.content_store import content_store
+from app.services.fuzzy_search import fuzzy_index
+from app.services.rule_index import rule_index
+from app.services.generations import generations
+from app.services.partitions import word_partitions
+from app.services.concordance import concordance
+from app.services.metrics import metrics, LOAD_TEXT_PHASE_SECONDS, SQL_QUERY_SECONDS
 from app.schemas import SearchFilters
 
 
+class DuplicateSourceError(ValueError):
+    """תוכן שכבר נטען - A concurrent load stored the same content first"""
+
+    def __init__(self, source: Dict):
+        super().__init__(f"duplicate of source {source['id']}")
+        self.source = source
+
+
 class SearchEngine:
     """מנוע חיפוש וסינון"""
 
     def __init__(self, analyzer: NikudAnalyzer = None):
-        self.analyzer = analyzer or NikudAnalyzer()
+        self.analyzer = analyzer or nikud_analyzer
 
     def load_text(
         self,
         db: Session,
         text: str,
         source_name: str,
-        category_name: Optional[str] = None
-    ) -> Tuple[int, List[WordAnalysis]]:
+        category_name: Optional[str] = None,
+        text_hash: Optional[str] = None,
+        locations: Optional[List[Location]] = None
+    ) -> Tuple[int, AnalysisBatch]:
         """
         טעינת טקסט למערכת
-        Load text into the system
+        Load text into the system. `text_hash` is the content hash when the
+        caller already computed it while reading the text. `locations` gives
+        the paragraph or row of each line (see ingestion); without it words
+        are located by line number. Content already stored by another source
+        raises DuplicateSourceError with that source.
         """
-        # Create source
-        source = Source(name=source_name, content=text)
+        # Marks in canonical order, so offsets and forms match the stored content
+        text = canonicalize(text)
+
+        # Create source (with its id reserved when the words are partitioned)
+        text_hash = text_hash or content_hash(text)
+        source = Source(id=word_partitions.reserve(db), name=source_name, content_hash=text_hash)
         db.add(source)
-        db.flush()  # Get the ID
+        try:
+            db.flush()  # Get the ID
+        except IntegrityError:
+            # The unique content hash: a concurrent load of the text won
+            db.rollback()
+            duplicate = self.find_duplicate(db, text_hash)
+            if duplicate is None:
+                raise
+            raise DuplicateSourceError(duplicate)
 
         # Get or create category
         category = None
@@ -44,41 +88,46 @@ class SearchEngine:
                 db.add(category)
                 db.flush()
 
-        # Analyze text
-        analyses = self.analyzer.analyze_text(text)
-
-        # Split text into sentences for context
-        sentences = text.split('.')
-
-        # Save analyzed words
-        for i, analysis in enumerate(analyses):
-            # Find context
-            context = ""
-            for sentence in sentences:
-                if analysis.word in sentence:
-                    context = sentence.strip()
-                    break
-
-            word = Word(
-                word=analysis.word,
-                word_plain=analysis.word_plain,
-                nikud_pattern=analysis.nikud_pattern,
-                syllable_type=analysis.syllable_type.value,
-                has_shva=analysis.has_shva,
-                shva_types=[s.value for s in analysis.shva_types],
-                nikud_marks=list(analysis.nikud_marks),
-                has_dagesh=analysis.has_dagesh,
-                has_open_syllable=analysis.has_open_syllable,
-                has_closed_syllable=analysis.has_closed_syllable,
-                special_cases=analysis.special_cases,
-                source_id=source.id,
-                position=i,
-                context=context,
-                category_id=category.id if category else None
-            )
-            db.add(word)
-
-        db.commit()
+        # Tokenize with offsets, so contexts are sliced from the stored content
+        with metrics.timer(LOAD_TEXT_PHASE_SECONDS, "tokenize"):
+            tokens = [token for token in iter_tokens(text) if len(token.word) > 1]
+
+        # Analyze text - long texts go through the vectorized batch analyzer
+        analyzer = vector_analyzer if len(text) >= settings.vector_analysis_min_chars else self.analyzer
+        with metrics.timer(LOAD_TEXT_PHASE_SECONDS, "analyze"):
+            analyses = analyzer.analyze_words([token.word for token in tokens])
+
+        # Save analyzed words - each distinct form's dict is built once
+        with metrics.timer(LOAD_TEXT_PHASE_SECONDS, "insert"):
+            category_id = category.id if category else None
+            line, scanned = 0, 0
+            for i, (token, data) in enumerate(zip(tokens, analyses.iter_dicts())):
+                line += text.count("\n", scanned, token.start)
+                scanned = token.start
+                sheet, paragraph = locations[line] if locations else (None, line + 1)
+                word = Word(
+                    **data,
+                    source_id=source.id,
+                    position=i,
+                    char_start=token.start,
+                    char_end=token.end,
+                    paragraph=paragraph,
+                    sheet=sheet,
+                    analyzer_version=ANALYZER_VERSION,
+                    category_id=category_id
+                )
+                db.add(word)
+            pattern_index.register(db, (form.nikud_pattern for form in analyses.forms))
+            forms = [(form.word, form.word_plain) for form in analyses.forms]
+            phrase_search.index_source(db, source.id, (forms[i] for i in analyses.form_ids))
+            content_store.write(db, source.id, text)
+            source.word_count = len(analyses)
+            rule_index.register(db, (form.word for form in analyses.forms))
+
+        with metrics.timer(LOAD_TEXT_PHASE_SECONDS, "commit"):
+            generations.bump(db)
+            db.commit()
+        suggest_index.add_batch(analyses)
         return source.id, analyses
 
     def search(
@@ -92,15 +141,121 @@ class SearchEngine:
         חיפוש לפי סינונים
         Search by filters
         """
-        query = db.query(Word).outerjoin(Source).outerjoin(Category)
+        query = self.filter_query(db, db.query(Word).outerjoin(Source).outerjoin(Category), filters)
+
+        # Get total count
+        with metrics.timer(SQL_QUERY_SECONDS, "search_count"):
+            total = query.count()
+
+        # Apply pagination
+        offset = (page - 1) * per_page
+        with metrics.timer(SQL_QUERY_SECONDS, "search_page"):
+            words = query.order_by(Word.word).offset(offset).limit(per_page).all()
+
+        # Contexts of rows stored without one are sliced from their source
+        contexts = concordance.contexts(db, [w for w in words if w.context is None])
+
+        # Convert to dict
+        results = []
+        for word in words:
+            result = {
+                "id": word.id,
+                "word": word.word,
+                "word_plain": word.word_plain,
+                "nikud_pattern": word.nikud_pattern,
+                "syllable_type": word.syllable_type,
+                "has_shva": word.has_shva,
+                "shva_types": word.shva_types or [],
+                "nikud_marks": word.nikud_marks or [],
+                "has_dagesh": word.has_dagesh,
+                "has_open_syllable": word.has_open_syllable,
+                "has_closed_syllable": word.has_closed_syllable,
+                "special_cases": word.special_cases or [],
+                "position": word.position,
+                "paragraph": word.paragraph,
+                "sheet": word.sheet,
+                "context": word.context if word.context is not None else contexts.get(word.id),
+                "source_name": word.source.name if word.source else None,
+                "category_name": word.category.name if word.category else None
+            }
+            results.append(result)
+
+        return results, total
+
+    def concordance(
+        self,
+        db: Session,
+        filters: SearchFilters,
+        page: int = 1,
+        per_page: int = 50,
+        chars: int = 40,
+        tokens: Optional[int] = None
+    ) -> Tuple[List[Dict], int]:
+        """
+        קונקורדנציה - Search hits in source order, each with `tokens` words
+        (or `chars` characters) of context on each side
+        """
+        query = self.filter_query(db, db.query(Word), filters) \
+            .filter(Word.char_start.isnot(None))
+
+        with metrics.timer(SQL_QUERY_SECONDS, "concordance_count"):
+            total = query.count()
+        with metrics.timer(SQL_QUERY_SECONDS, "concordance_page"):
+            rows = query.with_entities(
+                Word.id, Word.source_id, Word.position, Word.char_start, Word.char_end,
+                Word.paragraph, Word.sheet
+            ).order_by(Word.source_id, Word.position) \
+                .offset((page - 1) * per_page).limit(per_page).all()
+
+        hits = concordance.hits(rows)
+        windows = concordance.windows(db, hits, chars=chars, tokens=tokens)
+        names = dict(db.query(Source.id, Source.name)
+                     .filter(Source.id.in_({hit.source_id for hit in hits})).all())
+        locations = {row.id: (row.paragraph, row.sheet) for row in rows}
+
+        results = [
+            {
+                "id": hit.id,
+                "source_id": hit.source_id,
+                "source_name": names.get(hit.source_id),
+                "position": hit.position,
+                "paragraph": locations[hit.id][0],
+                "sheet": locations[hit.id][1],
+                "left": windows[hit.id].left,
+                "word": windows[hit.id].keyword,
+                "right": windows[hit.id].right,
+            }
+            for hit in hits if hit.id in windows
+        ]
+        return results, total
 
-        # Apply filters
+    def filter_query(self, db: Session, query, filters: SearchFilters):
+        """
+        החלת סינונים - Apply the search filters to a query over Word
+        """
+        # Pointed values are matched in the stored (canonical) mark order
         if filters.word:
-            query = query.filter(Word.word.ilike(f"%{filters.word}%"))
+            query = query.filter(Word.word.ilike(f"%{canonicalize(filters.word)}%"))
 
-        if filters.word_plain:
+        if filters.word_plain and filters.fuzzy is not None:
+            # Similar letters and misspellings, through the fuzzy index
+            query = query.filter(Word.word_plain.in_(
+                fuzzy_index.forms(db, filters.word_plain, filters.fuzzy)))
+        elif filters.word_plain:
             query = query.filter(Word.word_plain.ilike(f"%{filters.word_plain}%"))
 
+        if filters.ends_with:
+            # Suffixes with nikud are matched against the voweled form
+            has_nikud = any(c in NikudMarks.ALL_NIKUD for c in filters.ends_with)
+            column = Word.word_reversed if has_nikud else Word.word_plain_reversed
+            query = query.filter(prefix_range(column, canonicalize(filters.ends_with)[::-1]))
+
+        if filters.pattern_ends_with:
+            query = query.filter(prefix_range(Word.pattern_reversed, filters.pattern_ends_with[::-1]))
+
+        if filters.nikud_pattern:
+            query = query.filter(pattern_index.condition(db, filters.nikud_pattern))
+
         if filters.syllable_type:
             query = query.filter(Word.syllable_type == filters.syllable_type)
 
@@ -122,43 +277,132 @@ class SearchEngine:
         if filters.category_id:
             query = query.filter(Word.category_id == filters.category_id)
 
+        if filters.rule_id:
+            # Forms matching the rule, from the membership table
+            query = query.filter(Word.word.in_(
+                select(WordRule.word).where(WordRule.rule_id == filters.rule_id)))
+
         if filters.min_length:
             query = query.filter(func.length(Word.word_plain) >= filters.min_length)
 
         if filters.max_length:
             query = query.filter(func.length(Word.word_plain) <= filters.max_length)
 
-        # Get total count
-        total = query.count()
+        return query
 
-        # Apply pagination
-        offset = (page - 1) * per_page
-        words = query.order_by(Word.word).offset(offset).limit(per_page).all()
+    def backfill_reversed_forms(self, db: Session, batch_size: int = 5000) -> int:
+        """
+        מילוי הצורות ההפוכות - Fill the reversed columns of rows stored
+        before the suffix index existed. Returns the number of rows updated.
+        """
+        updated = 0
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(Word.id, Word.word, Word.word_plain, Word.nikud_pattern)
+                .where(Word.id > last_id, Word.word_reversed.is_(None))
+                .order_by(Word.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            db.execute(update(Word), [
+                {
+                    "id": row.id,
+                    **{reversed_column: (getattr(row, column) or "")[::-1] or None
+                       for reversed_column, column in REVERSED_COLUMNS.items()}
+                }
+                for row in rows
+            ])
+            db.commit()
+            updated += len(rows)
+            last_id = rows[-1].id
+        return updated
 
-        # Convert to dict
-        results = []
-        for word in words:
-            result = {
-                "id": word.id,
-                "word": word.word,
-                "word_plain": word.word_plain,
-                "nikud_pattern": word.nikud_pattern,
-                "syllable_type": word.syllable_type,
-                "has_shva": word.has_shva,
-                "shva_types": word.shva_types or [],
-                "nikud_marks": word.nikud_marks or [],
-                "has_dagesh": word.has_dagesh,
-                "has_open_syllable": word.has_open_syllable,
-                "has_closed_syllable": word.has_closed_syllable,
-                "special_cases": word.special_cases or [],
-                "position": word.position,
-                "context": word.context,
-                "source_name": word.source.name if word.source else None,
-                "category_name": word.category.name if word.category else None
-            }
-            results.append(result)
+    def backfill_offsets(self, db: Session) -> int:
+        """
+        מילוי היסטים - Fill char_start/char_end of rows stored before offsets
+        existed, by tokenizing their source again. Rows whose word does not
+        sit at its position in the content are left without offsets.
+        """
+        updated = 0
+        source_ids = db.execute(
+            select(Word.source_id).where(Word.char_start.is_(None)).distinct()
+        ).scalars().all()
+        for source_id in source_ids:
+            content = content_store.read(db, source_id)
+            if not content:
+                continue
+            tokens = [token for token in iter_tokens(content) if len(token.word) > 1]
+            rows = db.execute(
+                select(Word.id, Word.word, Word.position)
+                .where(Word.source_id == source_id, Word.char_start.is_(None))
+            ).all()
+            values = [
+                {"id": row.id, "char_start": tokens[row.position].start,
+                 "char_end": tokens[row.position].end}
+                for row in rows
+                if row.position is not None and row.position < len(tokens)
+                and tokens[row.position].word == row.word
+            ]
+            if values:
+                db.execute(update(Word), values)
+            db.commit()
+            updated += len(values)
+        return updated
 
-        return results, total
+    def canonicalize_stored(self, db: Session, batch_size: int = 500) -> Dict:
+        """
+        שכתוב לסדר סימנים קנוני - One-off rewrite of rows stored before
+        canonicalization: forms whose marks are out of order are analyzed
+        again and their rows updated, source contents are rewritten, and the
+        posting lists, pattern index and offsets follow.
+        """
+        forms = db.execute(select(Word.word).distinct()).scalars().all()
+        changed = [form for form in forms if form and canonicalize(form) != form]
+
+        rows = 0
+        source_ids = set()
+        for start in range(0, len(changed), batch_size):
+            chunk = changed[start:start + batch_size]
+            source_ids.update(db.execute(
+                select(Word.source_id).where(Word.word.in_(chunk)).distinct()).scalars())
+            for form in chunk:
+                data = self.analyzer.analyze_word(form).to_dict()
+                data.update({reversed_column: data[column][::-1] or None
+                             for reversed_column, column in REVERSED_COLUMNS.items()})
+                data["analyzer_version"] = ANALYZER_VERSION
+                rows += db.execute(update(Word).where(Word.word == form).values(**data)).rowcount
+            generations.bump(db)
+            db.commit()
+
+        # Contents; a decomposed presentation form moves the offsets after it
+        sources = 0
+        for source_id in db.execute(select(Source.id)).scalars().all():
+            content = content_store.read(db, source_id)
+            canonical = canonicalize(content)
+            if canonical == content:
+                continue
+            content_store.write(db, source_id, canonical)
+            if len(canonical) != len(content):
+                db.execute(update(Word).where(Word.source_id == source_id)
+                           .values(char_start=None, char_end=None))
+            db.commit()
+            sources += 1
+        self.backfill_offsets(db)
+
+        source_ids.discard(None)
+        if changed:
+            rule_index.prune(db, changed)
+            rule_index.register(db, {canonicalize(form) for form in changed})
+            db.commit()
+            phrase_search.rebuild(db, sorted(source_ids))
+            pattern_index.rebuild(db)
+            if suggest_index.built:
+                suggest_index.build(db)
+                if fuzzy_index.built:
+                    fuzzy_index.build(db)
+        return {"forms": len(changed), "rows": rows, "sources": sources}
 
     def get_statistics(self, db: Session) -> Dict:
         """
@@ -168,59 +412,106 @@ class SearchEngine:
         stats = {}
 
         # Total words
-        stats['total_words'] = db.query(Word).count()
+        with metrics.timer(SQL_QUERY_SECONDS, "stats_total_words"):
+            stats['total_words'] = db.query(Word).count()
 
         # Unique words
-        stats['unique_words'] = db.query(func.count(func.distinct(Word.word))).scalar()
+        with metrics.timer(SQL_QUERY_SECONDS, "stats_unique_words"):
+            stats['unique_words'] = db.query(func.count(func.distinct(Word.word))).scalar()
 
         # Syllable distribution
-        syllable_dist = db.query(
-            Word.syllable_type,
-            func.count(Word.id)
-        ).group_by(Word.syllable_type).all()
-        
+        with metrics.timer(SQL_QUERY_SECONDS, "stats_syllables"):
+            syllable_dist = db.query(
+                Word.syllable_type,
+                func.count(Word.id)
+            ).group_by(Word.syllable_type).all()
+
         stats['syllable_distribution'] = [
             {"type": s_type or "לא ידוע", "count": count}
             for s_type, count in syllable_dist
         ]
 
         # Words with shva
-        stats['words_with_shva'] = db.query(Word).filter(Word.has_shva == True).count()
+        with metrics.timer(SQL_QUERY_SECONDS, "stats_shva"):
+            stats['words_with_shva'] = db.query(Word).filter(Word.has_shva == True).count()
 
         # Words with dagesh
-        stats['words_with_dagesh'] = db.query(Word).filter(Word.has_dagesh == True).count()
+        with metrics.timer(SQL_QUERY_SECONDS, "stats_dagesh"):
+            stats['words_with_dagesh'] = db.query(Word).filter(Word.has_dagesh == True).count()
 
         # Total sources
-        stats['total_sources'] = db.query(Source).count()
+        with metrics.timer(SQL_QUERY_SECONDS, "stats_sources"):
+            stats['total_sources'] = db.query(Source).count()
 
         # Total categories
-        stats['total_categories'] = db.query(Category).count()
+        with metrics.timer(SQL_QUERY_SECONDS, "stats_categories"):
+            stats['total_categories'] = db.query(Category).count()
 
         return stats
 
+    def find_duplicate(self, db: Session, text_hash: str) -> Optional[Dict]:
+        """
+        מקור קיים עם אותו תוכן - The source already loaded with this content
+        hash, found through its index, or None
+        """
+        source = db.execute(
+            select(Source.id, Source.name, Source.file_path, Source.created_at,
+                   func.coalesce(Source.word_count, 0).label("word_count"))
+            .where(Source.content_hash == text_hash)
+            .order_by(Source.id)
+            .limit(1)
+        ).first()
+        if source is None:
+            return None
+        return {**source._asdict(), "duplicate": True}
+
+    def backfill_word_counts(self, db: Session) -> int:
+        """מילוי מספרי מילים - Store the word count of sources created before it was kept"""
+        counts = (select(func.count()).select_from(Word)
+                  .where(Word.source_id == Source.id).scalar_subquery())
+        updated = db.execute(
+            update(Source).where(Source.word_count.is_(None)).values(word_count=counts)).rowcount
+        db.commit()
+        return updated
+
+    def backfill_content_hashes(self, db: Session) -> int:
+        """
+        מילוי טביעות תוכן - Hash the contents of sources stored before hashes
+        existed; a text stored more than once keeps the hash on its first copy
+        """
+        source_ids = db.execute(
+            select(Source.id).where(Source.content_hash.is_(None)).order_by(Source.id)
+        ).scalars().all()
+        for source_id in source_ids:
+            content = content_store.read(db, source_id)
+            text_hash = content_hash(content) if content else None
+            if text_hash and self.find_duplicate(db, text_hash) is None:
+                db.execute(update(Source).where(Source.id == source_id)
+                           .values(content_hash=text_hash))
+                db.commit()
+        return len(source_ids)
+
     def get_sources(self, db: Session) -> List[Dict]:
-        """Get all sources with word counts"""
-        sources = db.query(
-            Source,
-            func.count(Word.id).label('word_count')
-        ).outerjoin(Word).group_by(Source.id).all()
+        """
+        Get all sources with word counts - stored counts, and no content,
+        so the cost depends only on the number of sources
+        """
+        with metrics.timer(SQL_QUERY_SECONDS, "sources"):
+            sources = db.execute(
+                select(Source.id, Source.name, Source.file_path, Source.created_at,
+                       func.coalesce(Source.word_count, 0).label("word_count"))
+                .order_by(Source.id)
+            ).all()
 
-        return [
-            {
-                "id": source.id,
-                "name": source.name,
-                "created_at": source.created_at,
-                "word_count": word_count
-            }
-            for source, word_count in sources
-        ]
+        return [source._asdict() for source in sources]
 
     def get_categories(self, db: Session) -> List[Dict]:
         """Get all categories with word counts"""
-        categories = db.query(
-            Category,
-            func.count(Word.id).label('word_count')
-        ).outerjoin(Word).group_by(Category.id).all()
+        with metrics.timer(SQL_QUERY_SECONDS, "categories"):
+            categories = db.query(
+                Category,
+                func.count(Word.id).label('word_count')
+            ).outerjoin(Word).group_by(Category.id).all()
 
         return [
             {
@@ -236,8 +527,22 @@ class SearchEngine:
         """Delete a source and its words"""
         source = db.query(Source).filter(Source.id == source_id).first()
         if source:
+            counts = suggest_index.source_counts(db, source_id)
+            # Partitioned tables drop the source's words and postings at once,
+            # detached outside this transaction
+            dropped = word_partitions.drop(db, source_id)
+            # Memberships are pruned below: the lock comes before any write to
+            # the word tables, as a load takes it after its own
+            rule_index.lock(db, exclusive=True)
+            if not dropped:
+                phrase_search.remove_source(db, source_id)
+            content_store.remove(db, source_id)
             db.delete(source)
+            db.flush()
+            rule_index.prune(db, counts[1])
+            generations.bump(db)
             db.commit()
+            suggest_index.remove_counts(*counts)
             return True
         return False
 
@@ -0,0 +1,263 @@
+"""
+אינדקסים משותפים בין תהליכים
+Autocomplete and fuzzy indexes shared by every worker process through one
+memory-mapped snapshot, instead of being built and held once per worker
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Word
+from app.services.fuzzy_search import FuzzyIndex, fuzzy_index
+from app.services.generations import generations
+from app.services.metrics import metrics, SQL_QUERY_SECONDS
+from app.services.snapshot import Snapshot, SnapshotStore, StringTable
+from app.services.suggest import suggest_index
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "indexes.snap"
+# Pause before retrying a rebuild that failed
+REBUILD_RETRY_SECONDS = 5.0
+
+
+class MappedCounts(Mapping):
+    """ספירות ממופות - Read-only {form: count} over a sorted string table"""
+
+    def __init__(self, keys: StringTable, counts: np.ndarray):
+        self.keys = keys
+        self.values_ = counts
+
+    def __getitem__(self, key: str) -> int:
+        index = self.keys.find(key)
+        if index is None:
+            raise KeyError(key)
+        return int(self.values_[index])
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class MappedPrefixIndex:
+    """
+    אינדקס קידומות ממופה - PrefixIndex.suggest over mapped arrays. The top
+    of a bisect range is selected with numpy; ties keep key order, as in
+    the in-memory index.
+    """
+
+    def __init__(self, keys: StringTable, counts: np.ndarray):
+        self.keys = keys
+        self.count_array = counts
+        self.counts = MappedCounts(keys, counts)
+
+    def suggest(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        keys = self.keys
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo)
+        window = self.count_array[lo:hi]
+        if len(window) > limit:
+            threshold = np.partition(window, len(window) - limit)[len(window) - limit]
+            above = np.flatnonzero(window > threshold)
+            ties = np.flatnonzero(window == threshold)[:limit - len(above)]
+            picked = np.concatenate([above, ties])
+        else:
+            picked = np.arange(len(window))
+        order = picked[np.lexsort((picked, -window[picked]))]
+        return [(keys[lo + int(i)], int(window[i])) for i in order]
+
+    def memory_bytes(self) -> int:
+        return 0  # Mapped pages belong to the snapshot file
+
+
+class CsrMapping(Mapping):
+    """
+    מיפוי דחוס - {key: [values]} with sorted keys, one offsets array and
+    one array of indexes into a value table (compressed sparse rows)
+    """
+
+    def __init__(self, keys: StringTable, offsets: np.ndarray, members: np.ndarray, values: StringTable):
+        self.keys = keys
+        self.offsets = offsets
+        self.members = members
+        self.values_ = values
+
+    def __getitem__(self, key: str) -> List[str]:
+        index = self.keys.find(key)
+        if index is None:
+            raise KeyError(key)
+        values = self.values_
+        return [values[int(i)] for i in self.members[self.offsets[index]:self.offsets[index + 1]]]
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+def _csr(table: Dict[str, object], value_ids: Dict[str, int]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    keys = sorted(table)
+    offsets = np.zeros(len(keys) + 1, dtype=np.uint64)
+    members = []
+    for i, key in enumerate(keys):
+        ids = sorted(value_ids[value] for value in table[key])
+        members.extend(ids)
+        offsets[i + 1] = len(members)
+    return keys, offsets, np.array(members, dtype=np.uint32)
+
+
+class SharedIndexes:
+    """
+    אינדקסים משותפים - Builds the autocomplete counts and the fuzzy
+    deletion tables into one snapshot file and points the suggest and fuzzy
+    singletons at mapped views of it. The first process to need the file
+    builds it under a file lock; the others wait and map it. Source changes
+    schedule a rebuild from the database in a background thread, and every
+    process picks up the swapped file on its next lookup.
+    """
+
+    def __init__(self, store: SnapshotStore, fuzzy: FuzzyIndex):
+        self.store = store
+        self.fuzzy = fuzzy
+        self.generation: Optional[int] = None
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def sections(self, db: Session) -> Dict:
+        """תוכן תמונת המצב - Sorted counts and fuzzy tables from the words table"""
+        with metrics.timer(SQL_QUERY_SECONDS, "snapshot_counts"):
+            plain = dict(db.execute(select(Word.word_plain, func.count()).group_by(Word.word_plain)).all())
+            pointed = dict(db.execute(select(Word.word, func.count()).group_by(Word.word)).all())
+        plain_keys, pointed_keys = sorted(plain), sorted(pointed)
+
+        fuzzy = FuzzyIndex(max_distance=self.fuzzy.max_distance)
+        fuzzy.letters = self.fuzzy.letters
+        fuzzy.load(plain_keys)
+        form_ids = {form: i for i, form in enumerate(plain_keys)}
+        skeletons, group_offsets, group_members = _csr(fuzzy.groups, form_ids)
+        skeleton_ids = {skeleton: i for i, skeleton in enumerate(skeletons)}
+        deletes, delete_offsets, delete_members = _csr(fuzzy.deletes, skeleton_ids)
+
+        return {
+            "plain_keys": plain_keys,
+            "plain_counts": np.array([plain[k] for k in plain_keys], dtype=np.int64),
+            "pointed_keys": pointed_keys,
+            "pointed_counts": np.array([pointed[k] for k in pointed_keys], dtype=np.int64),
+            "skeletons": skeletons,
+            "group_offsets": group_offsets,
+            "group_members": group_members,
+            "deletes": deletes,
+            "delete_offsets": delete_offsets,
+            "delete_members": delete_members,
+        }
+
+    def build(self, db: Session, force: bool = True) -> Snapshot:
+        """
+        בנייה - Write a new snapshot (serialized across processes). Without
+        `force`, a snapshot already at the words generation is kept, so
+        workers told of the same change rebuild it once.
+        """
+        with self.store.writer():
+            previous = self.store.reload()
+            words = generations.get(db)
+            if not force and previous is not None and previous.meta.get("words_generation") == words:
+                snapshot = previous
+            else:
+                sections = self.sections(db)
+                snapshot = self.store.write(sections, {
+                    "generation": (previous.generation if previous else 0) + 1,
+                    "words_generation": words, "built_at": time.time(),
+                    "max_distance": self.fuzzy.max_distance})
+        self._attach(snapshot)
+        return snapshot
+
+    def _attach(self, snapshot: Snapshot):
+        plain = MappedPrefixIndex(snapshot.strings("plain_keys"), snapshot.array("plain_counts"))
+        pointed = MappedPrefixIndex(snapshot.strings("pointed_keys"), snapshot.array("pointed_counts"))
+        skeletons = snapshot.strings("skeletons")
+        groups = CsrMapping(skeletons, snapshot.array("group_offsets"),
+                            snapshot.array("group_members"), plain.keys)
+        deletes = CsrMapping(snapshot.strings("deletes"), snapshot.array("delete_offsets"),
+                             snapshot.array("delete_members"), skeletons)
+        with self._lock:
+            suggest_index.plain, suggest_index.pointed, suggest_index.built = plain, pointed, True
+            self.fuzzy.groups, self.fuzzy.deletes, self.fuzzy.built = groups, deletes, True
+            self.generation = snapshot.generation
+
+    def attach(self, db: Session):
+        """
+        מיפוי - Map the current snapshot (building it if there is none yet)
+        and follow swaps made by other processes
+        """
+        snapshot = self.store.current()
+        if snapshot is None:
+            with self.store.writer():
+                snapshot = self.store.reload()
+            if snapshot is None:
+                snapshot = self.build(db)
+        if snapshot.generation != self.generation:
+            self._attach(snapshot)
+
+    def changed(self):
+        """שינוי במקורות - Rebuild in the background; changes arriving meanwhile coalesce"""
+        with self._lock:
+            self._dirty.set()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._rebuild_loop, name="snapshot-rebuild",
+                                                daemon=True)
+                self._worker.start()
+
+    def _rebuild_loop(self):
+        while True:
+            # Checked and cleared under the lock changed() sets it under, so
+            # a change arriving as the loop ends starts a new worker
+            with self._lock:
+                if not self._dirty.is_set():
+                    self._worker = None
+                    return
+                self._dirty.clear()
+            db = SessionLocal()
+            try:
+                self.build(db, force=False)
+            except Exception:
+                logger.exception("snapshot rebuild failed, retrying in %g s", REBUILD_RETRY_SECONDS)
+                self._dirty.set()
+                time.sleep(REBUILD_RETRY_SECONDS)
+            finally:
+                db.close()
+
+    def wait(self, timeout: Optional[float] = None):
+        """המתנה לבנייה ברקע - For the CLI and benchmarks"""
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    def stats(self) -> Dict:
+        snapshot = self.store.current()
+        return {"generation": self.generation,
+                "file_bytes": snapshot.size if snapshot else 0,
+                "path": str(self.store.path)}
+
+
+# Singleton instance - only when a snapshot directory is configured
+shared_indexes: Optional[SharedIndexes] = None
+if settings.snapshot_dir:
+    shared_indexes = SharedIndexes(
+        SnapshotStore(Path(settings.snapshot_dir) / SNAPSHOT_FILE, settings.snapshot_check_seconds),
+        fuzzy_index)
+    suggest_index.shared = shared_indexes
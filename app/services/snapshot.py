@@ -0,0 +1,250 @@
+"""
+קובצי תמונת מצב ממופים לזיכרון
+Memory-mapped snapshot files: read-only arrays and string tables that any
+number of processes map zero-copy, replaced atomically
+"""
+
+import json
+import mmap
+import os
+import threading
+import time
+import zlib
+from bisect import bisect_left
+from collections.abc import Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows - writers are not serialized across processes
+    fcntl = None
+
+MAGIC = b"NIKUDSNP"
+_ALIGN = 8
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class StringTable(Sequence):
+    """
+    טבלת מחרוזות - n strings as one UTF-8 blob and n + 1 offsets. Strings
+    are decoded on access; a sorted table is searched with bisect, or with
+    its hash slots when it has them (see hash_slots).
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: memoryview, slots: Optional[np.ndarray] = None):
+        self.offsets = offsets
+        self.blob = blob
+        self.slots = slots
+        # Scalar reads through memoryviews are plain ints, much cheaper than numpy scalars
+        self._offsets = memoryview(offsets)
+        self._slots = memoryview(slots) if slots is not None else None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return str(self.blob[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+
+    def find(self, key: str) -> Optional[int]:
+        """מיקום מחרוזת - Index of `key` in a sorted (or hashed) table, or None"""
+        if self._slots is not None:
+            return self._probe(key.encode("utf-8"))
+        index = bisect_left(self, key)
+        if index < len(self) and self[index] == key:
+            return index
+        return None
+
+    def _probe(self, data: bytes) -> Optional[int]:
+        slots, offsets, blob = self._slots, self._offsets, self.blob
+        mask = len(slots) - 1
+        slot = zlib.crc32(data) & mask
+        while True:
+            entry = slots[slot]
+            if not entry:
+                return None
+            if blob[offsets[entry - 1]:offsets[entry]] == data:
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    @staticmethod
+    def hash_slots(strings: List[str]) -> np.ndarray:
+        """
+        טבלת גיבוב - Open-addressing slots (index + 1, 0 for empty) keyed
+        by the CRC-32 of each string, at most half full
+        """
+        size = 1
+        while size < 2 * len(strings):
+            size *= 2
+        slots = np.zeros(size, dtype=np.uint32)
+        mask = size - 1
+        for index, string in enumerate(strings):
+            slot = zlib.crc32(string.encode("utf-8")) & mask
+            while slots[slot]:
+                slot = (slot + 1) & mask
+            slots[slot] = index + 1
+        return slots
+
+    @staticmethod
+    def encode(strings: List[str]) -> tuple:
+        """(offsets, blob) of a list of strings"""
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        if encoded:
+            np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return offsets, b"".join(encoded)
+
+
+Section = Union[np.ndarray, List[str]]
+
+
+def write_snapshot(path: Union[str, Path], sections: Dict[str, Section], meta: Dict) -> Path:
+    """
+    כתיבת תמונת מצב - Write sections to a temporary file next to `path` and
+    rename it over `path`. Processes that mapped the old file keep reading
+    it until they reopen; the swap itself is atomic.
+    """
+    path = Path(path)
+    entries, chunks, offset = {}, [], 0
+    for name, value in sections.items():
+        if isinstance(value, np.ndarray):
+            value = np.ascontiguousarray(value)
+            entries[name] = {"kind": "array", "dtype": value.dtype.str, "count": len(value),
+                             "offset": offset}
+            parts = [value.tobytes()]
+        else:
+            offsets, blob = StringTable.encode(value)
+            entries[name] = {"kind": "strings", "count": len(value), "offset": offset,
+                             "blob": _aligned(offset + offsets.nbytes), "size": len(blob)}
+            parts = [offsets.tobytes(), b"\0" * (_aligned(offset + offsets.nbytes) - offset - offsets.nbytes), blob]
+        for part in parts:
+            chunks.append(part)
+            offset += len(part)
+        padding = _aligned(offset) - offset
+        chunks.append(b"\0" * padding)
+        offset += padding
+
+    header = json.dumps({"meta": meta, "sections": entries}, ensure_ascii=False).encode("utf-8")
+    start = _aligned(len(MAGIC) + 4 + len(header))
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(temporary, "wb") as out:
+        out.write(MAGIC)
+        out.write(len(header).to_bytes(4, "little"))
+        out.write(header)
+        out.write(b"\0" * (start - len(MAGIC) - 4 - len(header)))
+        for chunk in chunks:
+            out.write(chunk)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(temporary, path)
+    return path
+
+
+class Snapshot:
+    """
+    תמונת מצב ממופה - A snapshot file mapped read-only. Arrays and string
+    tables are views into the mapping, so pages are shared by every process
+    mapping the same file. The mapping is released once no view is left.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)
+            self.size = stat.st_size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} אינו קובץ תמונת מצב")
+        length = int.from_bytes(self._map[len(MAGIC):len(MAGIC) + 4], "little")
+        header = json.loads(bytes(self._map[len(MAGIC) + 4:len(MAGIC) + 4 + length]))
+        self.meta: Dict = header["meta"]
+        self._sections: Dict = header["sections"]
+        self._start = _aligned(len(MAGIC) + 4 + length)
+        self._view = memoryview(self._map)
+
+    @property
+    def generation(self) -> int:
+        return self.meta.get("generation", 0)
+
+    def array(self, name: str) -> np.ndarray:
+        entry = self._sections[name]
+        return np.frombuffer(self._map, dtype=np.dtype(entry["dtype"]), count=entry["count"],
+                             offset=self._start + entry["offset"])
+
+    def strings(self, name: str, slots: Optional[str] = None) -> StringTable:
+        """טבלת מחרוזות - With `slots`, the array section of its hash_slots"""
+        entry = self._sections[name]
+        offsets = np.frombuffer(self._map, dtype=np.uint64, count=entry["count"] + 1,
+                                offset=self._start + entry["offset"])
+        blob_start = self._start + entry["blob"]
+        return StringTable(offsets, self._view[blob_start:blob_start + entry["size"]],
+                           self.array(slots) if slots else None)
+
+
+class SnapshotStore:
+    """
+    מאגר תמונת מצב - One snapshot file, its writer lock and the mapping
+    this process reads. current() notices an atomic swap by another
+    process (checked at most every `check_seconds`) and maps the new file.
+    """
+
+    def __init__(self, path: Union[str, Path], check_seconds: float = 1.0):
+        self.path = Path(path)
+        self.check_seconds = check_seconds
+        self._snapshot: Optional[Snapshot] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def current(self) -> Optional[Snapshot]:
+        """המיפוי הנוכחי - The mapped snapshot, remapped after a swap"""
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked < self.check_seconds:
+            return self._snapshot
+        with self._lock:
+            self._checked = now
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return self._snapshot
+            if self._snapshot is None or self._snapshot.identity != (stat.st_ino, stat.st_mtime_ns):
+                self._snapshot = Snapshot(self.path)
+            return self._snapshot
+
+    def reload(self) -> Optional[Snapshot]:
+        """מיפוי מיידי - Skip the check interval (after writing)"""
+        self._checked = 0.0
+        return self.current()
+
+    @contextmanager
+    def writer(self):
+        """נעילת כותב - Serialize rebuilds across processes"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), "a+b") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def write(self, sections: Dict[str, Section], meta: Dict) -> Snapshot:
+        """כתיבה והחלפה - Call inside writer()"""
+        write_snapshot(self.path, sections, meta)
+        return self.reload()
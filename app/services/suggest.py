@@ -0,0 +1,256 @@
+"""
+השלמה אוטומטית לפי קידומת
+Prefix autocomplete over distinct word forms, ranked by occurrence count
+"""
+
+import sys
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from heapq import nlargest
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import Word
+from app.services.generations import WORDS
+from app.services.invalidation import invalidation_bus
+from app.services.metrics import metrics
+from app.services.nikud_analyzer import AnalysisBatch, NikudMarks, canonicalize
+
+# טווחים עד גודל זה נסרקים ישירות; גדולים מהם נשמרים במטמון
+SCAN_LIMIT = 256
+TOP_K = 50
+# Full builds read the counts again when updates landed meanwhile, this many times at most
+BUILD_ATTEMPTS = 3
+
+
+class _PrefixState(NamedTuple):
+    keys: List[str]
+    counts: Dict[str, int]
+    top: Dict[str, List[Tuple[str, int]]]
+
+
+class PrefixIndex:
+    """
+    אינדקס קידומות - Sorted distinct keys with their counts. A prefix is a
+    bisect range of the keys; small ranges are ranked on the spot, large ones
+    (short prefixes) keep their top entries cached until one of their keys changes.
+    Keys, counts and cached tops form one state that updates replace as a
+    whole (copy-on-write), so a lookup never locks and always reads one
+    consistent state, even while a load applies its counts.
+    """
+
+    def __init__(self):
+        self._state = _PrefixState([], {}, {})
+
+    @property
+    def keys(self) -> List[str]:
+        return self._state.keys
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        return self._state.counts
+
+    def apply(self, deltas: Dict[str, int]) -> Tuple[List[str], List[str]]:
+        """
+        עדכון מצטבר - Add (or with negative deltas, remove) occurrences;
+        returns the keys that appeared and the keys that are gone. Callers
+        serialize updates; lookups go on against the previous state.
+        """
+        old = self._state
+        counts = dict(old.counts)
+        added, removed = [], []
+        for key, delta in deltas.items():
+            count = counts.get(key, 0) + delta
+            if count > 0:
+                if key not in counts:
+                    added.append(key)
+                counts[key] = count
+            elif key in counts:
+                del counts[key]
+                removed.append(key)
+
+        # A few keys are placed with bisect; many at once re-sort
+        if len(added) + len(removed) > len(old.keys) // 16:
+            keys = sorted(counts)
+        else:
+            keys = list(old.keys)
+            for key in removed:
+                del keys[bisect_left(keys, key)]
+            for key in added:
+                insort(keys, key)
+
+        top = dict(old.top)  # One copy - lookups may still be adding to the old cache
+        for key in deltas:
+            for n in range(1, len(key) + 1):
+                top.pop(key[:n], None)
+        self._state = _PrefixState(keys, counts, top)
+        return added, removed
+
+    def suggest(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        keys, counts, cache = self._state
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo)
+        if hi - lo <= SCAN_LIMIT:
+            return [(key, counts[key]) for key in nlargest(limit, keys[lo:hi], key=counts.__getitem__)]
+
+        top = cache.get(prefix)
+        if top is None:
+            top = cache[prefix] = [
+                (key, counts[key]) for key in nlargest(TOP_K, keys[lo:hi], key=counts.__getitem__)]
+        return top[:limit]
+
+    def memory_bytes(self) -> int:
+        """טביעת זיכרון משוערת - Lists, dict, key strings and cached tops"""
+        keys, counts, cache = self._state
+        size = sys.getsizeof(keys) + sys.getsizeof(counts) + sys.getsizeof(cache)
+        size += sum(sys.getsizeof(key) for key in keys)
+        size += sum(sys.getsizeof(top) + sys.getsizeof(prefix) for prefix, top in list(cache.items()))
+        return size
+
+
+class SuggestIndex:
+    """
+    השלמה אוטומטית - Two prefix indexes, over plain and pointed forms.
+    Built from the database on first use and updated incrementally when
+    sources are loaded, imported or deleted. Listeners are told which plain
+    forms appeared or disappeared. With a shared snapshot configured
+    (`shared`), both indexes are mapped views of it and changes schedule a
+    snapshot rebuild instead.
+    """
+
+    def __init__(self):
+        self.plain = PrefixIndex()
+        self.pointed = PrefixIndex()
+        self.built = False
+        self.listeners: List[Callable[[List[str], List[str]], None]] = []
+        self.shared = None  # app.services.shared_index.SharedIndexes
+        self._lock = threading.Lock()
+        # Updates applied while full builds read the counts, one list per build
+        self._recorders: List[List[Tuple[Dict[str, int], Dict[str, int]]]] = []
+
+    def build(self, db: Session):
+        """
+        בנייה מלאה - Counts of every distinct form, from the words table.
+        An update applied while the counts are read (a load of this process
+        committing meanwhile) may be missing from them, and the bus skips
+        this process's own changes, so nothing else would repair it: the
+        counts are read again, and after the last attempt the updates that
+        landed are applied to the new indexes.
+        """
+        if self.shared is not None:
+            self.shared.build(db)
+            return
+        for attempt in range(BUILD_ATTEMPTS):
+            recorded = []
+            with self._lock:
+                self._recorders.append(recorded)
+            plain, pointed = PrefixIndex(), PrefixIndex()
+            plain.apply(dict(db.execute(
+                select(Word.word_plain, func.count()).group_by(Word.word_plain)).all()))
+            pointed.apply(dict(db.execute(
+                select(Word.word, func.count()).group_by(Word.word)).all()))
+            with self._lock:
+                self._recorders.remove(recorded)
+                if recorded and attempt < BUILD_ATTEMPTS - 1:
+                    continue
+                for plain_deltas, pointed_deltas in recorded:
+                    plain.apply(plain_deltas)
+                    pointed.apply(pointed_deltas)
+                self.plain, self.pointed, self.built = plain, pointed, True
+                return
+
+    def ensure_built(self, db: Session):
+        if self.shared is not None:
+            self.shared.attach(db)
+        elif not self.built:
+            self.build(db)
+
+    def _apply(self, plain: Dict[str, int], pointed: Dict[str, int]):
+        if self.shared is not None:
+            self.shared.changed()
+            return
+        with self._lock:
+            for recorded in self._recorders:
+                recorded.append((plain, pointed))
+            if not self.built:
+                return  # The first build reads the committed rows
+            added, removed = self.plain.apply(plain)
+            self.pointed.apply(pointed)
+        if added or removed:
+            for listener in self.listeners:
+                listener(added, removed)
+
+    def refresh(self, db: Session, generation: int = None):
+        """שינוי בתהליך אחר - Words changed elsewhere; rebuild what is built"""
+        if self.shared is not None:
+            self.shared.changed()
+        elif self.built:
+            self.build(db)
+
+    def add_batch(self, batch: AnalysisBatch):
+        """מקור שנטען - Count the words of a loaded text"""
+        pointed, plain = Counter(), Counter()
+        for form, count in zip(batch.forms, batch.counts()):
+            pointed[form.word] += count
+            plain[form.word_plain] += count
+        self._apply(plain, pointed)
+
+    def add_counts(self, plain: Dict[str, int], pointed: Dict[str, int]):
+        self._apply(plain, pointed)
+
+    def source_counts(self, db: Session, source_id: int) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """ספירות מקור - (plain, pointed) counts of a source's stored words"""
+        plain = dict(db.execute(
+            select(Word.word_plain, func.count())
+            .where(Word.source_id == source_id).group_by(Word.word_plain)).all())
+        pointed = dict(db.execute(
+            select(Word.word, func.count())
+            .where(Word.source_id == source_id).group_by(Word.word)).all())
+        return plain, pointed
+
+    def remove_counts(self, plain: Dict[str, int], pointed: Dict[str, int]):
+        """מקור שנמחק - Subtract counts read with source_counts before deletion"""
+        self._apply({k: -v for k, v in plain.items()}, {k: -v for k, v in pointed.items()})
+
+    def suggest(self, db: Session, prefix: str, limit: int = 10,
+                pointed: Optional[bool] = None) -> List[Dict]:
+        """
+        הצעות להשלמה - The most frequent forms starting with the prefix;
+        pointed prefixes search pointed forms unless `pointed` says otherwise
+        """
+        prefix = canonicalize(prefix.strip())
+        if not prefix:
+            return []
+        self.ensure_built(db)
+        if pointed is None:
+            pointed = any(c in NikudMarks.ALL_NIKUD for c in prefix)
+        index = self.pointed if pointed else self.plain
+        return [{"word": word, "count": count} for word, count in index.suggest(prefix, limit)]
+
+    def stats(self) -> Dict:
+        return {
+            "built": self.built,
+            "plain_forms": len(self.plain.keys),
+            "pointed_forms": len(self.pointed.keys),
+            "memory_bytes": self.plain.memory_bytes() + self.pointed.memory_bytes(),
+        }
+
+    def collect(self) -> List[str]:
+        """מדדי Prometheus - Form counts and memory footprint"""
+        stats = self.stats()
+        return [
+            "# TYPE nikud_suggest_forms gauge",
+            f'nikud_suggest_forms{{kind="plain"}} {stats["plain_forms"]}',
+            f'nikud_suggest_forms{{kind="pointed"}} {stats["pointed_forms"]}',
+            "# TYPE nikud_suggest_memory_bytes gauge",
+            f'nikud_suggest_memory_bytes {stats["memory_bytes"]}',
+        ]
+
+
+# Singleton instance
+suggest_index = SuggestIndex()
+metrics.register_collector(suggest_index.collect)
+invalidation_bus.subscribe(WORDS, suggest_index.refresh)
@@ -0,0 +1,212 @@
+"""
+ניתוח ניקוד וקטורי לטקסט שלם
+Whole-text vectorized nikud analysis over a NumPy code-point array
+"""
+
+from typing import Iterable, List
+
+import numpy as np
+
+from app.services.nikud_analyzer import (
+    NikudMarks, AnalysisBatch, WordAnalysis, ShvaType, SyllableType,
+    MARK_BITS, PATTERN_CHARS, NIKUD_DELETE_TABLE, SHVA_CODES, SYLLABLE_CODES,
+    SPECIAL_CASE_BITS, FLAG_SHVA, FLAG_DAGESH, canonicalize, tokenize
+)
+
+# טבלת סיווג לגוש העברי ביוניקוד (U+0590-U+05FF)
+BLOCK_START = 0x0590
+BLOCK_SIZE = 0x70
+
+LETTER = 1 << 0
+NIKUD = 1 << 1
+VOWEL = 1 << 2
+SHVA = 1 << 3
+DAGESH = 1 << 4
+KAMATZ = 1 << 5
+TZERE = 1 << 6
+HIRIQ = 1 << 7
+PATAH = 1 << 8
+HOLAM = 1 << 9  # חולם או חולם מלא
+
+_CLASS = np.zeros(BLOCK_SIZE + 1, dtype=np.uint16)  # last slot: outside the block
+_BITS = np.zeros(BLOCK_SIZE + 1, dtype=np.uint32)
+for _char in NikudMarks.HEBREW_LETTERS:
+    _CLASS[ord(_char) - BLOCK_START] |= LETTER
+for _char in NikudMarks.ALL_NIKUD:
+    _CLASS[ord(_char) - BLOCK_START] |= NIKUD
+    _BITS[ord(_char) - BLOCK_START] = MARK_BITS[_char]
+for _char in NikudMarks.VOWELS:
+    _CLASS[ord(_char) - BLOCK_START] |= VOWEL
+for _char, _flag in ((NikudMarks.SHVA, SHVA), (NikudMarks.DAGESH, DAGESH),
+                     (NikudMarks.KAMATZ, KAMATZ), (NikudMarks.TZERE, TZERE),
+                     (NikudMarks.HIRIQ, HIRIQ), (NikudMarks.PATAH, PATAH),
+                     (NikudMarks.HOLAM, HOLAM), (NikudMarks.HOLAM_MALE, HOLAM)):
+    _CLASS[ord(_char) - BLOCK_START] |= _flag
+
+_PATTERN_TABLE = str.maketrans(PATTERN_CHARS)
+
+_NA = SHVA_CODES[ShvaType.NA]
+_NAH = SHVA_CODES[ShvaType.NAH]
+_DOUBLE_NAH = SHVA_CODES[ShvaType.DOUBLE_NAH]
+_NONE = bytes([SHVA_CODES[ShvaType.NONE]])
+_NA_AND_NAH = bytes([SHVA_CODES[ShvaType.NA_AND_NAH]])
+_ALL_DOUBLE_NAH = bytes([_DOUBLE_NAH])
+
+
+class VectorAnalyzer:
+    """
+    מנתח וקטורי - Batch mode of NikudAnalyzer.analyze_text. The text's
+    distinct forms are encoded as one code-point array; masks, word boundaries
+    and per-word features are computed with array operations, and Python only
+    runs once per distinct form to build the results.
+    """
+
+    def analyze_text(self, text: str) -> AnalysisBatch:
+        """ניתוח טקסט שלם - Same result as NikudAnalyzer.analyze_text"""
+        return self.analyze_words(tokenize(text))
+
+    def analyze_words(self, tokens: Iterable[str]) -> AnalysisBatch:
+        """ניתוח רשימת מילים - Same result as NikudAnalyzer.analyze_words"""
+        results = AnalysisBatch()
+        words = [word for word in tokens if len(word) > 1]
+        spellings = {word: canonicalize(word) for word in dict.fromkeys(words)}
+        distinct = list(dict.fromkeys(spellings.values()))
+        if not distinct:
+            return results
+
+        self._analyze_forms(distinct, results)
+        for word, canonical in spellings.items():
+            if word != canonical:
+                results.alias(word, results.form_id(canonical))
+        lookup = results._lookup
+        results.form_ids.extend([lookup[word] for word in words])
+        return results
+
+    def _analyze_forms(self, distinct: List[str], results: AnalysisBatch):
+        """ניתוח הצורות הייחודיות - Analyze tokenizer output forms into results"""
+        cp = np.frombuffer(' '.join(distinct).encode('utf-32-le'), dtype=np.uint32)
+        index = np.minimum(cp - BLOCK_START, BLOCK_SIZE)  # wraps below the block
+        cls = _CLASS[index]
+        word_char = (cls & (LETTER | NIKUD)) != 0
+
+        # Word boundaries
+        edges = np.diff(np.concatenate(([False], word_char, [False])).astype(np.int8))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        lengths = ends - starts
+
+        # Position of each character within its word
+        token = np.cumsum(edges[:-1] == 1) - 1
+        positions = np.arange(len(cp))
+        local = positions - starts[token]
+        from_end = ends[token] - 1 - positions
+
+        def has(flag, classes=cls):
+            return (classes & flag) != 0
+
+        def near_end(flag, first, last):
+            """סימן במרחק [first, last] מסוף המילה, לא בתחילתה"""
+            return has(flag) & (local >= 1) & (from_end >= first) & (from_end <= last)
+
+        def shifted(array, offset):
+            out = np.zeros_like(array)
+            out[:-offset] = array[offset:]
+            return out
+
+        # Per-character conditions packed into bits, reduced per word in one pass
+        kamatz = has(KAMATZ)
+        next1, next2, next3 = shifted(cls, 1), shifted(cls, 2), shifted(cls, 3)
+        conditions = (
+            near_end(KAMATZ, 0, 1),                                     # 0 ends with kamatz
+            near_end(TZERE, 1, 2),                                      # 1 tzere before yod
+            near_end(HIRIQ, 1, 2),                                      # 2 hiriq before yod
+            near_end(HOLAM, 1, 2),                                      # 3 holam before vav
+            near_end(HOLAM, 0, 1),                                      # 4 ends with holam
+            near_end(VOWEL, 0, 1),                                      # 5 final vowel
+            near_end(DAGESH, 0, 1),                                     # 6 final dagesh
+            near_end(KAMATZ, 2, 3),                                     # 7 kamatz before heh
+            kamatz & (from_end >= 3) & has(LETTER, next1) & has(SHVA, next2),  # 8
+            kamatz & (from_end >= 4) & has(LETTER, next1) & has(LETTER, next2)
+            & has(SHVA, next3),                                         # 9
+            kamatz & (from_end >= 1) & (shifted(cp, 1) == ord('י')),    # 10
+            near_end(PATAH, 1, 2),                                      # 11 patah before het
+            has(DAGESH),                                                # 12
+        )
+        packed = np.zeros(len(cp), dtype=np.uint32)
+        for bit, condition in enumerate(conditions):
+            packed |= condition.astype(np.uint32) << bit
+        any_bits = np.bitwise_or.reduceat(packed, starts)
+
+        def word_has(bit):
+            return (any_bits & (1 << bit)) != 0
+
+        last = cp[ends - 1]
+        ends_with = {letter: last == ord(letter) for letter in 'אהעיוח'}
+        long_enough = lengths >= 2
+
+        # check_syllable_type
+        open_syllable = (
+            ends_with['א'] | ends_with['ה'] | ends_with['ע']
+            | word_has(0)
+            | (long_enough & ends_with['י'] & (word_has(1) | word_has(2)))
+            | (long_enough & ends_with['ו'] & word_has(3))
+            | word_has(4)
+        )
+        last_is_letter = has(LETTER, _CLASS[np.minimum(last - BLOCK_START, BLOCK_SIZE)])
+        closed_syllable = (~open_syllable & last_is_letter
+                           & ~(ends_with['א'] | ends_with['ה'] | ends_with['ע'])
+                           & ~word_has(5))
+        syllable = np.full(len(starts), SYLLABLE_CODES[SyllableType.UNKNOWN], dtype=np.uint8)
+        syllable[open_syllable] = SYLLABLE_CODES[SyllableType.OPEN]
+        syllable[closed_syllable] = SYLLABLE_CODES[SyllableType.CLOSED]
+
+        # check_kamatz_katan and the patah genuva ending
+        heh_dagesh = long_enough & ends_with['ה'] & word_has(6)
+        kamatz_katan = (heh_dagesh & word_has(7)) | word_has(8) | word_has(9) | word_has(10)
+        patah_genuva = long_enough & ends_with['ח'] & word_has(11)
+
+        # analyze_shva: one code per shva, in text order
+        shva = has(SHVA)
+        shva_at = np.flatnonzero(shva)
+        shva_token = token[shva_at]
+        shva_count = np.bincount(shva_token, minlength=len(starts))
+        before = np.zeros_like(cls)
+        before[1:] = cls[:-1]
+        shva_codes = np.where(
+            local[shva_at] <= 2, _NA,
+            np.where(has(VOWEL, before[shva_at]), _NAH,
+                     np.where(has(SHVA, before[shva_at]), _DOUBLE_NAH, _NAH))
+        ).astype(np.uint8)
+        na_count = np.bincount(shva_token[shva_codes == _NA], minlength=len(starts))
+        nah_count = np.bincount(shva_token[shva_codes == _NAH], minlength=len(starts))
+        shva_offsets = np.concatenate(([0], np.cumsum(shva_count)))
+
+        # Flags, marks and special cases
+        flags = np.where(shva_count > 0, FLAG_SHVA, 0) | np.where(word_has(12), FLAG_DAGESH, 0)
+        mark_bits = np.bitwise_or.reduceat(_BITS[index], starts)
+        special = (np.where(kamatz_katan, SPECIAL_CASE_BITS["קמץ קטן"], 0)
+                   | np.where(patah_genuva, SPECIAL_CASE_BITS["פתח גנובה"], 0)
+                   | np.where(shva_count >= 2, SPECIAL_CASE_BITS["שני שוואים"], 0))
+
+        # Build results once per distinct form
+        shva_bytes = shva_codes.tobytes()
+        columns = zip(distinct, syllable.tolist(), shva_count.tolist(), na_count.tolist(),
+                      nah_count.tolist(), shva_offsets.tolist(), mark_bits.tolist(),
+                      flags.tolist(), special.tolist())
+        for (word, syllable_code, n_shva, n_na, n_nah, offset,
+             bits, flag, special_bits) in columns:
+            if n_shva == 0:
+                codes = _NONE
+            elif n_shva >= 2 and n_na and n_nah:
+                codes = _NA_AND_NAH
+            elif n_shva >= 2 and n_nah >= 2:
+                codes = _ALL_DOUBLE_NAH
+            else:
+                codes = shva_bytes[offset:offset + n_shva]
+            results.add_form(WordAnalysis.from_codes(
+                word, word.translate(NIKUD_DELETE_TABLE), word.translate(_PATTERN_TABLE),
+                syllable_code, codes, bits, flag, special_bits
+            ))
+
+# Singleton instance
+vector_analyzer = VectorAnalyzer()
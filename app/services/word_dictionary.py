@@ -0,0 +1,224 @@
+"""
+מילון צורות ממופה לזיכרון
+On-disk dictionary of the distinct analyzed forms, mapped at startup so
+analyses are looked up instead of computed, with no parsing or warm-up
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Word
+from app.services.generations import generations
+from app.services.metrics import metrics, SQL_QUERY_SECONDS
+from app.services.nikud_analyzer import (
+    ANALYZER_VERSION, NikudAnalyzer, WordAnalysis, canonicalize, nikud_analyzer, remove_nikud
+)
+from app.services.snapshot import Snapshot, SnapshotStore, StringTable
+
+DICTIONARY_FILE = "dictionary.snap"
+
+
+class DictionaryInfo(NamedTuple):
+    """lru_cache-style counters, for metrics.register_cache"""
+    hits: int
+    misses: int
+    maxsize: Optional[int]
+    currsize: int
+
+
+class DictionaryTables(NamedTuple):
+    """
+    The mapped columns of one dictionary file, swapped as a whole. Columns
+    are memoryviews over the mapped arrays, read one scalar at a time.
+    """
+    snapshot: Snapshot
+    words: StringTable
+    counts: memoryview
+    mark_bits: memoryview
+    flags: memoryview
+    syllable_codes: memoryview
+    special_bits: memoryview
+    shva_offsets: memoryview
+    shva_codes: memoryview
+
+    @classmethod
+    def map(cls, snapshot: Snapshot) -> "DictionaryTables":
+        return cls(snapshot, snapshot.strings("words", slots="word_slots"),
+                   *(memoryview(snapshot.array(name)) for name in cls._fields[2:]))
+
+
+class WordDictionary:
+    """
+    מילון צורות - Sorted canonical forms (one string table) with their
+    occurrence counts and encoded analyses: mark bitmask, flags, syllable
+    code, special-case bits and shva codes (offsets into one byte array).
+    The file records the analyzer version it was computed with and the
+    words generation it was exported at. A file of the current analyzer
+    version is consulted by the analyzer even when the words changed since,
+    since its analyses are still right - only new forms miss. A file behind
+    the database is exported again in the background.
+    """
+
+    def __init__(self, store: SnapshotStore, analyzer: NikudAnalyzer):
+        self.store = store
+        self.analyzer = analyzer
+        self.tables: Optional[DictionaryTables] = None
+        self._mapped: Optional[Snapshot] = None  # Last file seen, usable or not
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    def sections(self, db: Session) -> Dict:
+        """תוכן המילון - Every canonical stored form, analyzed by the current rules"""
+        with metrics.timer(SQL_QUERY_SECONDS, "dictionary_forms"):
+            counts = dict(db.execute(select(Word.word, func.count()).group_by(Word.word)).all())
+        # Forms stored before canonicalization are never looked up
+        forms = sorted(form for form in counts if form and canonicalize(form) == form)
+        # Computed by an analyzer of its own: self.analyzer consults the
+        # mapped file this export replaces, which may be stale
+        analyze = NikudAnalyzer().analyze_word
+        analyses = [analyze(form) for form in forms]
+        shva_offsets = np.zeros(len(forms) + 1, dtype=np.uint32)
+        if analyses:
+            np.cumsum([len(a.shva_codes) for a in analyses], out=shva_offsets[1:])
+        return {
+            "words": forms,
+            "word_slots": StringTable.hash_slots(forms),
+            "counts": np.array([counts[form] for form in forms], dtype=np.int64),
+            "mark_bits": np.array([a.mark_bits for a in analyses], dtype=np.uint32),
+            "flags": np.array([a.flags for a in analyses], dtype=np.uint8),
+            "syllable_codes": np.array([a.syllable_code for a in analyses], dtype=np.uint8),
+            "special_bits": np.array([a.special_bits for a in analyses], dtype=np.uint8),
+            "shva_offsets": shva_offsets,
+            "shva_codes": np.frombuffer(b"".join(a.shva_codes for a in analyses), dtype=np.uint8),
+        }
+
+    def export(self, db: Session) -> Snapshot:
+        """
+        ייצוא - Write the dictionary at the current words generation. Runs
+        under the snapshot's writer lock; a process that finds the file
+        already current once it holds the lock keeps it.
+        """
+        with self.store.writer():
+            generation = generations.get(db)
+            snapshot = self.store.reload()
+            if not self._current(snapshot, generation):
+                sections = self.sections(db)
+                snapshot = self.store.write(sections, {
+                    "generation": generation, "analyzer_version": ANALYZER_VERSION,
+                    "forms": len(sections["words"]), "built_at": time.time()})
+        self._attach(snapshot)
+        return snapshot
+
+    @staticmethod
+    def _current(snapshot: Optional[Snapshot], generation: int) -> bool:
+        return (snapshot is not None and snapshot.generation == generation
+                and snapshot.meta.get("analyzer_version") == ANALYZER_VERSION)
+
+    @property
+    def snapshot(self) -> Optional[Snapshot]:
+        tables = self.tables
+        return tables.snapshot if tables else None
+
+    def _attach(self, snapshot: Optional[Snapshot]):
+        with self._lock:
+            self._mapped = snapshot
+            if snapshot is not None and snapshot.meta.get("analyzer_version") != ANALYZER_VERSION:
+                snapshot = None  # Computed by other rules - useless until exported again
+            self.tables = DictionaryTables.map(snapshot) if snapshot is not None else None
+            self.analyzer.dictionary = self if snapshot is not None else None
+
+    def open(self, db: Optional[Session] = None) -> bool:
+        """
+        מיפוי באתחול - Map the file if there is one. With a session, check
+        it against the words generation and export a stale file in the
+        background. Returns whether the mapped file is current.
+        """
+        self._attach(self.store.current())
+        if db is None:
+            return self.snapshot is not None
+        if self._current(self.snapshot, generations.get(db)):
+            return True
+        self.refresh()
+        return False
+
+    def refresh(self):
+        """ייצוא ברקע - Export in a background thread, once at a time"""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._export, name="dictionary-export", daemon=True)
+                self._worker.start()
+
+    def _export(self):
+        db = SessionLocal()
+        try:
+            self.export(db)
+        finally:
+            db.close()
+
+    def wait(self, timeout: Optional[float] = None):
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    def _tables(self) -> Optional[DictionaryTables]:
+        snapshot = self.store.current()
+        if snapshot is not self._mapped:
+            self._attach(snapshot)  # Swapped by another process
+        return self.tables
+
+    def lookup(self, word: str) -> Optional[WordAnalysis]:
+        """
+        ניתוח מהמילון - The stored analysis of a canonical form, or None.
+        Plain spelling and pattern are derived from the word itself.
+        """
+        tables = self._tables()
+        index = tables.words.find(word) if tables else None
+        if index is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return WordAnalysis.from_codes(
+            word, remove_nikud(word), self.analyzer.extract_nikud_pattern(word),
+            tables.syllable_codes[index],
+            tables.shva_codes[tables.shva_offsets[index]:tables.shva_offsets[index + 1]].tobytes(),
+            tables.mark_bits[index], tables.flags[index], tables.special_bits[index])
+
+    def count(self, word: str) -> int:
+        """מספר מופעים בעת הייצוא - Occurrences when the file was exported"""
+        tables = self._tables()
+        index = tables.words.find(canonicalize(word)) if tables else None
+        return 0 if index is None else tables.counts[index]
+
+    def cache_info(self) -> DictionaryInfo:
+        snapshot = self.snapshot
+        return DictionaryInfo(self.hits, self.misses, None, snapshot.meta.get("forms", 0) if snapshot else 0)
+
+    def stats(self) -> Dict:
+        snapshot = self.snapshot
+        return {
+            "mapped": snapshot is not None,
+            "forms": snapshot.meta.get("forms", 0) if snapshot else 0,
+            "generation": snapshot.generation if snapshot else None,
+            "file_bytes": snapshot.size if snapshot else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Singleton instance - only when a snapshot directory is configured
+word_dictionary: Optional[WordDictionary] = None
+if settings.snapshot_dir:
+    word_dictionary = WordDictionary(
+        SnapshotStore(Path(settings.snapshot_dir) / DICTIONARY_FILE, settings.snapshot_check_seconds),
+        nikud_analyzer)
+    metrics.register_cache("dictionary", word_dictionary.cache_info)
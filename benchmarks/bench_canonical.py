@@ -0,0 +1,74 @@
+"""
+מדידת סדר סימנים קנוני
+Canonicalizer benchmark: texts already in canonical order, NFD texts and
+single words, with a check that every spelling maps to the same string
+
+Usage: python -m benchmarks.bench_canonical [--words N]
+"""
+
+import argparse
+import json
+import statistics
+import time
+import unicodedata
+
+from app.services.nikud_analyzer import MARK_RANK, canonicalize, tokenize
+from benchmarks.corpus import synthetic_text
+
+
+def median_ms(func_, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func_()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def naive(text: str) -> str:
+    """מיון כל רצף סימנים - Sort the marks after every character, no fast path"""
+    out, marks = [], []
+    for char in text:
+        if char in MARK_RANK:
+            marks.append(char)
+        else:
+            out.extend(sorted(marks, key=MARK_RANK.__getitem__))
+            marks = []
+            out.append(char)
+    out.extend(sorted(marks, key=MARK_RANK.__getitem__))
+    return "".join(out)
+
+
+def run(words: int, repeat: int) -> dict:
+    text = synthetic_text(words)
+    canonical = canonicalize(text)
+    nfd = unicodedata.normalize("NFD", text)
+    nfc = unicodedata.normalize("NFC", text)
+
+    assert canonical == naive(text) == canonicalize(nfd) == canonicalize(nfc)
+    assert canonicalize(canonical) is canonical
+    forms = list(dict.fromkeys(tokenize(nfd)))
+    assert len({canonicalize(form) for form in forms}) == len(set(tokenize(canonical)))
+
+    megabytes = len(text.encode("utf-8")) / 1e6
+    results = {"benchmark": "canonicalize", "megabytes": round(megabytes, 2)}
+    for name, value in (("canonical", canonical), ("nfd", nfd)):
+        ms = median_ms(lambda: canonicalize(value), repeat)
+        results[name] = {"ms": ms, "mb_per_sec": round(megabytes / ms * 1000, 1),
+                         "naive_ms": median_ms(lambda: naive(value), 1)}
+    sample = forms[:10_000]
+    results["word_us"] = round(median_ms(lambda: [canonicalize(f) for f in sample], repeat)
+                               * 1000 / len(sample), 3)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=300_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.words, args.repeat), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
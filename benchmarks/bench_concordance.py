@@ -0,0 +1,119 @@
+"""
+מדידת קונקורדנציה
+Concordance benchmark: windows read per source vs. one query per hit
+
+Usage: python -m benchmarks.bench_concordance [--words N] [--per-page N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Word, Source
+from app.schemas import SearchFilters
+from app.services.concordance import Concordance
+from app.services.content_store import content_store
+from app.services.nikud_analyzer import NikudAnalyzer, iter_tokens
+from app.services.search_engine import SearchEngine
+from benchmarks.corpus import synthetic_text
+
+
+def median_ms(func_, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func_()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def per_hit(db, hits, chars: int):
+    """חלון לכל מופע בקריאה נפרדת - One content read per hit"""
+    return [
+        content_store.read_ranges(db, hit.source_id, [(max(0, hit.char_start - chars),
+                                                       hit.char_end + chars)])[0]
+        for hit in hits
+    ]
+
+
+def run(words: int, per_page: int, repeat: int) -> dict:
+    content = synthetic_text(words)
+    tokens = [token for token in iter_tokens(content) if len(token.word) > 1]
+    analyses = NikudAnalyzer().analyze_words([token.word for token in tokens])
+    rows = [dict(data, source_id=1, position=i, char_start=token.start, char_end=token.end)
+            for i, (token, data) in enumerate(zip(tokens, analyses.iter_dicts()))]
+
+    # The most frequent plain form gives the most hits to page through
+    counts = {}
+    for row in rows:
+        counts[row["word_plain"]] = counts.get(row["word_plain"], 0) + 1
+    keyword = max(counts, key=counts.get)
+
+    results = {"benchmark": "concordance", "rows": len(rows), "keyword_hits": counts[keyword],
+               "per_page": per_page}
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            db.add(Source(id=1, name="סינתטי"))
+            db.flush()
+            content_store.write(db, 1, content)
+            for start in range(0, len(rows), 10_000):
+                db.execute(insert(Word), rows[start:start + 10_000])
+            db.commit()
+            db.execute(text("ANALYZE"))
+
+            concordance = Concordance()
+            page = db.query(
+                Word.id, Word.source_id, Word.position, Word.char_start, Word.char_end
+            ).filter(Word.word_plain == keyword) \
+                .order_by(Word.source_id, Word.position).limit(per_page).all()
+            hits = concordance.hits(page)
+
+            # Both ways slice the same text around every hit
+            windows = concordance.windows(db, hits, chars=40)
+            for hit, naive in zip(hits, per_hit(db, hits, 40)):
+                window = windows[hit.id]
+                assert window.keyword == content[hit.char_start:hit.char_end]
+                assert (window.left + window.keyword + window.right) in naive.replace("\n", " ")
+
+            results["chars_40"] = {
+                "batched_ms": median_ms(lambda: concordance.windows(db, hits, chars=40), repeat),
+                "per_hit_ms": median_ms(lambda: per_hit(db, hits, 40), repeat),
+            }
+            results["tokens_5_ms"] = median_ms(
+                lambda: concordance.windows(db, hits, tokens=5), repeat)
+            # Full endpoint path (substring filter, count and page) at the last page
+            search_engine = SearchEngine()
+            filters = SearchFilters(word_plain=keyword)
+            total = search_engine.concordance(db, filters, per_page=1)[1]
+            results["endpoint_last_page"] = {
+                "hits": total,
+                "ms": median_ms(lambda: search_engine.concordance(
+                    db, filters, page=max(1, -(-total // per_page)), per_page=per_page), repeat),
+            }
+        finally:
+            db.close()
+            engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=300_000)
+    parser.add_argument("--per-page", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.words, args.per_page, args.repeat), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+מדידת מילון הצורות הממופה
+Word dictionary benchmark: export time, time to map the file at startup,
+and analyzing forms by dictionary lookup vs. computing them. Every looked-up
+analysis is checked against the computed one.
+
+Usage: python -m benchmarks.bench_dictionary [--forms N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Word
+from app.services.nikud_analyzer import NikudAnalyzer
+from app.services.snapshot import SnapshotStore
+from app.services.word_dictionary import DICTIONARY_FILE, WordDictionary
+from benchmarks.corpus import synthetic_vocabulary
+
+
+def median_ms(func_, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func_()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def run(forms: int, repeat: int) -> dict:
+    computing = NikudAnalyzer()
+    batch = computing.analyze_words(synthetic_vocabulary(forms))
+    words = [form.word for form in batch.forms]
+    results = {"benchmark": "word_dictionary", "forms": len(words)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            rows = [dict(data, position=i) for i, data in enumerate(batch.iter_dicts())]
+            for start in range(0, len(rows), 5000):
+                db.execute(insert(Word), rows[start:start + 5000])
+            db.commit()
+
+            path = os.path.join(directory, DICTIONARY_FILE)
+            exporter = WordDictionary(SnapshotStore(path), NikudAnalyzer())
+            started = time.perf_counter()
+            exporter.export(db)
+            results["export_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            results["file_bytes"] = os.path.getsize(path)
+
+            # A fresh process: map the file and answer the first lookup
+            looking_up = NikudAnalyzer()
+            started = time.perf_counter()
+            dictionary = WordDictionary(SnapshotStore(path), looking_up)
+            dictionary.open()
+            looking_up.analyze_word(words[0])
+            results["open_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+            for word in words:
+                assert looking_up.analyze_word(word) == computing.analyze_word(word), word
+            assert dictionary.hits == len(words) + 1 and dictionary.misses == 0
+
+            results["lookup_us"] = round(median_ms(
+                lambda: [looking_up.analyze_word(w) for w in words], repeat) * 1000 / len(words), 2)
+            results["compute_us"] = round(median_ms(
+                lambda: [computing.analyze_word(w) for w in words], repeat) * 1000 / len(words), 2)
+        finally:
+            db.close()
+            engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--forms", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.forms, args.repeat), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
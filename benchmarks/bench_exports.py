@@ -0,0 +1,76 @@
+"""
+מדידת מטמון הייצוא
+Export cache benchmark: building a workbook for a filtered export vs.
+requesting the same export again, when the file is found on disk and read
+back. Runs against the configured database, loading a synthetic text first:
+
+Usage: USE_SQLITE=true SQLITE_PATH=/tmp/bench_exports.db python -m benchmarks.bench_exports [--words N]
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+
+def median_ms(func_, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func_()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def run(words: int, repeat: int) -> dict:
+    from app.database import SessionLocal, init_db
+    from app.schemas import SearchFilters
+    from app.services.export_jobs import ExportJobs
+    from app.services.search_engine import search_engine
+    from benchmarks.corpus import synthetic_text
+
+    init_db()
+    db = SessionLocal()
+    try:
+        source_id, analyses = search_engine.load_text(db, synthetic_text(words), "מדידת ייצוא")
+        filters = SearchFilters(source_id=source_id, has_shva=True)
+        results = {"benchmark": "export_cache", "words": len(analyses)}
+
+        with tempfile.TemporaryDirectory() as directory:
+            jobs = ExportJobs(Path(directory), max_bytes=1 << 30)
+
+            def build():
+                for path in Path(directory).iterdir():
+                    path.unlink()
+                jobs.jobs.clear()
+                job = jobs.request(db, filters)
+                job.wait(None)
+                assert job.status == "done", job.error
+
+            def cached():
+                job = jobs.request(db, filters)
+                assert job.status == "done"
+                jobs.served(job.job_id).read_bytes()
+
+            results["build_ms"] = median_ms(build, repeat)
+            results["cached_ms"] = median_ms(cached, repeat)
+            job = jobs.request(db, filters)
+            results["rows"], results["file_bytes"] = job.rows, job.bytes
+        search_engine.delete_source(db, source_id)
+    finally:
+        db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.words, args.repeat), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
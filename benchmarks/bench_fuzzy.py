@@ -0,0 +1,83 @@
+"""
+מדידת חיפוש מקורב
+Fuzzy search benchmark: symmetric-deletion index vs. a distance scan of
+every form (vectorized too), over growing dictionaries
+
+Usage: python -m benchmarks.bench_fuzzy [--sizes 10000,50000,200000]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from app.services.fuzzy_search import FuzzyIndex
+from app.services.nikud_analyzer import remove_nikud
+from benchmarks.corpus import synthetic_vocabulary
+
+
+def median_ms(func_, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func_()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    """שגיאת כתיב - One similar-letter swap and one dropped letter"""
+    swaps = {"ב": "כ", "כ": "ח", "ס": "ש", "ש": "ס", "ת": "ט", "ט": "ת", "פ": "ב"}
+    chars = [swaps.get(c, c) for c in word]
+    if len(chars) > 3:
+        del chars[rng.randrange(len(chars))]
+    return "".join(chars)
+
+
+def scan(index: FuzzyIndex, forms, word: str, max_distance: float):
+    """מעבר על כל הצורות - The same matches by computing every distance"""
+    if len(word) < 5:
+        max_distance = min(max_distance, 1)
+    distances = index.letters.distances(word, forms)
+    return sorted(form for form, distance in zip(forms, distances) if distance <= max_distance)
+
+
+def run(sizes, queries: int, repeat: int) -> dict:
+    rng = random.Random(7)
+    results = {"benchmark": "fuzzy_search", "sizes": {}}
+    for size in sizes:
+        forms = sorted({remove_nikud(word) for word in synthetic_vocabulary(size)})
+        index = FuzzyIndex(max_distance=2)
+        started = time.perf_counter()
+        index.load(forms)
+        build_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        words = [misspell(rng.choice(forms), rng) for _ in range(queries)]
+        for word in words[:5]:
+            found = sorted(match["word"] for match in index.search(None, word, 2))
+            assert found == scan(index, forms, word, 2), word
+
+        results["sizes"][size] = dict(
+            forms=len(forms),
+            build_ms=build_ms,
+            matches=sum(len(index.search(None, w, 2)) for w in words) / len(words),
+            index_ms=round(median_ms(lambda: [index.search(None, w, 2) for w in words], repeat) / len(words), 3),
+            scan_ms=median_ms(lambda: scan(index, forms, words[0], 2), repeat),
+            **index.stats(),
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,50000,200000")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    print(json.dumps(run(sizes, args.queries, args.repeat), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+מדידת זיכרון לכל מילה מנותחת
+Memory benchmark: bytes per analyzed word, legacy dataclass vs compact batch
+
+Usage: python -m benchmarks.bench_memory [--words N] [--vocabulary N]
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+from dataclasses import dataclass
+from typing import List, Set
+
+from app.services.nikud_analyzer import NikudAnalyzer, ShvaType, SyllableType
+from benchmarks.corpus import synthetic_text
+
+
+@dataclass
+class LegacyWordAnalysis:
+    """הייצוג הקודם - The previous per-token dataclass representation"""
+    word: str
+    word_plain: str
+    nikud_pattern: str
+    syllable_type: SyllableType
+    has_shva: bool
+    shva_types: List[ShvaType]
+    nikud_marks: Set[str]
+    has_dagesh: bool
+    has_open_syllable: bool
+    has_closed_syllable: bool
+    special_cases: List[str]
+
+
+def legacy_analyze_text(analyzer: NikudAnalyzer, text: str) -> list:
+    """ניתוח בסגנון הקודם - one fresh object per token"""
+    results = []
+    for analysis in analyzer.analyze_text(text):
+        # Fresh strings, as the old per-token analyze_word produced them
+        results.append(LegacyWordAnalysis(
+            word=''.join(list(analysis.word)),
+            word_plain=''.join(list(analysis.word_plain)),
+            nikud_pattern=''.join(list(analysis.nikud_pattern)),
+            syllable_type=analysis.syllable_type,
+            has_shva=analysis.has_shva,
+            shva_types=analysis.shva_types,
+            nikud_marks=analysis.nikud_marks,
+            has_dagesh=analysis.has_dagesh,
+            has_open_syllable=analysis.has_open_syllable,
+            has_closed_syllable=analysis.has_closed_syllable,
+            special_cases=analysis.special_cases
+        ))
+    return results
+
+
+def measure(build) -> tuple:
+    """זיכרון שנשאר מוקצה אחרי הבנייה - Bytes retained by the built object"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def run(words: int, vocabulary: int) -> dict:
+    analyzer = NikudAnalyzer()
+    text = synthetic_text(words, vocabulary)
+    count = len(analyzer.analyze_text(text))
+
+    _, legacy_bytes = measure(lambda: legacy_analyze_text(analyzer, text))
+    batch, compact_bytes = measure(lambda: analyzer.analyze_text(text))
+
+    return {
+        "benchmark": "analysis_memory",
+        "words": count,
+        "distinct_forms": len(batch.forms),
+        "legacy_bytes_per_word": round(legacy_bytes / count, 1),
+        "compact_bytes_per_word": round(compact_bytes / count, 1),
+        "ratio": round(legacy_bytes / compact_bytes, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=200_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.words, args.vocabulary), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+מדידת חלוקה למחיצות לפי מקור
+Per-source partitioning benchmark on PostgreSQL: a source-filtered search
+and deleting one source, with plain tables vs. words and word_postings
+partitioned by source. Also reports how many tables the source-filtered
+plan scans. Drops and recreates every table of the given database - point
+it at a scratch database:
+
+Usage: python -m benchmarks.bench_partitions --url postgresql+psycopg2://localhost/nikud_bench
+       [--sources 200] [--words-per-source 5000]
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Source, Word
+from app.schemas import SearchFilters
+from app.services.content_store import content_store
+from app.services.generations import generations
+from app.services.nikud_analyzer import NikudAnalyzer
+from app.services.partitions import word_partitions
+from app.services.phrase_search import phrase_search
+from app.services.search_engine import SearchEngine
+from benchmarks.corpus import synthetic_text
+
+
+def median_ms(func_, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func_()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def load(db, sources: int, content: str, rows):
+    for number in range(1, sources + 1):
+        source = Source(id=word_partitions.reserve(db), name=f"מקור {number}", word_count=len(rows))
+        db.add(source)
+        db.flush()
+        source_id = source.id
+        for start in range(0, len(rows), 5000):
+            db.execute(insert(Word), [dict(row, source_id=source_id, position=start + i)
+                                      for i, row in enumerate(rows[start:start + 5000])])
+        phrase_search.index_source(db, source_id, ((row["word"], row["word_plain"]) for row in rows))
+        content_store.write(db, source_id, content)
+        db.commit()
+
+
+def run(url: str, sources: int, words: int, repeat: int) -> dict:
+    content = synthetic_text(words)
+    rows = list(NikudAnalyzer().analyze_text(content).iter_dicts())
+    engine_ = SearchEngine()
+    results = {"benchmark": "partitions", "sources": sources, "words_per_source": len(rows), "modes": {}}
+
+    engine = create_engine(url)
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("נדרש PostgreSQL")
+    for mode in ("plain", "partitioned"):
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            generations.ensure(db)
+            if mode == "partitioned":
+                word_partitions.migrate(db)
+            load(db, sources, content, rows)
+            db.execute(text("ANALYZE"))
+            db.commit()
+
+            middle = sources // 2
+            filters = SearchFilters(source_id=middle, has_shva=True)
+            plan = db.execute(text("EXPLAIN SELECT count(*) FROM words WHERE source_id = :source"),
+                              {"source": middle}).scalars().all()
+            doomed = iter(range(sources, 0, -1))
+            results["modes"][mode] = {
+                "tables_scanned": sum(" on words" in line for line in plan),
+                "search_ms": median_ms(lambda: engine_.search(db, filters, page=1, per_page=50), repeat),
+                "delete_source_ms": median_ms(lambda: engine_.delete_source(db, next(doomed)), repeat),
+            }
+        finally:
+            db.close()
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", required=True, help="מסד PostgreSQL לבדיקה (נמחק ונוצר מחדש)")
+    parser.add_argument("--sources", type=int, default=200)
+    parser.add_argument("--words-per-source", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.url, args.sources, args.words_per_source, args.repeat),
+                     ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+מדידת חיפוש לפי תבנית ניקוד
+Pattern search benchmark: indexed plan vs. a regex over every row
+
+Usage: python -m benchmarks.bench_pattern [--words N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Word
+from app.services.nikud_analyzer import NikudAnalyzer
+from app.services.pattern_search import PatternQuery, pattern_index
+from benchmarks.corpus import synthetic_text
+
+QUERIES = (
+    "לתלתלש",        # exact
+    "לת*",           # prefix
+    "*לתלש",         # suffix with grams
+    "לת-ל-ש*",       # prefix with grams
+    "*דת?לש*",       # inner grams
+    "ל[תח]ל{2,3}*",  # class and repetition
+    "?*ש",           # no grams: suffix range and regex
+)
+
+
+def median_ms(db, statement, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        db.execute(statement).scalar()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def run(words: int, repeat: int) -> dict:
+    analyzer = NikudAnalyzer()
+    analyses = analyzer.analyze_text(synthetic_text(words, vocabulary=max(5000, words // 10)))
+    rows = [dict(data, position=i) for i, data in enumerate(analyses.iter_dicts())]
+
+    results = {"benchmark": "pattern_search", "rows": len(rows)}
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            for start in range(0, len(rows), 10_000):
+                db.execute(insert(Word), rows[start:start + 10_000])
+            started = time.perf_counter()
+            pattern_index.register(db, (form.nikud_pattern for form in analyses.forms))
+            results["register_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            db.commit()
+            db.execute(text("ANALYZE"))
+            results["distinct_patterns"] = len({form.nikud_pattern for form in analyses.forms})
+            results["queries"] = {}
+
+            for query_text in QUERIES:
+                query = PatternQuery(query_text)
+                scan = select(func.count()).where(Word.nikud_pattern.regexp_match(query.regex))
+                started = time.perf_counter()
+                indexed = select(func.count()).where(pattern_index.condition(db, query_text))
+                plan_ms = (time.perf_counter() - started) * 1000
+                matches = db.execute(scan).scalar()
+                assert matches == db.execute(indexed).scalar(), query_text
+                scan_ms = median_ms(db, scan, repeat)
+                indexed_ms = median_ms(db, indexed, repeat) + plan_ms
+                results["queries"][query_text] = {
+                    "matches": matches,
+                    "regex_scan_ms": scan_ms,
+                    "indexed_ms": round(indexed_ms, 3),
+                    "speedup": round(scan_ms / indexed_ms, 1),
+                }
+        finally:
+            db.close()
+            engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.words, args.repeat), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+מדידת חיפוש ביטויים
+Phrase search benchmark: posting-list intersection vs. SQL self-joins
+
+Usage: python -m benchmarks.bench_phrase [--words N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.orm import aliased, sessionmaker
+
+from app.database import Base
+from app.models import Word
+from app.services.nikud_analyzer import NikudAnalyzer, remove_nikud
+from app.services.phrase_search import PhraseSearch
+from benchmarks.corpus import synthetic_text
+
+
+def median_ms(func_, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func_()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def self_join(db, terms):
+    """אותו חיפוש כ-self-join - The same exact phrase as n-1 self-joins on the word indexes"""
+    tables = [aliased(Word) for _ in terms]
+    statement = select(tables[0].source_id, tables[0].position)
+    for i, (table, term) in enumerate(zip(tables, terms)):
+        statement = statement.where(table.word_plain == term)  # ix_words_word_plain
+        if i:
+            statement = statement.where(table.source_id == tables[0].source_id,
+                                        table.position == tables[0].position + i)
+    return sorted(db.execute(statement).all())
+
+
+def run(words: int, repeat: int) -> dict:
+    analyzer = NikudAnalyzer()
+    analyses = analyzer.analyze_text(synthetic_text(words))
+    source_size = 50_000
+    rows = [dict(data, position=i % source_size, source_id=1 + i // source_size)
+            for i, data in enumerate(analyses.iter_dicts())]
+
+    # Phrases of 2-4 words: frequent bigram starts, extended with what follows them
+    plain = [remove_nikud(row["word"]) for row in rows]
+    bigrams = Counter(zip(plain, plain[1:])).most_common(3)
+    phrases = [list(pair) for pair, _ in bigrams]
+    start = plain.index(phrases[0][0])
+    phrases += [plain[start:start + 3], plain[start:start + 4]]
+
+    searcher = PhraseSearch()
+    results = {"benchmark": "phrase_search", "rows": len(rows)}
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            for offset in range(0, len(rows), 10_000):
+                db.execute(insert(Word), rows[offset:offset + 10_000])
+            started = time.perf_counter()
+            for offset in range(0, len(rows), source_size):
+                searcher.index_source(db, rows[offset]["source_id"], (
+                    (row["word"], row["word_plain"]) for row in rows[offset:offset + source_size]))
+            results["index_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            db.commit()
+            db.execute(text("ANALYZE"))
+            results["phrases"] = {}
+
+            for terms in phrases:
+                query = " ".join(terms)
+                found = searcher.find(db, query)
+                expected = self_join(db, terms)
+                assert [(s, first) for s, first, _ in found] == expected, query
+                joins_ms = median_ms(lambda: self_join(db, terms), repeat)
+                postings_ms = median_ms(lambda: searcher.find(db, query), repeat)
+                results["phrases"][query] = {
+                    "terms": len(terms),
+                    "matches": len(found),
+                    "self_join_ms": joins_ms,
+                    "postings_ms": postings_ms,
+                    "speedup": round(joins_ms / postings_ms, 1),
+                }
+            near = " ".join(phrases[0])
+            results["proximity_5_ms"] = median_ms(lambda: searcher.find(db, near, distance=5), repeat)
+            results["proximity_5_matches"] = len(searcher.find(db, near, distance=5))
+        finally:
+            db.close()
+            engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.words, args.repeat), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
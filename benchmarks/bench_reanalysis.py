@@ -0,0 +1,94 @@
+"""
+מדידת ניתוח מחדש
+Re-analysis benchmark: the versioned job (distinct forms, batched updates,
+unchanged groups only re-stamped) vs. analyzing and updating every row
+
+Usage: python -m benchmarks.bench_reanalysis [--words N]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Word, REVERSED_COLUMNS
+from app.services.nikud_analyzer import ANALYZER_VERSION, NikudAnalyzer
+from app.services.reanalysis import ReanalysisJob, stale_filter
+from benchmarks.corpus import synthetic_text
+
+
+def per_row(db, analyzer: NikudAnalyzer) -> int:
+    """ניתוח כל שורה - Analyze and update each stale row on its own"""
+    rows = db.execute(select(Word.id, Word.word).where(stale_filter())).all()
+    for row in rows:
+        data = analyzer.analyze_word(row.word).to_dict()
+        data.update({reversed_column: data[column][::-1] or None
+                     for reversed_column, column in REVERSED_COLUMNS.items()})
+        db.execute(update(Word).where(Word.id == row.id).values(**data, analyzer_version=ANALYZER_VERSION))
+    db.commit()
+    return len(rows)
+
+
+def timed(func_) -> float:
+    started = time.perf_counter()
+    func_()
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def run(words: int) -> dict:
+    analyzer = NikudAnalyzer()
+    batch = analyzer.analyze_words(
+        [w for w in analyzer.tokenize(synthetic_text(words)) if len(w) > 1])
+    results = {"benchmark": "reanalysis", "rows": len(batch), "forms": len(batch.forms)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            rows = [dict(data, position=i, analyzer_version=ANALYZER_VERSION)
+                    for i, data in enumerate(batch.iter_dicts())]
+            for start in range(0, len(rows), 5000):
+                db.execute(insert(Word), rows[start:start + 5000])
+            db.commit()
+
+            def stale(**values):
+                db.execute(update(Word).values(analyzer_version=0, **values))
+                db.commit()
+
+            job = ReanalysisJob(analyzer)
+            # Rules unchanged - every group only needs its version stamp
+            stale()
+            job.start()
+            results["unchanged_ms"] = timed(lambda: job.run(db))
+            assert job.status()["forms_changed"] == 0
+
+            # Every stored analysis wrong - every group is rewritten
+            stale(syllable_type=None)
+            job.start()
+            results["changed_ms"] = timed(lambda: job.run(db))
+            assert job.status()["forms_changed"] == len(batch.forms)
+
+            stale(syllable_type=None)
+            results["per_row_ms"] = timed(lambda: per_row(db, analyzer))
+            assert db.query(Word).filter(stale_filter()).count() == 0
+        finally:
+            db.close()
+            engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=100_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.words), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
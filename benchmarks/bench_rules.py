@@ -0,0 +1,100 @@
+"""
+מדידת שיוך לכללים
+Rule membership benchmark: words under a rule and per-rule counts through
+word_rules vs. evaluating the rule over every stored word
+
+Usage: python -m benchmarks.bench_rules [--words N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import NikudRule, Word, WordRule
+from app.services.corpus_importer import CorpusImporter
+from app.services.nikud_analyzer import NikudAnalyzer
+from app.services.rule_index import RuleIndex, rule_index
+from benchmarks.corpus import synthetic_text
+
+RULES_FILE = Path(__file__).resolve().parent.parent / "nikud_rules.json"
+
+
+def median_ms(func_, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func_()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def scan(db, index: RuleIndex, rule_id: int) -> int:
+    """הערכה בכל חיפוש - Evaluate the rule over every stored word"""
+    predicates = index.compiled(db)[rule_id]
+    analyze = index.evaluator.analyzer.analyze_cached
+    words = db.execute(select(Word.word)).scalars()
+    return sum(1 for word in words if all(p(word, analyze(word)) for p in predicates))
+
+
+def run(words: int, repeat: int) -> dict:
+    analyzer = NikudAnalyzer()
+    batch = analyzer.analyze_text(synthetic_text(words))
+    results = {"benchmark": "rule_membership", "rows": len(batch), "forms": len(batch.forms)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            rows = [dict(data, position=i) for i, data in enumerate(batch.iter_dicts())]
+            for start in range(0, len(rows), 5000):
+                db.execute(insert(Word), rows[start:start + 5000])
+            db.commit()
+
+            index: RuleIndex = rule_index
+            importer = CorpusImporter(analyzer)
+            started = time.perf_counter()
+            report = importer.import_rules_json(db, RULES_FILE)
+            results["build_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            results["memberships"] = report["memberships"]
+            db.execute(text("ANALYZE"))
+
+            # The rule with the most matching words
+            rule_id = db.execute(
+                select(WordRule.rule_id).group_by(WordRule.rule_id)
+                .order_by(func.count().desc()).limit(1)).scalar()
+            count = db.query(Word).filter(Word.word.in_(
+                select(WordRule.word).where(WordRule.rule_id == rule_id))).count()
+            assert count == scan(db, index, rule_id)
+
+            results["rule_id"] = rule_id
+            results["matching_words"] = count
+            results["index_count_ms"] = median_ms(lambda: db.query(Word).filter(Word.word.in_(
+                select(WordRule.word).where(WordRule.rule_id == rule_id))).count(), repeat)
+            results["scan_count_ms"] = median_ms(lambda: scan(db, index, rule_id), repeat)
+            results["all_rules_ms"] = median_ms(lambda: index.rules(db), repeat)
+            results["rules"] = db.query(NikudRule).count()
+        finally:
+            db.close()
+            engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.words, args.repeat), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+מדידת רשימת המקורות
+Source listing benchmark: columns and stored counts vs. whole entities
+joined to their words, for a growing number of sources
+
+Usage: python -m benchmarks.bench_sources [--sources 10,100,1000] [--words-per-source N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, insert, text, update
+from sqlalchemy.orm import sessionmaker, undefer
+
+from app.database import Base
+from app.models import Word, Source
+from app.services.content_store import content_store
+from app.services.nikud_analyzer import NikudAnalyzer
+from app.services.search_engine import SearchEngine
+from benchmarks.corpus import synthetic_text
+
+
+def median_ms(func_, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func_()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def inline_listing(db):
+    """הרשימה הקודמת - Whole Source entities (with content) and a count join"""
+    return db.query(Source, func.count(Word.id)).options(undefer(Source.content)) \
+        .outerjoin(Word).group_by(Source.id).all()
+
+
+def run(counts, words: int, repeat: int) -> dict:
+    content = synthetic_text(words)
+    rows = list(NikudAnalyzer().analyze_text(content).iter_dicts())
+    engine_ = SearchEngine()
+    results = {"benchmark": "source_listing", "content_chars": len(content),
+               "words_per_source": len(rows), "sources": {}}
+
+    for count in counts:
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+            Base.metadata.create_all(bind=engine)
+            db = sessionmaker(bind=engine)()
+            try:
+                for source_id in range(1, count + 1):
+                    # Inline content too, so the old listing has it to drag along
+                    db.add(Source(id=source_id, name=f"מקור {source_id}", content=content,
+                                  word_count=len(rows)))
+                    db.flush()
+                    content_store.write(db, source_id, content)
+                    db.execute(insert(Word), [dict(row, source_id=source_id, position=i)
+                                              for i, row in enumerate(rows)])
+                db.commit()
+                db.execute(text("ANALYZE"))
+
+                listed = engine_.get_sources(db)
+                assert len(listed) == count and listed[0]["word_count"] == len(rows)
+                results["sources"][count] = {
+                    "listing_ms": median_ms(lambda: engine_.get_sources(db), repeat),
+                    "inline_join_ms": median_ms(lambda: inline_listing(db), repeat),
+                }
+                db.execute(update(Source).values(content=None))
+                db.commit()
+            finally:
+                db.close()
+                engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sources", default="10,100,1000")
+    parser.add_argument("--words-per-source", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    counts = [int(count) for count in args.sources.split(",")]
+    print(json.dumps(run(counts, args.words_per_source, args.repeat), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+מדידת חיפוש "מסתיים ב" מול אינדקס הסיומות
+Suffix search benchmark: LIKE '%x' table scan vs. the reversed-form index
+
+Usage: python -m benchmarks.bench_suffix [--words N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Word, prefix_range
+from app.services.nikud_analyzer import NikudAnalyzer
+from benchmarks.corpus import synthetic_text
+
+
+def median_ms(db, statement, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        db.execute(statement).scalar()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def query_plan(db, statement) -> str:
+    compiled = statement.compile(db.bind, compile_kwargs={"literal_binds": True})
+    rows = db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return "; ".join(row[-1] for row in rows)
+
+
+def run(words: int, repeat: int) -> dict:
+    analyzer = NikudAnalyzer()
+    analyses = analyzer.analyze_text(synthetic_text(words, vocabulary=max(5000, words // 10)))
+    rows = [dict(data, position=i) for i, data in enumerate(analyses.iter_dicts())]
+
+    # The most frequent endings of the corpus, one per column
+    plain_suffix = Counter(r["word_plain"][-2:] for r in rows).most_common(1)[0][0]
+    word_suffix = Counter(r["word"][-3:] for r in rows).most_common(1)[0][0]
+    pattern_suffix = Counter(r["nikud_pattern"][-3:] for r in rows).most_common(1)[0][0]
+    cases = {
+        "word_plain": (Word.word_plain, Word.word_plain_reversed, plain_suffix),
+        "word": (Word.word, Word.word_reversed, word_suffix),
+        "nikud_pattern": (Word.nikud_pattern, Word.pattern_reversed, pattern_suffix),
+    }
+
+    results = {"benchmark": "suffix_index", "rows": len(rows)}
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            for start in range(0, len(rows), 10_000):
+                db.execute(insert(Word), rows[start:start + 10_000])
+            db.commit()
+            db.execute(text("ANALYZE"))
+
+            for name, (column, reversed_column, suffix) in cases.items():
+                scan = select(func.count()).where(column.like(f"%{suffix}"))
+                indexed = select(func.count()).where(prefix_range(reversed_column, suffix[::-1]))
+                matches = db.execute(scan).scalar()
+                assert matches == db.execute(indexed).scalar(), name
+                scan_ms = median_ms(db, scan, repeat)
+                indexed_ms = median_ms(db, indexed, repeat)
+                results[name] = {
+                    "suffix": suffix,
+                    "matches": matches,
+                    "like_scan_ms": scan_ms,
+                    "suffix_index_ms": indexed_ms,
+                    "speedup": round(scan_ms / indexed_ms, 1),
+                    "plan": query_plan(db, indexed),
+                }
+        finally:
+            db.close()
+            engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.words, args.repeat), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+מדידת השלמה אוטומטית
+Autocomplete benchmark: prefix lookups in the in-memory index vs. a LIKE query
+
+Usage: python -m benchmarks.bench_suggest [--words N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Word, prefix_range
+from app.services.nikud_analyzer import NikudAnalyzer, remove_nikud
+from app.services.suggest import SuggestIndex
+from benchmarks.corpus import synthetic_text
+
+
+def median_us(func_, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func_()
+        samples.append(time.perf_counter() - started)
+    return round(statistics.median(samples) * 1_000_000, 1)
+
+
+def sql_suggest(db, prefix: str, limit: int):
+    """אותה השלמה ב-SQL - Range scan on ix_words_word_plain, grouped and ranked"""
+    return db.execute(
+        select(Word.word_plain, func.count().label("n"))
+        .where(prefix_range(Word.word_plain, prefix))
+        .group_by(Word.word_plain)
+        .order_by(text("n DESC"), Word.word_plain)
+        .limit(limit)
+    ).all()
+
+
+def run(words: int, repeat: int) -> dict:
+    analyses = NikudAnalyzer().analyze_text(synthetic_text(words))
+    rows = [dict(data, source_id=1, position=i) for i, data in enumerate(analyses.iter_dicts())]
+    plain = [remove_nikud(row["word"]) for row in rows]
+    prefixes = [plain[0][:1], plain[0][:2], plain[0][:3], plain[1][:2]]
+
+    results = {"benchmark": "suggest", "rows": len(rows)}
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            for offset in range(0, len(rows), 10_000):
+                db.execute(insert(Word), rows[offset:offset + 10_000])
+            db.commit()
+            db.execute(text("ANALYZE"))
+
+            index = SuggestIndex()
+            started = time.perf_counter()
+            index.build(db)
+            results["build_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            results.update(index.stats())
+
+            # An incremental load of the same text again doubles every count
+            started = time.perf_counter()
+            index.add_batch(analyses)
+            results["add_source_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            index.build(db)
+
+            results["prefixes"] = {}
+            for prefix in prefixes:
+                found = [(s["word"], s["count"]) for s in index.suggest(db, prefix, 10)]
+                assert found == [tuple(row) for row in sql_suggest(db, prefix, 10)], prefix
+                index.suggest(db, prefix, 10)  # Short prefixes fill their cached top list
+                results["prefixes"][prefix] = {
+                    "index_us": median_us(lambda: index.suggest(db, prefix, 10), repeat),
+                    "sql_us": median_us(lambda: sql_suggest(db, prefix, 10), repeat),
+                }
+        finally:
+            db.close()
+            engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(run(args.words, args.repeat), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+מדידת מהירות פירוק למילים והסרת ניקוד
+Tokenizer and nikud-stripping micro-benchmark (chars/sec)
+
+Usage: python -m benchmarks.bench_tokenizer [--megabytes N]
+"""
+
+import argparse
+import json
+import time
+
+from app.services.nikud_analyzer import NikudMarks, SEPARATORS, remove_nikud, tokenize
+from benchmarks.corpus import synthetic_text
+
+
+def legacy_tokenize(text: str) -> list:
+    """הפירוק הקודם, תו אחר תו - The previous per-character tokenizer"""
+    words = []
+    current_word = []
+    for char in text:
+        if char in SEPARATORS:
+            if current_word:
+                word = ''.join(current_word)
+                if any(c in NikudMarks.HEBREW_LETTERS for c in word):
+                    words.append(word)
+                current_word = []
+        else:
+            if char in NikudMarks.HEBREW_LETTERS or char in NikudMarks.ALL_NIKUD:
+                current_word.append(char)
+    if current_word:
+        word = ''.join(current_word)
+        if any(c in NikudMarks.HEBREW_LETTERS for c in word):
+            words.append(word)
+    return words
+
+
+def legacy_remove_nikud(text: str) -> str:
+    """ההסרה הקודמת - The previous string-concatenation version"""
+    result = ""
+    for char in text:
+        if char not in NikudMarks.ALL_NIKUD:
+            result += char
+    return result
+
+
+def best_time(func, text: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(text)
+        samples.append(time.perf_counter() - started)
+    return min(samples)
+
+
+def run(megabytes: float, repeat: int) -> dict:
+    # About 10 characters per synthetic word
+    text = synthetic_text(int(megabytes * 1_000_000 / 10))
+    assert tokenize(text) == legacy_tokenize(text)
+    assert remove_nikud(text) == legacy_remove_nikud(text)
+
+    results = {"benchmark": "tokenizer", "chars": len(text)}
+    for name, legacy, current in (("tokenize", legacy_tokenize, tokenize),
+                                  ("remove_nikud", legacy_remove_nikud, remove_nikud)):
+        before = best_time(legacy, text, repeat)
+        after = best_time(current, text, repeat)
+        results[name] = {
+            "legacy_chars_per_sec": round(len(text) / before),
+            "chars_per_sec": round(len(text) / after),
+            "speedup": round(before / after, 1),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--megabytes", type=float, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.megabytes, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
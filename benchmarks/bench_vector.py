@@ -0,0 +1,81 @@
+"""
+השוואה ומדידה של המנתח הווקטורי
+Differential check and benchmark: VectorAnalyzer vs the scalar NikudAnalyzer
+
+Usage: python -m benchmarks.bench_vector [--words N] [--fuzz N]
+
+Exits with status 1 if the two analyzers disagree on any token.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from app.services.nikud_analyzer import NikudAnalyzer, NikudMarks
+from app.services.vector_analyzer import VectorAnalyzer
+from benchmarks.corpus import synthetic_text, tehilim_words
+
+FUZZ_ALPHABET = (sorted(NikudMarks.HEBREW_LETTERS) * 3
+                 + [chr(c) for c in range(0x0591, 0x05F5)]
+                 + list(' \t\n,.;:!?()"\'abc123– '))
+
+
+def differences(scalar, vector, text: str) -> list:
+    """תוצאות שונות - Token indexes where the two results differ"""
+    expected = scalar.analyze_text(text)
+    actual = vector.analyze_text(text)
+    if len(expected) != len(actual):
+        return [("length", len(expected), len(actual))]
+    return [(i, a.word) for i, (a, b) in enumerate(zip(expected, actual))
+            if a.codes() != b.codes()]
+
+
+def run(words: int, fuzz: int) -> dict:
+    scalar = NikudAnalyzer()
+    vector = VectorAnalyzer()
+    rng = random.Random(7)
+
+    texts = {
+        "tehilim": " ".join(tehilim_words()),
+        "synthetic": synthetic_text(words),
+    }
+    report = {"benchmark": "vector_analyzer", "mismatches": {}}
+    for name, text in texts.items():
+        report["mismatches"][name] = differences(scalar, vector, text)[:10]
+
+    fuzz_failures = []
+    for _ in range(fuzz):
+        text = ''.join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(0, 80)))
+        if differences(scalar, vector, text):
+            fuzz_failures.append(text)
+    report["mismatches"]["fuzz"] = fuzz_failures[:10]
+
+    # Zipf text repeats forms; the distinct-heavy one analyzes most tokens
+    texts["distinct"] = synthetic_text(words, vocabulary=words)
+    for name in ("synthetic", "distinct"):
+        timings = {}
+        for kind, analyzer in (("scalar", scalar), ("vector", vector)):
+            started = time.perf_counter()
+            batch = analyzer.analyze_text(texts[name])
+            timings[kind] = time.perf_counter() - started
+            report[f"{name}_{kind}_words_per_sec"] = round(len(batch) / timings[kind])
+        report[f"{name}_distinct_forms"] = len(batch.forms)
+        report[f"{name}_speedup"] = round(timings["scalar"] / timings["vector"], 1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=200_000)
+    parser.add_argument("--fuzz", type=int, default=2000)
+    args = parser.parse_args()
+    report = run(args.words, args.fuzz)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if any(report["mismatches"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+מדידת זיכרון לכל תהליך עובד
+Worker memory benchmark: 1 vs. 4 worker processes, each building its own
+autocomplete and fuzzy indexes vs. all of them mapping one shared snapshot.
+Reports RSS and PSS (shared pages divided among the processes mapping
+them) per worker, read from /proc while every worker is alive.
+
+Usage: python -m benchmarks.bench_workers [--forms N] [--workers 1,4]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Word
+from app.services.nikud_analyzer import NikudAnalyzer
+from benchmarks.corpus import synthetic_vocabulary
+
+
+def memory_kb(pid) -> dict:
+    """זיכרון תהליך - Rss and Pss in kB (Linux)"""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in ("Rss", "Pss"):
+                    values[name.lower() + "_kb"] = int(rest.split()[0])
+    except FileNotFoundError:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    values["rss_kb"] = int(line.split()[1])
+    return values
+
+
+def worker():
+    """תהליך עובד - Warm the indexes the way a request would, then wait"""
+    importlib.import_module("app.main")  # The application module a worker loads
+    from app.database import SessionLocal
+    from app.services.fuzzy_search import fuzzy_index
+    from app.services.suggest import suggest_index
+
+    before = memory_kb("self")["rss_kb"]
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        suggest_index.suggest(db, "ב")
+        fuzzy_index.search(db, "בראשית")
+    finally:
+        db.close()
+    warm_ms = round((time.perf_counter() - started) * 1000, 1)
+    print(json.dumps({"warm_ms": warm_ms, "startup_rss_kb": before}), flush=True)
+    sys.stdin.read()  # Stay alive until the parent has measured every worker
+
+
+def measure(workers: int, env: dict) -> dict:
+    processes = [subprocess.Popen([sys.executable, "-m", "benchmarks.bench_workers", "--worker"],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env, text=True)
+                 for _ in range(workers)]
+    try:
+        reports = [json.loads(process.stdout.readline()) for process in processes]
+        for process, report in zip(processes, reports):
+            report.update(memory_kb(process.pid))
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+    per_worker = {key: round(sum(r[key] for r in reports) / workers)
+                  for key in reports[0] if key.endswith("_kb")}
+    total = {f"total_{key}": sum(r[key] for r in reports) for key in ("rss_kb", "pss_kb") if key in reports[0]}
+    return dict(per_worker, **total, warm_ms=max(r["warm_ms"] for r in reports))
+
+
+def run(forms: int, worker_counts) -> dict:
+    analyzer = NikudAnalyzer()
+    batch = analyzer.analyze_words(synthetic_vocabulary(forms))
+    results = {"benchmark": "worker_memory", "forms": len(batch.forms), "modes": {}}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        try:
+            rows = [dict(data, position=i) for i, data in enumerate(batch.iter_dicts())]
+            for start in range(0, len(rows), 5000):
+                db.execute(insert(Word), rows[start:start + 5000])
+            db.commit()
+        finally:
+            db.close()
+            engine.dispose()
+
+        base = dict(os.environ, USE_SQLITE="true", SQLITE_PATH=path, METRICS_ENABLED="false")
+        base.pop("SNAPSHOT_DIR", None)
+        for mode in ("memory", "shared"):
+            results["modes"][mode] = {}
+            for workers in worker_counts:
+                env = dict(base)
+                if mode == "shared":
+                    # A fresh directory - the first worker builds, the rest map
+                    env["SNAPSHOT_DIR"] = tempfile.mkdtemp(dir=directory)
+                results["modes"][mode][workers] = measure(workers, env)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--forms", type=int, default=200_000)
+    parser.add_argument("--workers", default="1,4")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker()
+        return
+    counts = [int(count) for count in args.workers.split(",")]
+    print(json.dumps(run(args.forms, counts), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+בדיקת טביעת תוכן מצטברת
+Content hash check: random texts of letters, nikud marks (in any order),
+presentation forms, spaces and mixed line endings are hashed whole and in
+random chunks. Fails on the first text whose chunked hash differs from the
+one-shot hash, printing it and its cuts:
+
+Usage: python -m benchmarks.check_content_hash [--texts 20000] [--seed 0]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from app.services.content_hash import ContentHasher, content_hash
+
+ALPHABET = (
+    ["א", "ב", "ש", "ת", "ה", "שּׁ", "וּ"]       # letters, presentation forms
+    + ["ְ", "ָ", "ַ", "ּ", "ׁ", "ׂ", "ִ"]  # marks
+    + [" ", "\t", "\n", "\r", "\r\n"]
+)
+
+
+def random_text(rng: random.Random) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 12)))
+
+
+def chunked_hash(text: str, cuts) -> str:
+    hasher = ContentHasher()
+    previous = 0
+    for cut in cuts + [len(text)]:
+        hasher.update(text[previous:cut])
+        previous = cut
+    return hasher.hexdigest()
+
+
+def run(texts: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    for _ in range(texts):
+        text = random_text(rng)
+        cuts = sorted(rng.sample(range(len(text) + 1), rng.randint(0, min(4, len(text) + 1))))
+        if chunked_hash(text, cuts) != content_hash(text):
+            return {"check": "content_hash", "passed": False, "text": ascii(text), "cuts": cuts}
+    return {"check": "content_hash", "passed": True, "texts": texts,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    results = run(args.texts, args.seed)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if not results["passed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+בדיקת ביטול מטמונים בין תהליכים
+Cross-process invalidation check: subscriber processes build their
+in-memory autocomplete index, the parent loads and then deletes a source,
+and each subscriber reports when the new word appears and disappears.
+Fails if any subscriber misses a change. Runs against the configured
+database - LISTEN/NOTIFY on PostgreSQL, polling otherwise:
+
+Usage: DATABASE_URL=postgresql://localhost/nikud_test python -m benchmarks.check_invalidation
+       USE_SQLITE=true SQLITE_PATH=/tmp/check.db python -m benchmarks.check_invalidation
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+WORD = "קְוַוְקְוָו"
+PLAIN = "קווקוו"
+
+
+def subscriber(timeout: float):
+    """תהליך מנוי - Report when WORD appears in and leaves the local index"""
+    from app.database import SessionLocal
+    from app.services.invalidation import invalidation_bus
+    from app.services.suggest import suggest_index
+
+    db = SessionLocal()
+    suggest_index.build(db)
+    invalidation_bus.start()
+
+    def present() -> bool:
+        return any(s["word"] == PLAIN for s in suggest_index.suggest(db, PLAIN, limit=50))
+
+    if present():
+        raise SystemExit(f"{WORD} כבר קיים במסד")
+    print(json.dumps({"event": "ready"}), flush=True)
+    for event, expected in (("added", True), ("removed", False)):
+        deadline = time.monotonic() + timeout
+        while present() != expected and time.monotonic() < deadline:
+            time.sleep(0.005)
+        print(json.dumps({"event": event, "seen": present() == expected, "at": time.time()}), flush=True)
+    print(json.dumps({"event": "stats", **invalidation_bus.stats()}), flush=True)
+    invalidation_bus.stop()
+    db.close()
+
+
+def run(subscribers: int, timeout: float) -> dict:
+    from app.database import SessionLocal, engine, init_db
+    from app.services.invalidation import invalidation_bus
+    from app.services.search_engine import search_engine
+
+    init_db()
+    processes = [subprocess.Popen([sys.executable, "-m", "benchmarks.check_invalidation", "--subscriber",
+                                   "--timeout", str(timeout)], stdout=subprocess.PIPE, text=True)
+                 for _ in range(subscribers)]
+    results = {"check": "invalidation", "backend": engine.dialect.name,
+               "mode": invalidation_bus.stats()["mode"], "subscribers": subscribers}
+    db = SessionLocal()
+    try:
+        for process in processes:
+            assert json.loads(process.stdout.readline())["event"] == "ready"
+
+        source_id, _ = search_engine.load_text(db, f"{WORD} בָּרָא", "בדיקת ביטול מטמונים")
+        committed = time.time()
+        added = [json.loads(process.stdout.readline()) for process in processes]
+
+        search_engine.delete_source(db, source_id)
+        committed_delete = time.time()
+        removed = [json.loads(process.stdout.readline()) for process in processes]
+        stats = [json.loads(process.stdout.readline()) for process in processes]
+    finally:
+        db.close()
+        for process in processes:
+            process.wait(timeout)
+
+    results["added_ms"] = sorted(round((e["at"] - committed) * 1000, 1) for e in added)
+    results["removed_ms"] = sorted(round((e["at"] - committed_delete) * 1000, 1) for e in removed)
+    results["applied"] = [s["applied"] for s in stats]
+    results["passed"] = all(e["seen"] for e in added + removed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--subscriber", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.subscriber:
+        subscriber(args.timeout)
+        return
+    results = run(args.subscribers, args.timeout)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if not results["passed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+בדיקת ניתוב קריאות לשרת העתק
+Read-replica routing check against two local SQLite files, "replicating"
+by copying the primary over the replica. An uploading client must find its
+upload right away (on the primary while the replica is behind), another
+client reads the stale replica, and reads fall back to the primary once
+the replica is gone. Fails if any read lands on the wrong database:
+
+Usage: USE_SQLITE=true SQLITE_PATH=/tmp/primary.db \\
+       REPLICA_DATABASE_URL=sqlite:////tmp/replica.db python -m benchmarks.check_replica
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+
+WORD = "קְוַוְקְוָו"
+PLAIN = "קווקוו"
+
+
+def replicate(primary: str, replica: str):
+    """העתקה - Bring the replica up to date with the primary"""
+    source, target = sqlite3.connect(primary), sqlite3.connect(replica)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+def run() -> dict:
+    from fastapi.testclient import TestClient
+
+    from app.config import settings
+    from app.database import init_db, replica_engine
+    from app.main import app
+    from app.services.read_replica import GENERATION_COOKIE, read_router
+
+    if replica_engine is None or not settings.use_sqlite:
+        raise SystemExit("נדרשים USE_SQLITE=true ו-REPLICA_DATABASE_URL=sqlite:///...")
+    primary, replica = settings.sqlite_path, replica_engine.url.database
+    init_db()
+    replicate(primary, replica)
+    read_router.check()
+
+    writer, reader = TestClient(app), TestClient(app)
+    steps = {}
+
+    def found(client, step: str, target: str):
+        before = dict(read_router.routed)
+        response = client.get("/api/words/search", params={"word_plain": PLAIN})
+        routed = [t for t in read_router.routed if read_router.routed[t] > before[t]]
+        steps[step] = {"found": response.json()["total"] > 0, "target": routed[0] if routed else None,
+                       "expected_target": target}
+        return steps[step]["found"]
+
+    if found(reader, "before_upload", "replica"):
+        raise SystemExit(f"{WORD} כבר קיים במסד")
+    upload = writer.post("/api/sources/upload", files={"file": ("check.txt", f"{WORD} בָּרָא".encode())})
+    source_id = upload.json()["source_id"]
+    steps["upload"] = {"generation": writer.cookies.get(GENERATION_COOKIE),
+                       "replica_generation": read_router.replica_generation}
+
+    ok = found(writer, "own_write_replica_behind", "primary")
+    ok &= not found(reader, "other_client_replica_behind", "replica")
+
+    replicate(primary, replica)
+    read_router.check()
+    ok &= found(writer, "own_write_replica_caught_up", "replica")
+
+    # The replica goes away - connections are dropped and the file is empty
+    replica_engine.dispose()
+    os.remove(replica)
+    read_router.check()
+    ok &= found(reader, "replica_down", "primary")
+
+    writer.delete(f"/api/sources/{source_id}")
+    ok &= all(step["target"] == step["expected_target"] for step in steps.values() if "target" in step)
+    return {"check": "read_replica", "steps": steps, "stats": read_router.stats(), "passed": bool(ok)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+    results = run()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if not results["passed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+קורפוס סינתטי לבדיקות ביצועים
+Synthetic pointed-Hebrew corpora for benchmarks
+"""
+
+import random
+from pathlib import Path
+from typing import List
+
+from app.services.nikud_analyzer import NikudMarks
+
+ROOT = Path(__file__).resolve().parent.parent
+TEHILIM_XLSX = ROOT / "מילים מתהילים.xlsx"
+
+LETTERS = sorted(NikudMarks.HEBREW_LETTERS - NikudMarks.SOFIT_LETTERS)
+SOFIT = {'כ': 'ך', 'מ': 'ם', 'נ': 'ן', 'פ': 'ף', 'צ': 'ץ'}
+VOWELS = sorted(NikudMarks.VOWELS | NikudMarks.HATAF_VOWELS) + [NikudMarks.SHVA] * 3
+
+
+def synthetic_word(rng: random.Random) -> str:
+    """מילה מנוקדת אקראית - Random pointed word of 2-6 letters"""
+    chars = []
+    length = rng.randint(2, 6)
+    for i in range(length):
+        letter = rng.choice(LETTERS)
+        if i == length - 1:
+            letter = SOFIT.get(letter, letter)
+        chars.append(letter)
+        if rng.random() < 0.2:
+            chars.append(NikudMarks.DAGESH)
+        if letter == 'ש':
+            chars.append(rng.choice((NikudMarks.SHIN_DOT, NikudMarks.SIN_DOT)))
+        if i < length - 1 or rng.random() < 0.3:
+            chars.append(rng.choice(VOWELS))
+    return ''.join(chars)
+
+
+def synthetic_vocabulary(size: int, seed: int = 1) -> List[str]:
+    """אוצר מילים סינתטי - Distinct synthetic forms"""
+    rng = random.Random(seed)
+    vocabulary = set()
+    while len(vocabulary) < size:
+        vocabulary.add(synthetic_word(rng))
+    return sorted(vocabulary)
+
+
+def synthetic_text(words: int, vocabulary: int = 5000, seed: int = 1) -> str:
+    """
+    טקסט סינתטי - Zipf-like text with sentence punctuation,
+    so repeated forms appear as in real sources.
+    """
+    rng = random.Random(seed)
+    forms = synthetic_vocabulary(vocabulary, seed)
+    weights = [1.0 / (rank + 1) for rank in range(len(forms))]
+    tokens = rng.choices(forms, weights=weights, k=words)
+    parts = []
+    for i, token in enumerate(tokens, 1):
+        parts.append(token)
+        parts.append('. ' if i % 12 == 0 else (', ' if i % 5 == 0 else ' '))
+    return ''.join(parts)
+
+
+def tehilim_words() -> List[str]:
+    """מילים מתהילים - Words from the bundled Tehilim workbook"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(TEHILIM_XLSX, read_only=True, data_only=True)
+    try:
+        sheet = workbook["מאגר מילים"]
+        return [row[0] for row in sheet.iter_rows(min_row=2, max_col=1, values_only=True)
+                if row[0]]
+    finally:
+        workbook.close()
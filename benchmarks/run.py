@@ -0,0 +1,198 @@
+"""
+חבילת בדיקות ביצועים
+Benchmark suite: analyzer, ingestion, search, statistics and export on SQLite
+
+Usage:
+    python -m benchmarks.run --words 50000 --output bench.json
+    python -m benchmarks.run --words 50000 --compare bench.json --threshold 0.2
+
+Results are written as JSON. With --compare, every metric is checked against
+the baseline file and the run exits with status 1 if any metric regressed by
+more than the threshold (a fraction, 0.2 = 20%).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.schemas import SearchFilters
+from app.services.nikud_analyzer import NikudAnalyzer
+from app.services.search_engine import SearchEngine
+from app.services.excel_exporter import ExcelExporter
+from benchmarks.corpus import synthetic_text, tehilim_words
+
+# צירופי סינון למדידת זמני חיפוש
+SEARCH_CASES = {
+    "all": {},
+    "word_plain": {"word_plain": "של"},
+    "ends_with": {"ends_with": "ים"},
+    "syllable_type": {"syllable_type": "פתוחה"},
+    "shva_dagesh": {"has_shva": True, "has_dagesh": True},
+    "source": {"source_id": 1},
+    "length": {"min_length": 3, "max_length": 4},
+    "combined": {"word_plain": "ל", "has_shva": True, "syllable_type": "סגורה"},
+}
+
+
+def timings(func: Callable, repeat: int) -> List[float]:
+    """זמני ריצה בשניות - Wall time of each call"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def latency(samples: List[float]) -> Dict:
+    """חציון ואחוזון 95 במילישניות - Median and p95 latency metrics"""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return {
+        "median_ms": {"value": round(statistics.median(ordered) * 1000, 3), "higher_is_better": False},
+        "p95_ms": {"value": round(p95 * 1000, 3), "higher_is_better": False},
+    }
+
+
+def throughput(count: int, samples: List[float], unit: str) -> Dict:
+    """קצב לשנייה לפי הריצה המהירה - Throughput from the fastest run"""
+    return {unit: {"value": round(count / min(samples), 1), "higher_is_better": True}}
+
+
+def run(words: int, repeat: int) -> Dict:
+    results: Dict[str, Dict] = {}
+    analyzer = NikudAnalyzer()
+
+    # Analyzer
+    tehilim = tehilim_words()
+    samples = timings(lambda: [analyzer.analyze_word(w) for w in tehilim], repeat)
+    results["analyze_word_tehilim"] = throughput(len(tehilim), samples, "words_per_sec")
+
+    text = synthetic_text(words)
+    token_count = len(analyzer.analyze_text(text))
+    samples = timings(lambda: analyzer.analyze_text(text), repeat)
+    results["analyze_text"] = throughput(token_count, samples, "words_per_sec")
+    results["analyze_text"]["chars_per_sec"] = {
+        "value": round(len(text) / min(samples), 1), "higher_is_better": True}
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        search_engine = SearchEngine(analyzer)
+        db = Session()
+        try:
+            # Ingestion
+            started = time.perf_counter()
+            search_engine.load_text(db, text, "סינתטי", "בדיקה")
+            elapsed = time.perf_counter() - started
+            results["load_text"] = {
+                "rows_per_sec": {"value": round(token_count / elapsed, 1), "higher_is_better": True}}
+            # Ten words per sentence, so stored contexts stay sentence-sized
+            tehilim_text = ". ".join(
+                " ".join(tehilim[i:i + 10]) for i in range(0, len(tehilim), 10))
+            search_engine.load_text(db, tehilim_text, "תהילים", "תהילים")
+
+            # Search
+            for name, values in SEARCH_CASES.items():
+                filters = SearchFilters(**values)
+                samples = timings(lambda: search_engine.search(db, filters, 1, 50), repeat * 3)
+                results[f"search_{name}"] = latency(samples)
+
+            # Statistics
+            samples = timings(lambda: search_engine.get_statistics(db), repeat)
+            results["statistics"] = latency(samples)
+
+            # Export
+            exporter = ExcelExporter()
+            rows, _ = search_engine.search(db, SearchFilters(), page=1, per_page=10000)
+            started = time.perf_counter()
+            content = exporter.export_to_bytes(rows)
+            elapsed = time.perf_counter() - started
+            # Separate run for memory: tracing slows the export down
+            tracemalloc.start()
+            exporter.export_to_bytes(rows)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results["export"] = {
+                "seconds": {"value": round(elapsed, 3), "higher_is_better": False},
+                "peak_mb": {"value": round(peak / 2**20, 2), "higher_is_better": False},
+                "bytes": {"value": len(content), "higher_is_better": False},
+            }
+        finally:
+            db.close()
+            engine.dispose()
+
+    return {
+        "meta": {
+            "words": words,
+            "tokens": token_count,
+            "tehilim_words": len(tehilim),
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    השוואה לבסיס - List metrics that regressed by more than the threshold
+    """
+    regressions = []
+    for bench, metrics in current["results"].items():
+        for metric, data in metrics.items():
+            base = baseline.get("results", {}).get(bench, {}).get(metric)
+            if not base or not base["value"]:
+                continue
+            change = (data["value"] - base["value"]) / base["value"]
+            if data["higher_is_better"]:
+                change = -change
+            if change > threshold:
+                regressions.append(
+                    f"{bench}.{metric}: {base['value']} -> {data['value']} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nikud benchmark suite")
+    parser.add_argument("--words", type=int, default=50_000, help="גודל הקורפוס הסינתטי")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="קובץ JSON לתוצאות")
+    parser.add_argument("--compare", help="קובץ JSON של ריצת בסיס")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = run(args.words, args.repeat)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()